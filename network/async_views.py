@@ -0,0 +1,113 @@
+"""
+Async variants of the hot read endpoints, mounted under ``/api/async/``.
+
+They return the same payloads as their DRF counterparts, but fetch rows with
+Django's async ORM so a slow database round-trip only suspends the request
+instead of blocking a worker thread. Serialization itself is sync DRF code
+and runs through ``sync_to_async``. Serve them with the ASGI application
+(``social_api.asgi``); ``network.benchmarks`` compares both paths.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from django.views import View
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+
+from .authentication import atoken_user, request_token
+from .models import Conversation, Post, User
+from .pagination import KeysetPagination
+from .serializers import ConversationSerializer, InboxConversationSerializer, PostSerializer, UserSerializer
+from .views import CommentPreviewMixin, FeedMixin, inbox_queryset
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+class AsyncAPIView(View):
+    """
+    Base for the async read views: JWT authentication (header or ``?token=``)
+    and a DRF ``Request`` wrapper so paginators and serializers work unchanged.
+    """
+    authentication_required = True
+    http_method_names = ['get', 'head', 'options']
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await atoken_user(request_token(request))
+        if user is None:
+            if self.authentication_required:
+                return json_response({'detail': 'As credenciais de autenticação não foram fornecidas.'}, status=401)
+            user = AnonymousUser()
+        self.request = Request(request)
+        self.request.user = user
+        try:
+            return await super().dispatch(self.request, *args, **kwargs)
+        except APIException as exc:  # Ex.: cursor inválido no paginador
+            return json_response({'detail': exc.detail}, status=exc.status_code)
+
+    def get_serializer_context(self):
+        return {'request': self.request, 'view': self}
+
+    async def serialize(self, serializer_class, instance, **kwargs):
+        context = self.get_serializer_context()
+        return await sync_to_async(lambda: serializer_class(instance, context=context, **kwargs).data)()
+
+    async def paginated_response(self, queryset, serializer_class, paginator=None):
+        paginator = paginator or KeysetPagination()
+        page = await paginator.apaginate_queryset(queryset, self.request, view=self)
+        data = await self.serialize(serializer_class, page, many=True)
+        return json_response(paginator.get_paginated_data(data))
+
+
+class AsyncFeedView(FeedMixin, CommentPreviewMixin, AsyncAPIView):
+    async def get(self, request):
+        # Mesmos candidatos do FeedList (?mode=top incluso); o backend em memória pode ler o banco
+        queryset = await sync_to_async(self.feed_candidates)()
+        return await self.paginated_response(self.with_comment_preview(queryset), PostSerializer)
+
+
+class AsyncPostListView(CommentPreviewMixin, AsyncAPIView):
+    async def get(self, request):
+        author_id = request.query_params.get('author') or request.user.id
+        queryset = self.with_comment_preview(Post.objects.filter(author_id=author_id))
+        return await self.paginated_response(queryset, PostSerializer)
+
+
+class AsyncUserDetailView(AsyncAPIView):
+    authentication_required = False
+
+    async def get(self, request, pk):
+        try:
+            user = await User.objects.aget(pk=pk)
+        except User.DoesNotExist:
+            return json_response({'detail': 'Não encontrado.'}, status=404)
+        return json_response(await self.serialize(UserSerializer, user))
+
+
+class AsyncConversationListView(AsyncAPIView):
+    async def get(self, request):
+        return await self.paginated_response(inbox_queryset(request.user), InboxConversationSerializer)
+
+
+class AsyncConversationDetailView(AsyncAPIView):
+    async def get(self, request, conversation_id):
+        try:
+            conversation = await Conversation.objects.select_related(
+                'last_message__author'
+            ).prefetch_related('participants').aget(id=conversation_id)
+        except Conversation.DoesNotExist:
+            return json_response({'detail': 'Não encontrado.'}, status=404)
+        if request.user.pk not in {participant.pk for participant in conversation.participants.all()}:
+            return json_response({'error': 'Você não faz parte dessa conversa'}, status=403)
+
+        paginator = KeysetPagination(start_from_end=True)
+        messages = await paginator.apaginate_queryset(conversation.messages.select_related('author'), request)
+        context = {**self.get_serializer_context(), 'messages': messages}
+        data = await sync_to_async(lambda: ConversationSerializer(conversation, context=context).data)()
+        return json_response({
+            **data,
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+        })
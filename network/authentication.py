@@ -0,0 +1,39 @@
+"""
+JWT authentication outside DRF views (ASGI WebSocket and streaming endpoints).
+
+Browsers cannot set an ``Authorization`` header on WebSocket or EventSource
+connections, so the access token may also be passed as ``?token=``.
+"""
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+
+def token_user(raw_token):
+    """Return the active user for an access token, or ``None`` when it is invalid."""
+    if not raw_token:
+        return None
+    authentication = JWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+atoken_user = sync_to_async(token_user)
+
+
+def request_token(request):
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return header[len('Bearer '):].strip()
+    return request.GET.get('token')
+
+
+def scope_token(scope):
+    query = parse_qs(scope.get('query_string', b'').decode())
+    tokens = query.get('token')
+    return tokens[0] if tokens else None
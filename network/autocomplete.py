@@ -0,0 +1,167 @@
+"""
+Username autocomplete ("@ma…") for mention and DM pickers.
+
+Each worker keeps a sorted array of lowercased usernames with a parallel
+``array`` of ids. A prefix lookup is two ``bisect`` calls plus a slice, a
+few microseconds even with a million users. The index is loaded lazily on
+first use, in a background thread; until it is ready the worker answers from
+the database (``username`` prefix query), so a cold worker is slower but
+never blocks.
+
+``User`` ``post_save``/``post_delete`` signals update the index of the worker
+that made the write (after commit). Other workers pick up the change on
+their next periodic reload (``AUTOCOMPLETE_REFRESH_SECONDS``).
+
+Matches are ranked by the viewer's relationship (mutual, following, follows
+you), then alphabetically. Only the first ``CANDIDATE_WINDOW`` matches of a
+prefix are ranked, so for very short prefixes the boost applies within that
+window.
+"""
+import bisect
+import threading
+import time
+from array import array
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.functions import Lower
+from django.db.models.signals import post_delete, post_save
+
+from .models import User
+from .serializers import relationship_map
+
+CANDIDATE_WINDOW = 500
+DEFAULT_REFRESH_SECONDS = 300
+
+
+class UsernameIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []  # Usernames em minúsculas, ordenados
+        self._ids = array('q')
+        self._key_by_id = {}
+        self.loaded_at = None
+        self._loading = False
+
+    @property
+    def ready(self):
+        return self.loaded_at is not None
+
+    def __len__(self):
+        return len(self._keys)
+
+    def replace(self, rows):
+        """Swap in a new index built from ``(id, username)`` rows."""
+        entries = sorted((username.lower(), user_id) for user_id, username in rows)
+        keys = [key for key, _ in entries]
+        ids = array('q', (user_id for _, user_id in entries))
+        key_by_id = {user_id: key for key, user_id in entries}
+        with self._lock:
+            self._keys, self._ids, self._key_by_id = keys, ids, key_by_id
+            self.loaded_at = time.monotonic()
+
+    def load(self):
+        self.replace(User.objects.values_list('id', 'username').iterator(chunk_size=10000))
+
+    def clear(self):
+        with self._lock:
+            self._keys, self._ids, self._key_by_id = [], array('q'), {}
+            self.loaded_at = None
+
+    def _remove(self, user_id):
+        key = self._key_by_id.pop(user_id, None)
+        if key is None:
+            return
+        position = bisect.bisect_left(self._keys, key)
+        # Nomes que só diferem na caixa têm a mesma chave: acha o id certo
+        while self._ids[position] != user_id:
+            position += 1
+        del self._keys[position]
+        del self._ids[position]
+
+    def add(self, user_id, username):
+        key = username.lower()
+        with self._lock:
+            if not self.ready:
+                return
+            self._remove(user_id)
+            position = bisect.bisect_right(self._keys, key)
+            self._keys.insert(position, key)
+            self._ids.insert(position, user_id)
+            self._key_by_id[user_id] = key
+
+    def discard(self, user_id):
+        with self._lock:
+            if self.ready:
+                self._remove(user_id)
+
+    def prefix(self, prefix, limit):
+        """Ids of the first ``limit`` usernames starting with ``prefix``, alphabetically."""
+        prefix = prefix.lower()
+        with self._lock:
+            start = bisect.bisect_left(self._keys, prefix)
+            end = bisect.bisect_left(self._keys, prefix + '\U0010ffff', start, min(start + limit, len(self._keys)))
+            return self._ids[start:end].tolist()
+
+    def warm_up(self):
+        """Load (or reload, once stale) in a background thread; returns immediately."""
+        refresh = getattr(settings, 'AUTOCOMPLETE_REFRESH_SECONDS', DEFAULT_REFRESH_SECONDS)
+        with self._lock:
+            if self._loading or (self.ready and time.monotonic() - self.loaded_at < refresh):
+                return
+            self._loading = True
+        threading.Thread(target=self._load_in_background, daemon=True).start()
+
+    def _load_in_background(self):
+        try:
+            self.load()
+        finally:
+            self._loading = False
+            connection.close()
+
+
+index = UsernameIndex()
+
+
+def _index_user(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'username' not in update_fields:
+        return  # last_login, bio...: nada muda no índice
+    transaction.on_commit(lambda: index.add(instance.pk, instance.username))
+
+
+def _unindex_user(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: index.discard(user_id))
+
+
+post_save.connect(_index_user, sender=User, dispatch_uid='network.autocomplete.index_user')
+post_delete.connect(_unindex_user, sender=User, dispatch_uid='network.autocomplete.unindex_user')
+
+
+def _candidates(prefix):
+    index.warm_up()
+    if index.ready:
+        return index.prefix(prefix, CANDIDATE_WINDOW)
+    # Worker frio: responde do banco enquanto o índice carrega
+    return list(
+        User.objects.filter(username__istartswith=prefix)
+        .order_by(Lower('username'), 'id').values_list('id', flat=True)[:CANDIDATE_WINDOW]
+    )
+
+
+def suggest(prefix, viewer, limit=10):
+    """
+    ``(user_ids, relationships)`` for the best ``limit`` completions of
+    ``prefix``; ``relationships`` is the ``relationship_map`` of the
+    candidates, reused to fill ``is_following``.
+    """
+    candidates = [user_id for user_id in _candidates(prefix) if user_id != viewer.pk]
+    relationships = relationship_map(viewer, candidates)
+    none = {'mutual': False, 'following': False, 'followed_by': False}
+
+    def rank(position):
+        flags = relationships.get(candidates[position], none)
+        return (not flags['mutual'], not flags['following'], not flags['followed_by'], position)
+
+    best = sorted(range(len(candidates)), key=rank)[:limit]
+    return [candidates[position] for position in best], relationships
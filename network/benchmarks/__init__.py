@@ -0,0 +1,10 @@
+"""
+In-process load benchmarks for the API.
+
+Drivers call the real URL routing, middleware and views and report latency
+percentiles and throughput as JSON. ``run_workload`` uses Django's test
+``Client`` in a thread pool. ``run_sync`` and ``run_async`` go through the
+deployed entry points (``social_api.wsgi`` / ``social_api.asgi``) with no
+socket in between. They run against a throwaway test database; see the
+``benchmark_*`` management commands.
+"""
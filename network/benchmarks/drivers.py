@@ -0,0 +1,169 @@
+import asyncio
+import io
+import itertools
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from wsgiref.util import setup_testing_defaults
+
+from django.db import connection
+from django.test import Client
+
+from .report import summarize, summarize_queries
+
+Request = namedtuple('Request', ['name', 'method', 'path', 'data', 'headers'])
+
+
+def _wsgi_environ(path, headers):
+    url = urlsplit(path)
+    environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': url.path, 'QUERY_STRING': url.query, 'wsgi.input': io.BytesIO()}
+    setup_testing_defaults(environ)
+    environ.update({f"HTTP_{name.upper().replace('-', '_')}": value for name, value in headers.items()})
+    return environ
+
+
+def _wsgi_get(application, path, headers):
+    status_line = []
+
+    def start_response(status, response_headers, exc_info=None):
+        status_line.append(status)
+
+    body = application(_wsgi_environ(path, headers), start_response)
+    try:
+        for _ in body:  # Consome o corpo como o servidor faria
+            pass
+    finally:
+        body.close()  # Dispara request_finished (fecha/recicla a conexão)
+    return int(status_line[0].split()[0])
+
+
+def run_sync(paths, headers, total, concurrency):
+    """
+    Issue ``total`` GETs round-robin over ``paths`` from ``concurrency``
+    threads through ``social_api.wsgi.application`` (the real ``WSGIHandler``),
+    like a threaded WSGI worker minus the socket I/O.
+    """
+    from social_api.wsgi import application
+
+    targets = itertools.cycle(paths)
+    jobs = [next(targets) for _ in range(total)]
+    chunks = [jobs[index::concurrency] for index in range(concurrency)]
+
+    def worker(chunk):
+        samples = []
+        for path in chunk:
+            started = time.perf_counter()
+            status_code = _wsgi_get(application, path, headers)
+            samples.append((time.perf_counter() - started, status_code))
+        return samples
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = [sample for chunk in pool.map(worker, chunks) for sample in chunk]
+    return summarize(samples, time.perf_counter() - started)
+
+
+async def _asgi_get(application, path, headers):
+    url = urlsplit(path)
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': url.path, 'raw_path': url.path.encode(), 'query_string': url.query.encode(), 'root_path': '',
+        'headers': [(b'host', b'localhost')] + [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        'server': ('localhost', 80), 'client': ('127.0.0.1', 0),
+    }
+    pending = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    status_code = []
+
+    async def receive():
+        if pending:
+            return pending.pop()
+        # Cliente nunca desconecta: o handler cancela essa espera ao responder
+        return await asyncio.Future()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status_code.append(message['status'])
+
+    await application(scope, receive, send)
+    return status_code[0]
+
+
+async def _run_async(paths, headers, total, concurrency):
+    from social_api.asgi import application
+
+    targets = itertools.cycle(paths)
+    jobs = [next(targets) for _ in range(total)]
+    chunks = [jobs[index::concurrency] for index in range(concurrency)]
+
+    async def worker(chunk):
+        samples = []
+        for path in chunk:
+            started = time.perf_counter()
+            status_code = await _asgi_get(application, path, headers)
+            samples.append((time.perf_counter() - started, status_code))
+        return samples
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(worker(chunk) for chunk in chunks))
+    return summarize([sample for chunk in results for sample in chunk], time.perf_counter() - started)
+
+
+def run_async(paths, headers, total, concurrency):
+    """
+    Same workload as ``run_sync`` but as concurrent tasks on one event loop
+    through ``social_api.asgi.application`` (the real ``ASGIHandler``, with
+    its per-request thread for sync code), like a uvicorn worker minus the
+    socket I/O.
+    """
+    return asyncio.run(_run_async(paths, headers, total, concurrency))
+
+
+def run_workload(make_request, total, concurrency, seed=0):
+    """
+    Issue ``total`` requests built by ``make_request(rng)`` (a ``Request``)
+    from ``concurrency`` threads and summarize them per request name, with
+    the number of database queries each one ran.
+    """
+    def worker(index, count):
+        rng = random.Random(seed + index)
+        # Erros (ex.: lock do SQLite sob escrita concorrente) viram status 500 em vez de exceção
+        client = Client(raise_request_exception=False)
+        samples = []
+        queries = [0]
+
+        def count_query(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        try:
+            with connection.execute_wrapper(count_query):
+                for _ in range(count):
+                    request = make_request(rng)
+                    queries[0] = 0
+                    started = time.perf_counter()
+                    response = getattr(client, request.method)(request.path, request.data, headers=request.headers)
+                    samples.append((request.name, time.perf_counter() - started, response.status_code, queries[0]))
+        finally:
+            connection.close()  # Cada thread abre a própria conexão
+        return samples
+
+    counts = [total // concurrency + (1 if index < total % concurrency else 0) for index in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = [sample for chunk in pool.map(worker, range(concurrency), counts) for sample in chunk]
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for name in sorted({sample[0] for sample in samples}):
+        group = [sample for sample in samples if sample[0] == name]
+        results[name] = {
+            **summarize([(latency, status_code) for _, latency, status_code, _ in group], elapsed),
+            **summarize_queries([queries for *_, queries in group]),
+        }
+    results['overall'] = {
+        **summarize([(latency, status_code) for _, latency, status_code, _ in samples], elapsed),
+        **summarize_queries([queries for *_, queries in samples]),
+    }
+    return results
@@ -0,0 +1,65 @@
+import random
+from contextlib import contextmanager
+
+from django.db import connection
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from network import counters, timeline
+from network.models import Comment, Conversation, Message, Post, User
+
+
+@contextmanager
+def benchmark_database():
+    """Run the block against a fresh test database, never the configured one."""
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def auth_headers(user):
+    return {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+
+def seed_small(users=30, posts_per_user=10, follows_per_user=10, comments_per_post=3, messages=50, seed=42):
+    """
+    Small uniform fixture for endpoint comparisons. Returns ``(viewer, friend,
+    conversation)``: the viewer follows everyone and chats with ``friend``.
+    """
+    rng = random.Random(seed)
+    people = User.objects.bulk_create([User(username=f'bench{index}') for index in range(users)])
+    viewer, friend = people[0], people[1]
+
+    Follow = User.following.through
+    follows = {(viewer.id, other.id) for other in people[1:]}
+    for person in people[1:]:
+        for other in rng.sample(people, min(follows_per_user, users)):
+            if other.id != person.id:
+                follows.add((person.id, other.id))
+    Follow.objects.bulk_create([Follow(from_user_id=a, to_user_id=b) for a, b in follows])
+
+    for person in people:
+        for index in range(posts_per_user):
+            post = Post.objects.create(author=person, content=f'Post {index} de {person.username}')
+            timeline.fan_out_post(post)
+    posts = list(Post.objects.all())
+    Comment.objects.bulk_create([
+        Comment(post=post, author=rng.choice(people), content='Comentário')
+        for post in posts for _ in range(comments_per_post)
+    ])
+    Post.likes.through.objects.bulk_create([
+        Post.likes.through(post_id=post.id, user_id=user.id)
+        for post in posts for user in rng.sample(people, min(5, users))
+    ])
+
+    conversation = Conversation.objects.create(direct_key=Conversation.direct_key_for(viewer.id, friend.id))
+    conversation.participants.add(viewer, friend)
+    Message.objects.bulk_create([
+        Message(conversation=conversation, author=rng.choice([viewer, friend]), content=f'Mensagem {index}')
+        for index in range(messages)
+    ])
+    for model, fields in counters.COUNTERS.items():
+        for field in fields:
+            counters.reconcile(model, field)
+    return viewer, friend, conversation
@@ -0,0 +1,177 @@
+"""
+Synthetic power-law social graph for load tests.
+
+Popularity follows a Zipf law (``weight = 1 / rank ** exponent``): a few
+users collect most followers, likes and comments, as on real networks, so
+hub authors cross ``TIMELINE_FANOUT_THRESHOLD`` and exercise both feed
+delivery paths. Out-degree is Pareto distributed around ``avg_follows``.
+Everything is inserted with ``bulk_create`` in batches.
+"""
+import itertools
+import random
+
+from django.conf import settings
+from django.db import transaction
+
+from network import counters, ranking, timeline
+from network.models import Comment, Conversation, Message, Post, User
+
+Follow = User.following.through
+Like = Post.likes.through
+
+
+def _pareto_degree(rng, average, limit):
+    # paretovariate(a) tem média a / (a - 1); a = 2 => média 2
+    return max(1, min(limit, int(rng.paretovariate(2.0) * average / 2)))
+
+
+def _weighted_sample(rng, population, cum_weights, k, exclude):
+    """Up to ``k`` distinct items drawn by popularity, skipping ``exclude``."""
+    chosen = set()
+    for _ in range(k * 3):
+        if len(chosen) >= k:
+            break
+        item = rng.choices(population, cum_weights=cum_weights)[0]
+        if item != exclude:
+            chosen.add(item)
+    return chosen
+
+
+def generate_graph(
+    users=1000, avg_follows=20, exponent=1.1, posts_per_user=5, avg_likes=5, avg_comments=2,
+    conversations=200, messages_per_conversation=20, prefix='synth', seed=42, batch_size=2000,
+):
+    """
+    Insert the graph into the current database and return a summary dict
+    with row counts, the most followed user and ``viewer_id`` (the user who
+    follows the most people, i.e. the heaviest feed).
+    """
+    rng = random.Random(seed)
+    with transaction.atomic():
+        people = User.objects.bulk_create(
+            [User(username=f'{prefix}{index}') for index in range(users)], batch_size=batch_size
+        )
+        ids = [person.id for person in people]
+        # O rank de popularidade é embaralhado pra não coincidir com a ordem dos ids
+        ranked = ids[:]
+        rng.shuffle(ranked)
+        cum_weights = list(itertools.accumulate(1 / (position + 1) ** exponent for position in range(users)))
+
+        follows = set()
+        for user_id in ids:
+            for followee in _weighted_sample(rng, ranked, cum_weights, _pareto_degree(rng, avg_follows, users - 1), user_id):
+                follows.add((user_id, followee))
+        Follow.objects.bulk_create(
+            [Follow(from_user_id=a, to_user_id=b) for a, b in follows], batch_size=batch_size
+        )
+
+        authors = [user_id for user_id in ids for _ in range(rng.randint(0, 2 * posts_per_user))]
+        rng.shuffle(authors)  # Intercala autores na linha do tempo
+        posts = Post.objects.bulk_create(
+            [Post(author_id=author_id, content=f'Post sintético {index}') for index, author_id in enumerate(authors)],
+            batch_size=batch_size,
+        )
+        post_ids = [post.id for post in posts]
+
+        likes = set()
+        for post in posts:
+            for user_id in _weighted_sample(rng, ranked, cum_weights, rng.randint(0, 2 * avg_likes), post.author_id):
+                likes.add((post.id, user_id))
+        Like.objects.bulk_create([Like(post_id=p, user_id=u) for p, u in likes], batch_size=batch_size)
+
+        # Posts de autores populares recebem mais comentários
+        rank = {user_id: position for position, user_id in enumerate(ranked)}
+        popular_posts = sorted(posts, key=lambda post: rank[post.author_id])
+        comment_weights = list(itertools.accumulate(1 / (position + 1) ** exponent for position in range(len(posts))))
+        comments = [
+            Comment(post_id=rng.choices(popular_posts, cum_weights=comment_weights)[0].id, author_id=rng.choice(ids), content='Comentário')
+            for _ in range(len(posts) * avg_comments)
+        ] if posts else []
+        Comment.objects.bulk_create(comments, batch_size=batch_size)
+
+        pairs = set()
+        while len(pairs) < min(conversations, users * (users - 1) // 2):
+            a, b = rng.sample(ids, 2)
+            pairs.add((min(a, b), max(a, b)))
+        pairs = sorted(pairs)
+        chats = Conversation.objects.bulk_create(
+            [Conversation(direct_key=Conversation.direct_key_for(a, b)) for a, b in pairs], batch_size=batch_size
+        )
+        Participant = Conversation.participants.through
+        Participant.objects.bulk_create([
+            Participant(conversation_id=chat.id, user_id=user_id)
+            for chat, pair in zip(chats, pairs) for user_id in pair
+        ], batch_size=batch_size)
+        messages = Message.objects.bulk_create([
+            Message(conversation_id=chat.id, author_id=rng.choice(pair), content=f'Mensagem {index}', is_read=rng.random() < 0.7)
+            for chat, pair in zip(chats, pairs) for index in range(messages_per_conversation)
+        ], batch_size=batch_size)
+        last = {message.conversation_id: message.id for message in messages}
+        for chat in chats:
+            chat.last_message_id = last.get(chat.id)
+        Conversation.objects.bulk_update(chats, ['last_message'], batch_size=batch_size)
+
+        for model, fields in counters.COUNTERS.items():
+            for field in fields:
+                counters.reconcile(model, field, batch_size=batch_size)
+        # Feed ranqueado: score a partir das curtidas/comentários gerados
+        if post_ids:
+            ranking.rescore(Post.objects.filter(pk__range=(min(post_ids), max(post_ids))))
+
+        _materialize_timelines(posts, follows)
+
+    followers, following = {}, {}
+    for follower, followee in follows:
+        followers[followee] = followers.get(followee, 0) + 1
+        following[follower] = following.get(follower, 0) + 1
+    return {
+        'users': users,
+        'follows': len(follows),
+        'posts': len(post_ids),
+        'likes': len(likes),
+        'comments': len(comments),
+        'conversations': len(chats),
+        'messages': len(messages),
+        'max_followers': max(followers.values(), default=0),
+        'most_followed_id': max(followers, key=followers.get) if followers else None,
+        # Quem segue mais gente tem o feed mais pesado
+        'viewer_id': max(following, key=following.get) if following else None,
+    }
+
+
+def _materialize_timelines(posts, follows):
+    """Same result as ``fan_out_post`` per post, with the follower lists already in memory."""
+    threshold = getattr(settings, 'TIMELINE_FANOUT_THRESHOLD', timeline.DEFAULT_FANOUT_THRESHOLD)
+    followers = {}
+    for follower, followee in follows:
+        followers.setdefault(followee, []).append(follower)
+    hubs = [author for author, fans in followers.items() if len(fans) > threshold]
+    Post.objects.filter(author_id__in=hubs).update(fanout_on_read=True)
+
+    backend = timeline.get_backend()
+    hubs = set(hubs)
+    for post in posts:
+        audience = [] if post.author_id in hubs else followers.get(post.author_id, [])
+        backend.push(post, [post.author_id] + audience)
+
+
+GRAPH_OPTIONS = {
+    'users': (int, 1000, 'Número de usuários.'),
+    'avg_follows': (int, 20, 'Média de pessoas seguidas por usuário (cauda Pareto).'),
+    'exponent': (float, 1.1, 'Expoente de Zipf da popularidade; maior = hubs mais concentrados.'),
+    'posts_per_user': (int, 5, 'Média de posts por usuário.'),
+    'avg_likes': (int, 5, 'Média de curtidas por post.'),
+    'avg_comments': (int, 2, 'Comentários por post (média).'),
+    'conversations': (int, 200, 'Conversas 1:1.'),
+    'messages_per_conversation': (int, 20, 'Mensagens por conversa.'),
+    'seed': (int, 42, 'Semente do gerador (grafo reproduzível).'),
+}
+
+
+def add_graph_arguments(parser):
+    for name, (kind, default, help_text) in GRAPH_OPTIONS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=kind, default=default, help=help_text)
+
+
+def graph_kwargs(options):
+    return {name: options[name] for name in GRAPH_OPTIONS}
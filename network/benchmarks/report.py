@@ -0,0 +1,35 @@
+import statistics
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    """
+    Summarize ``(latency_seconds, status_code)`` samples collected over
+    ``elapsed`` wall-clock seconds.
+    """
+    latencies = sorted(latency for latency, _ in samples)
+    errors = sum(1 for _, status_code in samples if status_code >= 400)
+    to_ms = lambda value: None if value is None else round(value * 1000, 3)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 4),
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+        'mean_ms': to_ms(statistics.fmean(latencies)) if latencies else None,
+        'p50_ms': to_ms(percentile(latencies, 0.50)),
+        'p95_ms': to_ms(percentile(latencies, 0.95)),
+        'p99_ms': to_ms(percentile(latencies, 0.99)),
+    }
+
+
+def summarize_queries(counts):
+    """Database queries per request, as counted by ``drivers.run_workload``."""
+    if not counts:
+        return {'queries_mean': None, 'queries_max': None}
+    return {'queries_mean': round(statistics.fmean(counts), 2), 'queries_max': max(counts)}
@@ -0,0 +1,84 @@
+"""
+Search benchmark: indexed full-text lookup vs ``icontains`` scan.
+
+Posts are generated from a synthetic vocabulary with Zipf word frequencies,
+so queries for tail words match a handful of rows among many. The corpus
+grows step by step and both strategies fetch the first result page at each
+size; the scan has to read every row while the index lookup only touches
+the matches, so its time stays nearly flat as the table grows.
+"""
+import itertools
+import random
+import statistics
+import string
+import time
+
+from django.db import connection, transaction
+
+from network import search
+from network.models import Post, User
+
+PAGE_SIZE = 20
+
+
+def _vocabulary(rng, size):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 9))))
+    return sorted(words)
+
+
+def _grow(rng, author, target, vocabulary, cum_weights, words_per_post, batch_size):
+    missing = target - Post.objects.count()
+    posts = [
+        Post(author=author, content=' '.join(rng.choices(vocabulary, cum_weights=cum_weights, k=words_per_post)))
+        for _ in range(max(0, missing))
+    ]
+    Post.objects.bulk_create(posts, batch_size=batch_size)
+
+
+def _median_ms(run, words):
+    timings = []
+    for word in words:
+        started = time.perf_counter()
+        run(word)
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(timings), 3)
+
+
+def measure_search(sizes=(1000, 4000, 16000), queries=30, vocabulary_size=5000, words_per_post=12, seed=42, batch_size=2000):
+    """Median first-page latency of both strategies at each corpus size."""
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(rng, vocabulary_size)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(vocabulary_size)))
+    # Palavras da cauda: poucos resultados, o caso em que o scan mais desperdiça
+    tail = vocabulary[vocabulary_size // 2:]
+    author = User.objects.create(username='search_bench')
+    ordered = Post.objects.order_by('-created_at', '-id')
+
+    def indexed(word):
+        return list(search.filter_matching(ordered, 'post', word).values_list('id', flat=True)[:PAGE_SIZE])
+
+    def scan(word):
+        return list(ordered.filter(search.scan_filter('post', [word])).values_list('id', flat=True)[:PAGE_SIZE])
+
+    results = []
+    for size in sorted(sizes):
+        with transaction.atomic():
+            _grow(rng, author, size, vocabulary, cum_weights, words_per_post, batch_size)
+        words = rng.sample(tail, min(queries, len(tail)))
+        results.append({'posts': size, 'index_ms': _median_ms(indexed, words), 'icontains_ms': _median_ms(scan, words)})
+
+    first, last = results[0], results[-1]
+    growth = last['posts'] / first['posts']
+    return {
+        'vendor': connection.vendor,
+        'queries_per_size': queries,
+        'results': results,
+        # Quanto cada estratégia ficou mais lenta enquanto a tabela cresceu `growth` vezes
+        'growth': {
+            'rows': growth,
+            'index': round(last['index_ms'] / max(first['index_ms'], 1e-3), 2),
+            'icontains': round(last['icontains_ms'] / max(first['icontains_ms'], 1e-3), 2),
+        },
+    }
@@ -0,0 +1,132 @@
+"""
+Shared cache of serialized post and user representations.
+
+Entries are keyed by object id plus a version token (``post:<id>:<post
+version>:<author version>:<variant>``). Write paths call ``invalidate_post``
+/ ``invalidate_user``, which replace the token, so stale entries are simply
+never read again and age out through the backend's LRU eviction or TTL.
+
+Users have two tokens: ``user`` versions the full profile (counters
+included, so every follow rotates it) and ``author`` versions the compact
+author card posts embed, which only ``AUTHOR_CARD_FIELDS`` edits rotate. A
+follow therefore never evicts the cached posts of a popular author. Comment
+authors are embedded too (full comments and previews) but not part of the
+key: a card edit bumps the version of every post the user commented on.
+
+Cached data is viewer-independent: fields listed in ``POST_VIEWER_FIELDS``
+and ``USER_VIEWER_FIELDS`` are stripped before storing and overlaid per
+request by the views.
+
+The backend is the ``REPRESENTATION_CACHE_ALIAS`` entry of ``CACHES``
+(local-memory by default, Redis when ``REDIS_URL`` is set).
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import metrics
+from .models import Comment
+
+POST_VIEWER_FIELDS = frozenset({'user_has_liked'})
+USER_VIEWER_FIELDS = frozenset({'is_following'})
+# Campos do AuthorSerializer embutido nos posts
+AUTHOR_CARD_FIELDS = frozenset({'username', 'profile_picture'})
+
+
+def get_cache():
+    return caches[getattr(settings, 'REPRESENTATION_CACHE_ALIAS', 'default')]
+
+
+def _version_key(kind, pk):
+    return f'v:{kind}:{pk}'
+
+
+def _new_version():
+    return uuid.uuid4().hex[:12]
+
+
+def _versions(refs):
+    """Return ``{(kind, pk): token}`` for ``refs``, creating tokens that are missing."""
+    cache = get_cache()
+    keys = {ref: _version_key(*ref) for ref in set(refs)}
+    found = cache.get_many(keys.values())
+    versions = {}
+    for ref, key in keys.items():
+        if key not in found:
+            # add() não sobrescreve uma invalidação concorrente
+            token = _new_version()
+            if not cache.add(key, token, timeout=None):
+                token = cache.get(key, token)
+            found[key] = token
+        versions[ref] = found[key]
+    return versions
+
+
+def invalidate_post(post_id):
+    get_cache().set(_version_key('post', post_id), _new_version(), timeout=None)
+
+
+def _invalidate_posts(post_ids, batch_size=1000):
+    post_ids = list(post_ids)
+    for start in range(0, len(post_ids), batch_size):
+        get_cache().set_many(
+            {_version_key('post', post_id): _new_version() for post_id in post_ids[start:start + batch_size]}, timeout=None
+        )
+
+
+def invalidate_user(user_id, fields=None):
+    """
+    Invalidate the user's cached profile. When ``fields`` (the changed
+    fields, ``None`` if unknown) include an ``AUTHOR_CARD_FIELDS`` entry, also
+    invalidate the cached posts that embed them as author or commenter.
+    """
+    kinds = ['user']
+    card_changed = fields is None or AUTHOR_CARD_FIELDS.intersection(fields)
+    if card_changed:
+        kinds.append('author')
+    get_cache().set_many({_version_key(kind, user_id): _new_version() for kind in kinds}, timeout=None)
+    if card_changed:
+        # Raro (renomear/trocar foto): uma consulta pelos posts comentados
+        _invalidate_posts(Comment.objects.filter(author_id=user_id).values_list('post_id', flat=True).distinct())
+
+
+def _cached(keys, objects, build, viewer_fields):
+    cache = get_cache()
+    hits = cache.get_many(keys)
+    missing = [(key, obj) for key, obj in zip(keys, objects) if key not in hits]
+    kind = keys[0].split(':', 1)[0]
+    metrics.cache_requests.inc((kind, 'hit'), len(keys) - len(missing))
+    metrics.cache_requests.inc((kind, 'miss'), len(missing))
+    if missing:
+        built = build([obj for _, obj in missing])
+        fresh = {
+            key: {field: value for field, value in data.items() if field not in viewer_fields}
+            for (key, _), data in zip(missing, built)
+        }
+        cache.set_many(fresh, timeout=getattr(settings, 'REPRESENTATION_CACHE_TIMEOUT', 300))
+        hits.update(fresh)
+    return [dict(hits[key]) for key in keys]
+
+
+def post_representations(posts, build, variant='full'):
+    """
+    Return the cached representation of each post in ``posts`` (objects with
+    ``id`` and ``author_id``), in order. ``build(missing_posts)`` serializes
+    the cache misses; ``variant`` separates differently shaped payloads
+    (e.g. full comments vs. list previews).
+    """
+    if not posts:
+        return []
+    versions = _versions([('post', post.id) for post in posts] + [('author', post.author_id) for post in posts])
+    keys = [
+        f"post:{post.id}:{versions[('post', post.id)]}:{versions[('author', post.author_id)]}:{variant}"
+        for post in posts
+    ]
+    return _cached(keys, posts, build, POST_VIEWER_FIELDS)
+
+
+def user_representation(user, build):
+    """Cached counterpart of ``build([user])[0]`` for a full user profile."""
+    version = _versions([('user', user.pk)])[('user', user.pk)]
+    return _cached([f'user:{user.pk}:{version}'], [user], build, USER_VIEWER_FIELDS)[0]
@@ -0,0 +1,101 @@
+"""
+Conditional GET (``ETag`` / ``Last-Modified``) for the hot read endpoints.
+
+Validators are computed from narrow ``values()`` queries over the rows a
+response would contain (ids, ``updated_at`` and the denormalized counters)
+instead of the full serialized payload, so a revalidation that ends in
+``304 Not Modified`` skips the joins, the comment prefetch and serialization.
+"""
+import hashlib
+
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from django.utils.cache import patch_vary_headers
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Message, Post
+from .pagination import KeysetPagination
+
+# Tudo que muda a representação de um post no feed/detalhe
+POST_VALIDATOR_FIELDS = ('id', 'updated_at', 'likes_count', 'comments_count', 'author__username', 'author__profile_picture')
+MESSAGE_VALIDATOR_FIELDS = ('id', 'is_read')
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    # Weak: o corpo é JSON equivalente, não necessariamente idêntico byte a byte
+    return f'W/{quote_etag(digest)}'
+
+
+def is_not_modified(request, etag, last_modified=None):
+    """RFC 9110 evaluation: ``If-None-Match`` wins over ``If-Modified-Since``."""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        tags = parse_etags(if_none_match)
+        # Comparação fraca: ignora o prefixo W/ dos dois lados
+        return '*' in tags or etag.removeprefix('W/') in {tag.removeprefix('W/') for tag in tags}
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return bool(last_modified and if_modified_since and int(last_modified.timestamp()) <= if_modified_since)
+
+
+def _set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # A resposta depende do usuário autenticado (user_has_liked, is_read)
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def conditional_response(request, etag, last_modified, build):
+    """Return ``304`` when the client's copy is current, otherwise ``build()`` with validators set."""
+    if is_not_modified(request, etag, last_modified):
+        return _set_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
+    response = build()
+    if response.status_code == status.HTTP_200_OK:
+        _set_validators(response, etag, last_modified)
+    return response
+
+
+def _viewer_liked(user):
+    return Exists(Post.likes.through.objects.filter(post=OuterRef('pk'), user_id=user.pk))
+
+
+def post_validators(post_id, user):
+    """``(etag, last_modified)`` for a post detail, or ``None`` if the post doesn't exist."""
+    row = Post.objects.filter(pk=post_id).values(*POST_VALIDATOR_FIELDS, liked=_viewer_liked(user)).first()
+    if row is None:
+        return None
+    return make_etag('post', user.pk, tuple(row.values())), row['updated_at']
+
+
+def post_page_validators(queryset, request, view=None, variant=''):
+    """
+    Validators for the keyset page of ``queryset`` that ``request`` asks for.
+    ETag only: a follow, unfollow or deletion changes which posts are on the
+    page without touching any ``updated_at``, so a date can't tell.
+    ``variant`` names the payload shape (e.g. the comment preview size), so
+    differently shaped pages of the same posts never share an ETag.
+    """
+    page = KeysetPagination().page_queryset(
+        queryset.values(*POST_VALIDATOR_FIELDS, 'created_at', liked=_viewer_liked(request.user)), request, view
+    )
+    return make_etag('posts', variant, request.user.pk, [tuple(row.values()) for row in page]), None
+
+
+def touch_commented_posts(user_id):
+    """Bump ``updated_at`` of the posts ``user_id`` commented on, whose payloads embed their author card."""
+    return Post.objects.filter(comments__author_id=user_id).update(updated_at=timezone.now())
+
+
+def conversation_validators(conversation, request):
+    """Validators for ``get_conversation``: conversation activity plus the read state of the message page."""
+    page = KeysetPagination(start_from_end=True).page_queryset(
+        Message.objects.filter(conversation=conversation).values(*MESSAGE_VALIDATOR_FIELDS, 'created_at'), request
+    )
+    rows = [tuple(row.values()) for row in page]
+    etag = make_etag('conversation', conversation.pk, request.user.pk, conversation.updated_at, conversation.last_message_id, rows)
+    return etag, conversation.updated_at
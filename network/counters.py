@@ -0,0 +1,137 @@
+"""
+Denormalized counters on ``User`` and ``Post``.
+
+Write paths adjust them with single atomic ``UPDATE ... SET n = n + 1``
+statements; ``reconcile`` recomputes them in bulk from the relation tables
+to repair drift (deleted users, admin edits, ...).
+
+``toggle_follow`` / ``toggle_like`` flip the relation row and its counters
+in one transaction, only touching the counters when a row really changed,
+so concurrent double-taps can't double count.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from . import ranking
+from .models import Comment, Like, Post, User
+
+Follow = User.following.through
+
+
+def _increment(queryset, field, delta, **extra):
+    # Greatest evita underflow do PositiveIntegerField se o contador já estiver defasado
+    return queryset.update(**{field: Greatest(F(field) + delta, Value(0))}, **extra)
+
+
+def adjust_follow(follower_id, followee_id, delta):
+    _increment(User.objects.filter(pk=follower_id), 'following_count', delta)
+    _increment(User.objects.filter(pk=followee_id), 'followers_count', delta)
+
+
+# update() ignora auto_now: bump explícito pro Last-Modified/ETag do post.
+# O score do feed ranqueado vai no mesmo UPDATE.
+def adjust_likes(post_id, delta, liked_at=None):
+    # Descurtir devolve só o que sobrou da curtida depois do decaimento
+    weight = ranking.like_weight()
+    if liked_at is not None:
+        weight = ranking.decayed(weight, liked_at)
+    _increment(
+        Post.objects.filter(pk=post_id), 'likes_count', delta,
+        updated_at=timezone.now(), **ranking.engagement(delta * weight),
+    )
+
+
+def adjust_comments(post_id, delta):
+    _increment(
+        Post.objects.filter(pk=post_id), 'comments_count', delta,
+        updated_at=timezone.now(), **ranking.engagement(delta * ranking.comment_weight()),
+    )
+
+
+def _toggle(through, **row):
+    """
+    Delete ``row`` if it exists, otherwise insert it. Returns the change
+    actually applied: ``-1``, ``+1``, or ``0`` when a concurrent request
+    inserted the same row first.
+    """
+    deleted, _ = through.objects.filter(**row).delete()
+    if deleted:
+        return -1
+    return _insert(through, **row)
+
+
+def _insert(through, **row):
+    """Insert ``row``; ``1``, or ``0`` when a concurrent request inserted it first."""
+    try:
+        with transaction.atomic():  # Savepoint: o IntegrityError não invalida a transação externa
+            through.objects.create(**row)
+    except IntegrityError:
+        return 0
+    return 1
+
+
+def toggle_follow(follower_id, followee_id):
+    """Follow/unfollow; returns ``(is_following, delta)``."""
+    with transaction.atomic():
+        delta = _toggle(Follow, from_user_id=follower_id, to_user_id=followee_id)
+        if delta:
+            adjust_follow(follower_id, followee_id, delta)
+    return delta >= 0, delta
+
+
+def toggle_like(post_id, user_id):
+    """Like/unlike; returns ``(has_liked, delta)``."""
+    with transaction.atomic():
+        like = Like.objects.filter(post_id=post_id, user_id=user_id).values_list('pk', 'created_at').first()
+        if like is None:
+            delta, liked_at = _insert(Like, post_id=post_id, user_id=user_id), None
+        else:
+            # 0 se um unlike concorrente apagou a linha primeiro
+            delta, liked_at = -Like.objects.filter(pk=like[0]).delete()[0], like[1]
+        if delta:
+            adjust_likes(post_id, delta, liked_at)
+    return delta >= 0, delta
+
+
+def _count(model, fk):
+    counts = model.objects.filter(**{fk: OuterRef('pk')}).order_by().values(fk).annotate(n=Count('*')).values('n')
+    return Coalesce(Subquery(counts), 0)
+
+
+COUNTERS = {
+    User: {
+        'followers_count': lambda: _count(Follow, 'to_user'),
+        'following_count': lambda: _count(Follow, 'from_user'),
+    },
+    Post: {
+        'likes_count': lambda: _count(Like, 'post'),
+        'comments_count': lambda: _count(Comment, 'post'),
+    },
+}
+
+
+def reconcile(model, field, batch_size=10000, dry_run=False):
+    """
+    Recompute ``model.field`` from its relation table in primary key batches
+    of ``batch_size`` and return how many rows had drifted.
+    """
+    expression = COUNTERS[model][field]
+    queryset = model.objects.order_by('pk')
+    drifted = 0
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk).values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return drifted
+        last_pk = batch[-1]
+        stale = model.objects.filter(pk__gte=batch[0], pk__lte=last_pk).annotate(
+            actual=expression()
+        ).exclude(**{field: F('actual')})
+        if dry_run:
+            drifted += stale.count()
+        else:
+            drifted += model.objects.filter(pk__in=list(stale.values_list('pk', flat=True))).update(
+                **{field: expression()}
+            )
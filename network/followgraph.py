@@ -0,0 +1,118 @@
+"""
+Compact follow graph and friends-of-friends ranking.
+
+``FollowGraph`` stores the follow table in CSR form: users are numbered
+``0..n-1`` in id order, ``offsets[i]:offsets[i + 1]`` is the slice of
+``targets`` holding the nodes user ``i`` follows, and ``in_degree`` counts
+followers. Everything lives in ``array`` buffers (8 bytes per edge), so a
+million-edge graph takes a few MB and pickles cheaply to worker processes.
+
+This module has no Django imports on purpose: ``compute_recommendations``
+ships the graph to a process pool and the workers only run the functions
+below.
+"""
+import heapq
+import math
+from array import array
+from collections import Counter
+
+POPULAR_POOL = 200
+
+
+def score(mutual_count, followers, popularity_weight):
+    """Mutual follows dominate; popularity (log of followers) breaks ties and ranks cold-start fillers."""
+    return mutual_count + popularity_weight * math.log1p(followers)
+
+
+def rank(candidates, k, popularity_weight, popular=(), exclude=()):
+    """
+    Top ``k`` ``(candidate_id, mutual_count, score)`` from ``(id, mutual_count,
+    followers)`` tuples, topped up from ``popular`` ``(id, followers)`` pairs
+    (most followed first) when there are fewer than ``k`` friends of friends.
+    """
+    scored = ((user_id, mutual, score(mutual, followers, popularity_weight)) for user_id, mutual, followers in candidates)
+    best = heapq.nsmallest(k, scored, key=lambda row: (-row[2], row[0]))
+    taken = {row[0] for row in best}
+    for user_id, followers in popular:
+        if len(best) >= k:
+            break
+        if user_id not in taken and user_id not in exclude:
+            best.append((user_id, 0, score(0, followers, popularity_weight)))
+            taken.add(user_id)
+    return best
+
+
+class FollowGraph:
+    def __init__(self, ids, offsets, targets):
+        self.ids = ids
+        self.offsets = offsets
+        self.targets = targets
+        self.in_degree = array('q', bytes(8 * len(ids)))
+        for target in targets:
+            self.in_degree[target] += 1
+        self._index()
+
+    def _index(self):
+        self.position = {user_id: node for node, user_id in enumerate(self.ids)}
+        popular = heapq.nlargest(POPULAR_POOL, range(len(self.ids)), key=self.in_degree.__getitem__)
+        self.popular = [(self.ids[node], self.in_degree[node]) for node in popular]
+
+    @classmethod
+    def from_edges(cls, user_ids, edges):
+        """Build from sorted ``user_ids`` and ``(from_id, to_id)`` edges ordered by ``from_id``."""
+        ids = array('q', user_ids)
+        position = {user_id: node for node, user_id in enumerate(ids)}
+        degree = array('q', bytes(8 * len(ids)))
+        targets = array('q')
+        for from_id, to_id in edges:
+            degree[position[from_id]] += 1
+            targets.append(position[to_id])
+        offsets = array('q', [0])
+        for count in degree:
+            offsets.append(offsets[-1] + count)
+        return cls(ids, offsets, targets)
+
+    def __getstate__(self):
+        # O dicionário id -> nó é refeito no processo que recebe o grafo
+        return {'ids': self.ids, 'offsets': self.offsets, 'targets': self.targets, 'in_degree': self.in_degree}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._index()
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    def following(self, node):
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def recommend(self, user_id, k, popularity_weight):
+        node = self.position[user_id]
+        followed = set(self.following(node))
+        mutual = Counter()
+        for followee in followed:
+            mutual.update(self.following(followee))
+        followed.add(node)
+        candidates = (
+            (self.ids[candidate], count, self.in_degree[candidate])
+            for candidate, count in mutual.items() if candidate not in followed
+        )
+        exclude = {self.ids[other] for other in followed}
+        return rank(candidates, k, popularity_weight, self.popular, exclude)
+
+
+_worker = {}
+
+
+def init_worker(graph, k, popularity_weight):
+    """``ProcessPoolExecutor`` initializer: the graph is unpickled once per process."""
+    _worker.update(graph=graph, k=k, popularity_weight=popularity_weight)
+
+
+def recommend_chunk(user_ids):
+    graph = _worker['graph']
+    return [(user_id, graph.recommend(user_id, _worker['k'], _worker['popularity_weight'])) for user_id in user_ids]
@@ -0,0 +1,103 @@
+import json
+import subprocess
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from network.benchmarks.drivers import Request, run_workload
+from network.benchmarks.fixtures import auth_headers, benchmark_database
+from network.benchmarks.graph import add_graph_arguments, generate_graph, graph_kwargs
+from network.models import Conversation, Post, User
+
+DEFAULT_MIX = 'feed=4,like=2,toggle_follow=1,conversations=2'
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de carga em processo: gera um grafo sintético num banco de teste descartável e dispara '
+        'feed, like, toggle_follow e conversations em paralelo. Imprime JSON com p50/p95/p99, vazão e '
+        'queries por requisição, pra comparar entre commits.'
+    )
+
+    def add_arguments(self, parser):
+        add_graph_arguments(parser)
+        parser.add_argument('--requests', type=int, default=500, help='Total de requisições.')
+        parser.add_argument('--concurrency', type=int, default=8, help='Clientes simultâneos (threads).')
+        parser.add_argument('--clients', type=int, default=50, help='Usuários distintos fazendo as requisições.')
+        parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Pesos dos cenários (padrão: {DEFAULT_MIX}).')
+        parser.add_argument('--output', help='Também grava o JSON neste arquivo.')
+
+    def parse_mix(self, mix):
+        try:
+            weights = {name: int(weight) for name, weight in (item.split('=') for item in mix.split(','))}
+        except ValueError:
+            raise CommandError(f'--mix inválido: {mix}')
+        unknown = set(weights) - {'feed', 'like', 'toggle_follow', 'conversations'}
+        if unknown:
+            raise CommandError(f"Cenário(s) desconhecido(s): {', '.join(sorted(unknown))}")
+        return weights
+
+    def handle(self, *args, **options):
+        weights = self.parse_mix(options['mix'])
+        with benchmark_database():
+            started = time.perf_counter()
+            graph = generate_graph(**graph_kwargs(options))
+            graph['elapsed_s'] = round(time.perf_counter() - started, 2)
+
+            # Quem mais segue (feed mais pesado) + quem tem conversas
+            readers = list(User.objects.order_by('-following_count').values_list('id', flat=True)[:options['clients']])
+            readers += list(Conversation.participants.through.objects.values_list('user_id', flat=True)[:options['clients']])
+            headers = {user.id: auth_headers(user) for user in User.objects.filter(id__in=readers)}
+            clients = list(headers)
+            post_ids = list(Post.objects.values_list('id', flat=True))
+            popular = list(User.objects.order_by('-followers_count').values_list('id', flat=True)[:100])
+
+            def feed(rng, user_id):
+                return Request('feed', 'get', '/api/posts/feed/', None, headers[user_id])
+
+            def like(rng, user_id):
+                return Request('like', 'post', f'/api/posts/{rng.choice(post_ids)}/like/', None, headers[user_id])
+
+            def toggle_follow(rng, user_id):
+                target = rng.choice([other for other in popular if other != user_id])
+                return Request('toggle_follow', 'post', f'/api/users/{target}/toggle_follow/', None, headers[user_id])
+
+            def conversations(rng, user_id):
+                return Request('conversations', 'get', '/api/conversations/', None, headers[user_id])
+
+            scenarios = {'feed': feed, 'like': like, 'toggle_follow': toggle_follow, 'conversations': conversations}
+            names = list(weights)
+
+            def make_request(rng):
+                name = rng.choices(names, weights=[weights[name] for name in names])[0]
+                return scenarios[name](rng, rng.choice(clients))
+
+            results = run_workload(make_request, options['requests'], options['concurrency'], seed=options['seed'])
+            report = {
+                'commit': current_commit(),
+                'database': connection.vendor,
+                'config': {
+                    'requests': options['requests'],
+                    'concurrency': options['concurrency'],
+                    'clients': len(clients),
+                    'mix': weights,
+                },
+                'graph': graph,
+                'results': results,
+            }
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+        self.stdout.write(output)
@@ -0,0 +1,48 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from network.benchmarks.drivers import run_async, run_sync
+from network.benchmarks.fixtures import auth_headers, benchmark_database, seed_small
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara a vazão concorrente dos endpoints de leitura: views DRF síncronas via social_api.wsgi '
+        '(threads) x /api/async/ via social_api.asgi (event loop, como o worker uvicorn do Procfile). '
+        'Chama os handlers reais sem socket/HTTP. Usa um banco de teste descartável.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requisições por endpoint e modo.')
+        parser.add_argument('--concurrency', type=int, default=20, help='Clientes simultâneos.')
+        parser.add_argument('--users', type=int, default=30)
+        parser.add_argument('--posts-per-user', type=int, default=10)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            viewer, friend, conversation = seed_small(users=options['users'], posts_per_user=options['posts_per_user'])
+            headers = auth_headers(viewer)
+            endpoints = {
+                'feed': '/posts/feed/',
+                'feed_top': '/posts/feed/?mode=top',
+                'posts': f'/posts/?author={friend.id}',
+                'user_detail': f'/users/{friend.id}/',
+                'conversations': '/conversations/',
+                'conversation': f'/conversations/{conversation.id}/',
+            }
+            results = {}
+            for name, path in endpoints.items():
+                results[name] = {
+                    'wsgi': run_sync([f'/api{path}'], headers, options['requests'], options['concurrency']),
+                    'asgi': run_async([f'/api/async{path}'], headers, options['requests'], options['concurrency']),
+                }
+        self.stdout.write(json.dumps({
+            'measures': (
+                'wsgi: social_api.wsgi.application chamado de N threads; asgi: social_api.asgi.application '
+                'com N tarefas num event loop. Handlers e middleware reais, sem servidor nem rede.'
+            ),
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'results': results,
+        }, indent=2))
@@ -0,0 +1,27 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from network.benchmarks.fixtures import benchmark_database
+from network.benchmarks.text import measure_search
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara a busca indexada (FTS5/tsvector) com icontains em tabelas de posts cada vez maiores, '
+        'num banco de teste descartável. Imprime JSON com a mediana por tamanho e o fator de crescimento.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,4000,16000,64000', help='Tamanhos da tabela de posts.')
+        parser.add_argument('--queries', type=int, default=30, help='Buscas medidas por tamanho.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError(f"--sizes inválido: {options['sizes']}")
+        with benchmark_database():
+            report = measure_search(sizes=sizes, queries=options['queries'], seed=options['seed'])
+        self.stdout.write(json.dumps(report, indent=2))
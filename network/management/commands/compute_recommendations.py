@@ -0,0 +1,62 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from network import followgraph, recommendations
+
+
+def _chunks(items, size):
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula as recomendações de quem seguir de todos os usuários: monta o grafo de follows em CSR '
+        'na memória, distribui os usuários entre processos e grava o top-K de cada um.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processos (1 = sem pool).')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Usuários por tarefa do pool.')
+        parser.add_argument(
+            '--top', type=int, default=getattr(settings, 'RECOMMENDATION_TOP_K', recommendations.DEFAULT_TOP_K),
+            help='Recomendações guardadas por usuário.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        graph = recommendations.load_graph()
+        loaded = time.perf_counter()
+        weight = getattr(settings, 'RECOMMENDATION_POPULARITY_WEIGHT', recommendations.DEFAULT_POPULARITY_WEIGHT)
+        initargs = (graph, options['top'], weight)
+        chunks = _chunks(graph.ids, options['chunk_size'])
+
+        stored = 0
+        if options['workers'] > 1:
+            # Cada processo recebe o grafo uma vez (initializer); as tarefas levam só ids
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=followgraph.init_worker, initargs=initargs) as pool:
+                for results in pool.map(followgraph.recommend_chunk, chunks):
+                    recommendations.store(results)
+                    stored += sum(len(ranked) for _, ranked in results)
+        else:
+            followgraph.init_worker(*initargs)
+            for chunk in chunks:
+                results = followgraph.recommend_chunk(chunk)
+                recommendations.store(results)
+                stored += sum(len(ranked) for _, ranked in results)
+
+        self.stdout.write(json.dumps({
+            'users': len(graph),
+            'edges': graph.edge_count,
+            'recommendations': stored,
+            'workers': options['workers'],
+            'load_s': round(loaded - started, 2),
+            'elapsed_s': round(time.perf_counter() - started, 2),
+        }, indent=2))
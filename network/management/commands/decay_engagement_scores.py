@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from network import ranking
+
+
+class Command(BaseCommand):
+    help = (
+        'Envelhece o score de engajamento de todos os posts num único UPDATE (feed ranqueado). '
+        'Agende a cada FEED_DECAY_INTERVAL_HOURS; --hours informa quanto tempo passou desde a última execução.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=float,
+            default=getattr(settings, 'FEED_DECAY_INTERVAL_HOURS', ranking.DEFAULT_DECAY_INTERVAL_HOURS),
+            help='Horas desde a última passada.',
+        )
+
+    def handle(self, *args, **options):
+        updated = ranking.decay(options['hours'])
+        self.stdout.write(self.style.SUCCESS(f"{updated} post(s) envelhecido(s) em {options['hours']}h."))
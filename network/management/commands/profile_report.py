@@ -0,0 +1,36 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from network.profiling import ProfileAggregate
+
+
+class Command(BaseCommand):
+    help = (
+        'Lê as linhas JSON do logger network.profiling (PROFILING_ENABLED) e mostra os endpoints mais '
+        'lentos e as queries repetidas (N+1) mais graves, somando todos os workers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('logfiles', nargs='+', help='Arquivos de log com as linhas do profiling.')
+        parser.add_argument('--top', type=int, default=10, help='Linhas por ranking.')
+
+    def handle(self, *args, **options):
+        aggregate = ProfileAggregate()
+        parsed = 0
+        for path in options['logfiles']:
+            try:
+                handle = open(path)
+            except OSError as exc:
+                raise CommandError(f'Não foi possível abrir {path}: {exc}')
+            with handle:
+                for line in handle:
+                    start = line.find('{"endpoint"')
+                    if start < 0:
+                        continue
+                    try:
+                        aggregate.add(json.loads(line[start:]))
+                    except (ValueError, KeyError):
+                        continue  # Linha truncada ou de outro formato
+                    parsed += 1
+        self.stdout.write(json.dumps({'requests': parsed, **aggregate.report(options['top'])}, indent=2))
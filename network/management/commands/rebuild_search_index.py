@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from network import search
+
+
+class Command(BaseCommand):
+    help = (
+        'Recria o índice de busca (GIN no Postgres, FTS5 + triggers no SQLite) a partir das tabelas. '
+        'Use se uma migração recriou network_post/network_user no SQLite e levou os triggers junto.'
+    )
+
+    def handle(self, *args, **options):
+        search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Índice de busca recriado.'))
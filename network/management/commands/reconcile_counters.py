@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from network import counters
+
+
+class Command(BaseCommand):
+    help = 'Recalcula em lote os contadores denormalizados (seguidores, seguindo, likes, comentários).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help='Linhas por lote de recálculo.')
+        parser.add_argument('--dry-run', action='store_true', help='Só conta as linhas defasadas, sem corrigir.')
+
+    def handle(self, *args, **options):
+        total = 0
+        for model, fields in counters.COUNTERS.items():
+            for field in fields:
+                drifted = counters.reconcile(model, field, batch_size=options['batch_size'], dry_run=options['dry_run'])
+                total += drifted
+                self.stdout.write(f'{model.__name__}.{field}: {drifted} defasado(s)')
+        verb = 'encontrado(s)' if options['dry_run'] else 'corrigido(s)'
+        self.stdout.write(self.style.SUCCESS(f'{total} contador(es) {verb}.'))
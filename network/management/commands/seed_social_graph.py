@@ -0,0 +1,23 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from network.benchmarks.graph import add_graph_arguments, generate_graph, graph_kwargs
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera um grafo social sintético com distribuição de lei de potência (usuários, follows, posts, '
+        'curtidas, comentários e conversas) no banco configurado, via bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        add_graph_arguments(parser)
+        parser.add_argument('--prefix', default='synth', help='Prefixo dos usernames gerados (precisa ser único no banco).')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        summary = generate_graph(prefix=options['prefix'], **graph_kwargs(options))
+        summary['elapsed_s'] = round(time.perf_counter() - started, 2)
+        self.stdout.write(json.dumps(summary, indent=2))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from network import timeline
+
+
+class Command(BaseCommand):
+    help = (
+        'Corta as timelines materializadas em TIMELINE_MAX_LENGTH entradas (as mais recentes ficam). '
+        'Agende periodicamente; o feed não lê além disso.'
+    )
+
+    def handle(self, *args, **options):
+        removed = timeline.get_backend().trim()
+        self.stdout.write(self.style.SUCCESS(f'{removed} entrada(s) de timeline removida(s).'))
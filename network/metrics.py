@@ -0,0 +1,308 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Served at ``/api/internal/metrics/`` (Bearer ``METRICS_TOKEN``). Collectors
+are built to stay on under full load: counters and histograms are split into
+a fixed number of ``SHARDS``, each a dict with its own lock, and every thread
+is assigned one shard round-robin the first time it writes. Threads rarely
+wait on each other, and because the number of shards is fixed, memory and
+scrape cost stay the same however many threads a worker starts (the ASGI
+server runs each sync request in a new thread). Shards are summed when the
+endpoint is scraped. Gauges hold one value per process. Values are per
+worker process; Prometheus aggregates across workers.
+
+``MetricsMiddleware`` works in both sync and async stacks. It counts SQL
+queries through an execute wrapper installed on every connection, which
+reports to a ``ContextVar``, so queries that async views run through
+``sync_to_async`` threads are counted for the request that issued them.
+"""
+import bisect
+import itertools
+import threading
+import time
+import weakref
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+SHARDS = 16
+
+REGISTRY = []
+
+_slot = threading.local()
+_next_slot = itertools.count()
+
+
+def _shard_index():
+    try:
+        return _slot.index
+    except AttributeError:
+        _slot.index = next(_next_slot) % SHARDS
+        return _slot.index
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)] + list(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY.append(self)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines += self.samples()
+        return '\n'.join(lines)
+
+
+class ShardedMetric(Metric):
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._shards = [({}, threading.Lock()) for _ in range(SHARDS)]
+
+    def _shard(self):
+        return self._shards[_shard_index()]
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    def _snapshots(self):
+        snapshots = []
+        for values, lock in self._shards:
+            with lock:
+                snapshots.append({labels: self._copy(value) for labels, value in values.items()})
+        return snapshots
+
+
+class Counter(ShardedMetric):
+    kind = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        values, lock = self._shard()
+        with lock:
+            values[labels] = values.get(labels, 0) + amount
+
+    def value(self, labels=()):
+        return sum(shard.get(labels, 0) for shard in self._snapshots())
+
+    def samples(self):
+        totals = {}
+        for shard in self._snapshots():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return [f'{self.name}{_labels(self.labelnames, labels)} {value}' for labels, value in sorted(totals.items())]
+
+
+class Histogram(ShardedMetric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, labels=()):
+        bucket = bisect.bisect_left(self.buckets, value)
+        values, lock = self._shard()
+        with lock:
+            state = values.get(labels)
+            if state is None:
+                state = values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bucket] += 1
+            state[1] += value
+            state[2] += 1
+
+    @staticmethod
+    def _copy(value):
+        counts, total, count = value
+        return [list(counts), total, count]
+
+    def samples(self):
+        totals = {}
+        for shard in self._snapshots():
+            for labels, (counts, total, count) in shard.items():
+                merged = totals.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+                merged[2] += count
+        lines = []
+        for labels, (counts, total, count) in sorted(totals.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                bucket_labels = _labels(self.labelnames, labels, [f'le="{le}"'])
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {round(total, 6)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+class Gauge(Metric):
+    """One value per label set for the whole process, either set directly or read from a function at scrape time."""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        self._function = None
+
+    def set(self, value, labels=()):
+        with self._lock:
+            self._values[labels] = value
+
+    def set_function(self, function):
+        """Report ``function()`` (no labels) at every scrape instead of a stored value."""
+        self._function = function
+
+    def value(self, labels=()):
+        if self._function is not None:
+            return self._function()
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def samples(self):
+        if self._function is not None:
+            return [f'{self.name} {self._function()}']
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f'{self.name}{_labels(self.labelnames, labels)} {value}' for labels, value in values]
+
+
+def render():
+    return '\n'.join(metric.render() for metric in REGISTRY) + '\n'
+
+
+request_latency = Histogram(
+    'social_http_request_duration_seconds', 'Latência das requisições por rota.', ['view', 'method'],
+)
+requests_total = Counter('social_http_requests_total', 'Requisições por rota e status.', ['view', 'method', 'status'])
+request_queries = Histogram(
+    'social_http_request_db_queries', 'Queries SQL por requisição.', ['view'], buckets=QUERY_BUCKETS,
+)
+db_connections_open = Gauge('social_db_connections_open', 'Conexões com o banco abertas neste processo.')
+db_connections_created = Counter('social_db_connections_created_total', 'Conexões novas com o banco (reuso baixo = CONN_MAX_AGE sem efeito).')
+cache_requests = Counter('social_representation_cache_requests_total', 'Buscas no cache de representações.', ['kind', 'result'])
+fanout_posts = Counter('social_timeline_fanout_posts_total', 'Posts entregues por modo de fan-out.', ['mode'])
+fanout_entries = Counter('social_timeline_entries_written_total', 'Entradas de timeline escritas.', ['source'])
+db_conn_max_age = Gauge('social_db_conn_max_age_seconds', 'CONN_MAX_AGE configurado (0 = conexão nova por requisição).')
+db_conn_max_age.set(settings.DATABASES['default'].get('CONN_MAX_AGE', 0) or 0)
+
+
+_request_queries = ContextVar('metrics_request_queries', default=None)
+_wrappers = weakref.WeakSet()
+_wrappers_lock = threading.Lock()
+
+
+def _count_query(execute, sql, params, many, context):
+    # sync_to_async copia o contexto pra thread: a contagem cai na requisição certa
+    queries = _request_queries.get()
+    if queries is not None:
+        queries[0] += 1
+    return execute(sql, params, many, context)
+
+
+def _install(connection):
+    if _count_query not in connection.execute_wrappers:
+        # No início da lista: execute_wrapper() de terceiros faz pop() do fim ao sair
+        connection.execute_wrappers.insert(0, _count_query)
+    with _wrappers_lock:
+        _wrappers.add(connection)
+
+
+def _track_connection(sender, connection, **kwargs):
+    db_connections_created.inc()
+    _install(connection)
+
+
+def _open_connections():
+    # Wrappers de threads que já terminaram são coletados e saem do WeakSet
+    with _wrappers_lock:
+        wrappers = list(_wrappers)
+    return sum(wrapper.connection is not None for wrapper in wrappers)
+
+
+connection_created.connect(_track_connection, dispatch_uid='network.metrics.connection_created')
+db_connections_open.set_function(_open_connections)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        # Conexões abertas antes deste módulo ser importado não passaram pelo sinal
+        for connection in connections.all(initialized_only=True):
+            _install(connection)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        queries = [0]
+        token = _request_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        self.record(request, response, time.perf_counter() - started, queries[0])
+        return response
+
+    async def __acall__(self, request):
+        queries = [0]
+        token = _request_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        self.record(request, response, time.perf_counter() - started, queries[0])
+        return response
+
+    @staticmethod
+    def record(request, response, elapsed, queries):
+        match = request.resolver_match
+        # URLs sem rota caem num rótulo só, pra não explodir a cardinalidade
+        view = match.view_name if match else 'unmatched'
+        request_latency.observe(elapsed, (view, request.method))
+        requests_total.inc((view, request.method, str(response.status_code)))
+        request_queries.observe(queries, (view,))
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. Needs ``Authorization: Bearer <METRICS_TOKEN>``;
+    without ``METRICS_TOKEN`` configured it answers 404.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        raise Http404
+    if not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
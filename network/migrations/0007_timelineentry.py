@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0006_conversation_message'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='fanout_on_read',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='network.post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='timeline_user_recent_idx'), models.Index(fields=['user', 'author'], name='timeline_user_author_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'post'), name='unique_timeline_entry')],
+            },
+        ),
+        # Materializa as timelines a partir dos follows e posts existentes
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO network_timelineentry (user_id, post_id, author_id, created_at)
+                SELECT f.from_user_id, p.id, p.author_id, p.created_at
+                FROM network_user_following f
+                JOIN network_post p ON p.author_id = f.to_user_id
+                UNION ALL
+                SELECT p.author_id, p.id, p.author_id, p.created_at
+                FROM network_post p
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
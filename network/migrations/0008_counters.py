@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0007_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        # Preenche os contadores a partir das tabelas de relação
+        migrations.RunSQL(
+            sql=[
+                """
+                UPDATE network_user SET
+                    followers_count = (SELECT COUNT(*) FROM network_user_following f WHERE f.to_user_id = network_user.id),
+                    following_count = (SELECT COUNT(*) FROM network_user_following f WHERE f.from_user_id = network_user.id)
+                """,
+                """
+                UPDATE network_post SET
+                    likes_count = (SELECT COUNT(*) FROM network_post_likes l WHERE l.post_id = network_post.id),
+                    comments_count = (SELECT COUNT(*) FROM network_comment c WHERE c.post_id = network_post.id)
+                """,
+            ],
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0008_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='network.message'),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE network_conversation SET last_message_id = (
+                    SELECT m.id FROM network_message m
+                    WHERE m.conversation_id = network_conversation.id
+                    ORDER BY m.created_at DESC, m.id DESC
+                    LIMIT 1
+                )
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0009_conversation_last_message'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunSQL(
+            sql="UPDATE network_post SET updated_at = created_at",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
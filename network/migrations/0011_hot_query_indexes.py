@@ -0,0 +1,66 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:28
+
+from django.db import migrations, models
+
+
+def backfill_direct_keys(apps, schema_editor):
+    Conversation = apps.get_model('network', 'Conversation')
+    Participant = Conversation.participants.through
+    participants = {}
+    for conversation_id, user_id in Participant.objects.values_list('conversation_id', 'user_id'):
+        participants.setdefault(conversation_id, []).append(user_id)
+
+    seen = set()
+    # A conversa mais antiga de cada par fica com a chave; duplicatas antigas (corrida) ficam sem
+    for conversation_id in sorted(participants):
+        users = participants[conversation_id]
+        if len(users) != 2:
+            continue
+        key = '{}:{}'.format(*sorted(users))
+        if key not in seen:
+            seen.add(key)
+            Conversation.objects.filter(pk=conversation_id).update(direct_key=key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0010_post_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='direct_key',
+            field=models.CharField(blank=True, editable=False, max_length=41, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-created_at', '-id'], name='comment_post_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['-updated_at', '-id'], name='conversation_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'created_at', 'id'], name='message_conversation_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['conversation', 'author'], name='message_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='post_author_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('fanout_on_read', True)), fields=['author', '-created_at'], name='post_fanout_read_idx'),
+        ),
+        migrations.RunPython(backfill_direct_keys, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(fields=('direct_key',), name='unique_direct_conversation'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:40
+
+from django.db import migrations
+
+from network import search
+
+
+def create_search_index(apps, schema_editor):
+    # GIN (Postgres) ou FTS5 + triggers (SQLite); outros bancos usam icontains
+    search.install_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    search.drop_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0011_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
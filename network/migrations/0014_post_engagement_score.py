@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:51
+
+from django.db import migrations, models
+from django.utils import timezone
+
+from network import search
+
+# Valores de network.ranking na época desta migração
+LIKE_WEIGHT, COMMENT_WEIGHT, HALF_LIFE_HOURS, SCORE_FLOOR = 1.0, 2.0, 12, 1e-3
+
+
+def backfill_engagement_scores(apps, schema_editor):
+    # Como se cada post tivesse sido pontuado desde a criação (curtidas/comentários contados no início)
+    Post = apps.get_model('network', 'Post')
+    now = timezone.now()
+    batch = []
+    for post in Post.objects.only('id', 'likes_count', 'comments_count', 'created_at').iterator(chunk_size=2000):
+        age_hours = max((now - post.created_at).total_seconds() / 3600, 0)
+        score = (1.0 + post.likes_count * LIKE_WEIGHT + post.comments_count * COMMENT_WEIGHT) * 0.5 ** (age_hours / HALF_LIFE_HOURS)
+        post.engagement_score = score if score >= SCORE_FLOOR else 0.0
+        batch.append(post)
+        if len(batch) >= 2000:
+            Post.objects.bulk_update(batch, ['engagement_score'])
+            batch = []
+    Post.objects.bulk_update(batch, ['engagement_score'])
+
+
+def reinstall_search_index(apps, schema_editor):
+    # No SQLite o AddField recria network_post e os triggers do FTS5 vão junto
+    search.install_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0013_follow_recommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='engagement_score',
+            field=models.FloatField(default=1.0),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-engagement_score', '-id'], name='post_engagement_idx'),
+        ),
+        migrations.RunPython(reinstall_search_index, migrations.RunPython.noop),
+        migrations.RunPython(backfill_engagement_scores, migrations.RunPython.noop),
+    ]
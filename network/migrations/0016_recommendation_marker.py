@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0015_hashtags'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='followrecommendation',
+            name='candidate',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:31
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0016_recommendation_marker'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_engagement_idx',
+        ),
+    ]
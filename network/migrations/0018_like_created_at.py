@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:32
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Turns the implicit ``Post.likes`` through table into the ``Like`` model
+    in place (same table, columns and unique constraint), then adds
+    ``created_at``. Existing likes get the migration time.
+    """
+
+    dependencies = [
+        ('network', '0017_remove_post_engagement_idx'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='Like',
+                    fields=[
+                        ('id', models.AutoField(primary_key=True, serialize=False)),
+                        ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='network.post')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'network_post_likes',
+                        'unique_together': {('post', 'user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='post',
+                    name='likes',
+                    field=models.ManyToManyField(blank=True, related_name='liked_posts', through='network.Like', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='like',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
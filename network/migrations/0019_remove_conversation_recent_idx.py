@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:50
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0018_like_created_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='conversation',
+            name='conversation_recent_idx',
+        ),
+    ]
@@ -1,8 +1,25 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 from cloudinary.models import CloudinaryField
 
-class User(AbstractUser):
+class CounterFieldsMixin:
+    """
+    Denormalized counters are only changed with atomic ``F()`` updates
+    (see ``network.counters``). A plain ``save()`` of an existing row skips
+    them so a stale in-memory value never overwrites a concurrent increment.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+class User(CounterFieldsMixin, AbstractUser):
     bio = models.TextField(max_length=500, blank=True)
     profile_picture = CloudinaryField(
         'image', 
@@ -12,6 +29,10 @@ class User(AbstractUser):
         transformation=[{'width': 300, 'height': 300, 'crop': 'fill', 'gravity': 'auto'}]
     )
     following = models.ManyToManyField('self', symmetrical=False, related_name='followers', blank=True)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    counter_fields = ('followers_count', 'following_count')
     
     def __str__(self):
         return self.username
@@ -19,14 +40,106 @@ class User(AbstractUser):
     class Meta:
         app_label = 'network'
 
-class Post(models.Model):
+class Post(CounterFieldsMixin, models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
     content = models.TextField(max_length=280)
     created_at = models.DateTimeField(auto_now_add=True)
-    likes = models.ManyToManyField(User, related_name='liked_posts', blank=True)
+    updated_at = models.DateTimeField(auto_now=True)  # Edição ou mudança de contadores (ETag/Last-Modified)
+    likes = models.ManyToManyField(User, through='Like', related_name='liked_posts', blank=True)
+    fanout_on_read = models.BooleanField(default=False)  # Autor com muitos seguidores: entregue na leitura do feed
+    likes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    engagement_score = models.FloatField(default=1.0)  # Curtidas/comentários com decaimento no tempo (network.ranking)
+
+    counter_fields = ('likes_count', 'comments_count', 'engagement_score')
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Perfil (?author=) paginado por (created_at, id)
+            models.Index(fields=['author', '-created_at', '-id'], name='post_author_recent_idx'),
+            # Feed: posts de autores com fan-out na leitura (poucas linhas)
+            models.Index(
+                fields=['author', '-created_at'], name='post_fanout_read_idx', condition=models.Q(fanout_on_read=True)
+            ),
+        ]
+
+class Like(models.Model):
+    """
+    ``user`` liked ``post``. Keeps the table of the former implicit
+    ``Post.likes`` through model; ``created_at`` lets an unlike take back
+    only what is left of the like's decayed score (``network.ranking``).
+    """
+    id = models.AutoField(primary_key=True)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'network_post_likes'
+        unique_together = [('post', 'user')]
+
+class TimelineEntry(models.Model):
+    """
+    Materialized home timeline row: ``post`` is delivered to ``user``'s feed.
+    Written on post creation (fan-out on write) and on follow/unfollow.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')  # Pra podar no unfollow sem join
+    created_at = models.DateTimeField()  # Copiado do post pra ordenar sem join
 
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='timeline_user_recent_idx'),
+            models.Index(fields=['user', 'author'], name='timeline_user_author_idx'),
+        ]
+
+class FollowRecommendation(models.Model):
+    """
+    Precomputed "who to follow" entry: ``candidate`` is followed by
+    ``mutual_count`` of the people ``user`` follows. Rebuilt in bulk by
+    ``compute_recommendations`` and per user when their follows change.
+    A row without ``candidate`` marks when ``user``'s list was computed.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recommendations')
+    candidate = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', null=True)  # NULL: marcador
+    mutual_count = models.PositiveIntegerField(default=0)
+    score = models.FloatField()
+    computed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'candidate'], name='unique_recommendation'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-score'], name='recommendation_rank_idx'),
+        ]
+
+class Hashtag(models.Model):
+    name = models.CharField(max_length=64, unique=True)  # Minúsculo, sem o #
+
+    def __str__(self):
+        return f'#{self.name}'
+
+class PostHashtag(models.Model):
+    """Hashtag used in a post, extracted when the post is created or edited."""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='post_hashtags')
+    hashtag = models.ForeignKey(Hashtag, on_delete=models.CASCADE, related_name='post_hashtags')
+    created_at = models.DateTimeField()  # Copiado do post pra listar/contar por período sem join
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'hashtag'], name='unique_post_hashtag'),
+        ]
+        indexes = [
+            models.Index(fields=['hashtag', '-created_at'], name='hashtag_recent_idx'),
+            models.Index(fields=['created_at'], name='post_hashtag_created_idx'),
+        ]
 
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
@@ -36,6 +149,9 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['post', '-created_at', '-id'], name='comment_post_recent_idx'),
+        ]
 
     def __str__(self):
         return f'Comentário de {self.author.username} no post {self.post.id}'
@@ -44,9 +160,20 @@ class Conversation(models.Model):
     participants = models.ManyToManyField(User, related_name='conversations')  # Relaciona com User
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)  # Pra ordenar por atividade recente
+    last_message = models.ForeignKey('Message', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')  # Denormalizado pra inbox
+    direct_key = models.CharField(max_length=41, null=True, blank=True, editable=False)  # "<menor id>:<maior id>" em conversas 1:1
 
     class Meta:
         ordering = ['-updated_at']
+        constraints = [
+            models.UniqueConstraint(fields=['direct_key'], name='unique_direct_conversation'),
+        ]
+
+    @staticmethod
+    def direct_key_for(user_id, other_user_id):
+        """Canonical key of the 1:1 conversation between two users, independent of order."""
+        low, high = sorted((int(user_id), int(other_user_id)))
+        return f'{low}:{high}'
 
     def __str__(self):
         return f"Conversa {self.id} - {', '.join([p.username for p in self.participants.all()[:2]])}"
@@ -60,6 +187,13 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['conversation', 'created_at', 'id'], name='message_conversation_idx'),
+            # Contagem de não lidas da inbox só visita mensagens pendentes
+            models.Index(
+                fields=['conversation', 'author'], name='message_unread_idx', condition=models.Q(is_read=False)
+            ),
+        ]
 
     def __str__(self):
         return f"Msg de {self.author.username}: {self.content[:50]}"
\ No newline at end of file
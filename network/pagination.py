@@ -0,0 +1,182 @@
+"""
+Keyset (cursor) pagination for the list endpoints.
+
+Pages are selected with ``WHERE (created_at, id) < (:c, :i)`` style filters
+over the queryset ordering instead of ``OFFSET``, so response size and query
+time stay the same no matter how deep the client scrolls.
+"""
+import base64
+import json
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+Cursor = namedtuple('Cursor', ['values', 'reverse'])
+
+
+def _invert(field):
+    return field[1:] if field.startswith('-') else f'-{field}'
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginates on the view's ``keyset_ordering`` (or the model's
+    ``Meta.ordering``) with ``id`` appended as a tiebreaker.
+
+    ``?cursor=`` carries an opaque, base64-encoded position and ``?limit=``
+    sets the page size. With ``start_from_end`` the first page is the tail of
+    the ordering (e.g. the newest messages of a chat) and ``previous`` walks
+    backwards from there.
+    """
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    invalid_cursor_message = 'Cursor inválido'
+
+    def __init__(self, start_from_end=False):
+        self.start_from_end = start_from_end
+
+    def get_ordering(self, queryset, view=None):
+        ordering = list(getattr(view, 'keyset_ordering', None) or queryset.model._meta.ordering)
+        if ordering[-1].lstrip('-') not in ('id', 'pk'):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return ordering
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, values, reverse):
+        payload = json.dumps({'v': values, 'r': reverse}, default=str, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return Cursor(None, True) if self.start_from_end else None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values = payload['v']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            fields = [queryset.model._meta.get_field(f.lstrip('-')) for f in self.ordering]
+            values = [field.to_python(value) for field, value in zip(fields, values)]
+            return Cursor(values, bool(payload['r']))
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def keyset_filter(self, ordering, values):
+        # (a, b) < (x, y)  =>  a < x OR (a = x AND b < y)
+        condition = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            clause = Q(**{f'{name}__{lookup}': values[index]})
+            for previous, value in zip(ordering[:index], values[:index]):
+                clause &= Q(**{previous.lstrip('-'): value})
+            condition |= clause
+        return condition
+
+    def position(self, item):
+        return [getattr(item, field.lstrip('-')) for field in self.ordering]
+
+    def _prepare(self, queryset, request, view):
+        self.request = request
+        self.ordering = self.get_ordering(queryset, view)
+        self.cursor = self.decode_cursor(request, queryset)
+        self.reverse = bool(self.cursor and self.cursor.reverse)
+        return self.get_page_size(request)
+
+    def window(self, queryset, request, view=None):
+        """
+        ``(position, reverse, page_size)`` of the page ``request`` asks for,
+        without running a query, so a view can bound its candidate rows first.
+        """
+        page_size = self._prepare(queryset, request, view)
+        return (self.cursor.values if self.cursor else None), self.reverse, page_size
+
+    def _page_queryset(self, queryset, request, view):
+        page_size = self._prepare(queryset, request, view)
+        ordering = [_invert(field) for field in self.ordering] if self.reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor and self.cursor.values is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, self.cursor.values))
+        return queryset[:page_size + 1], page_size
+
+    def page_queryset(self, queryset, request, view=None):
+        """The sliced queryset ``paginate_queryset`` would evaluate, look-ahead row included."""
+        return self._page_queryset(queryset, request, view)[0]
+
+    def _set_page(self, results, page_size):
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        came_from_position = bool(self.cursor and self.cursor.values is not None)
+        if self.reverse:
+            results.reverse()
+            self.has_next, self.has_previous = came_from_position, has_more
+        else:
+            self.has_next, self.has_previous = has_more, came_from_position
+
+        self.page = results
+        return results
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset, page_size = self._page_queryset(queryset, request, view)
+        return self._set_page(list(queryset), page_size)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Same as ``paginate_queryset`` but fetching the page with the async ORM."""
+        queryset, page_size = self._page_queryset(queryset, request, view)
+        return self._set_page([item async for item in queryset], page_size)
+
+    def _link(self, item, reverse):
+        url = remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.position(item), reverse))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self._link(self.page[0], reverse=True)
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {'name': self.cursor_query_param, 'required': False, 'in': 'query',
+             'description': 'Cursor opaco retornado em next/previous', 'schema': {'type': 'string'}},
+            {'name': self.page_size_query_param, 'required': False, 'in': 'query',
+             'description': f'Itens por página (máx. {self.max_page_size})', 'schema': {'type': 'integer'}},
+        ]
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,256 @@
+"""
+Opt-in per-request profiling, enabled with ``PROFILING_ENABLED``.
+
+For a ``PROFILING_SAMPLE_RATE`` fraction of requests, ``ProfilingMiddleware``
+records database query count and time, repeated query fingerprints (the
+N+1 signature), serializer time and Cloudinary time (API calls and URL
+building). The numbers go out three ways:
+
+- a ``Server-Timing`` response header, readable in browser dev tools;
+- one JSON log line on the ``network.profiling`` logger;
+- an in-process aggregate of the slowest endpoints and worst N+1
+  offenders, served to staff at ``/api/debug/profile/``.
+
+``manage.py profile_report`` builds the same report from the log lines,
+which covers every worker process. The middleware works in sync and async
+stacks; like ``network.metrics`` it collects queries through an execute
+wrapper installed on every connection that reports to the request's
+``ContextVar``, so queries async views run in ``sync_to_async`` threads
+count too.
+"""
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('network.profiling')
+
+_current = ContextVar('network_profile', default=None)
+
+_IN_LIST = re.compile(r'\((?:%s, )+%s\)')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def fingerprint(sql):
+    """Normalize ``sql`` so repeats of the same statement with other values match."""
+    sql = _IN_LIST.sub('(...)', sql)
+    return ' '.join(_LITERAL.sub('?', sql).split())
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.elapsed_ms = None
+        self.queries = 0
+        self.db_ms = 0.0
+        self.fingerprints = Counter()
+        self.timings = defaultdict(float)
+        self.depth = defaultdict(int)
+        self._lock = threading.Lock()  # Threads do sync_to_async escrevem no mesmo perfil
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.db_ms += elapsed
+                self.queries += 1
+                self.fingerprints[fingerprint(sql)] += 1
+
+    def finish(self):
+        self.elapsed_ms = (time.perf_counter() - self.started) * 1000
+
+    def duplicates(self):
+        return {sql: count for sql, count in self.fingerprints.most_common() if count > 1}
+
+    def server_timing(self):
+        metrics = [f'db;dur={self.db_ms:.1f};desc="{self.queries} queries"']
+        metrics += [f'{name};dur={duration:.1f}' for name, duration in sorted(self.timings.items())]
+        metrics.append(f'total;dur={self.elapsed_ms:.1f}')
+        return ', '.join(metrics)
+
+    def as_record(self, request, response):
+        match = request.resolver_match
+        return {
+            'endpoint': match.view_name if match else request.path,
+            'method': request.method,
+            'status': response.status_code,
+            'total_ms': round(self.elapsed_ms, 2),
+            'db_ms': round(self.db_ms, 2),
+            'queries': self.queries,
+            **{f'{name}_ms': round(duration, 2) for name, duration in sorted(self.timings.items())},
+            'duplicates': self.duplicates(),
+        }
+
+
+def _timed(bucket, func):
+    """Add ``func``'s time to the current profile; nested calls count once."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = _current.get()
+        if profile is None or profile.depth[bucket]:
+            return func(*args, **kwargs)
+        profile.depth[bucket] += 1
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.timings[bucket] += (time.perf_counter() - started) * 1000
+            profile.depth[bucket] -= 1
+    wrapper.profiled = True
+    return wrapper
+
+
+def _instrument(owner, name, bucket):
+    original = getattr(owner, name)
+    if isinstance(original, property):
+        if not getattr(original.fget, 'profiled', False):
+            setattr(owner, name, property(_timed(bucket, original.fget)))
+    elif not getattr(original, 'profiled', False):
+        setattr(owner, name, _timed(bucket, original))
+
+
+def install_hooks():
+    """Wrap serializer output and Cloudinary calls; idempotent."""
+    from cloudinary import CloudinaryResource, api, uploader
+    from rest_framework.serializers import BaseSerializer
+
+    # Serializer.data e ListSerializer.data passam por BaseSerializer.data
+    _instrument(BaseSerializer, 'data', 'serializer')
+    _instrument(uploader, 'call_api', 'cloudinary')
+    _instrument(api, 'call_api', 'cloudinary')
+    _instrument(CloudinaryResource, 'build_url', 'cloudinary')
+
+
+def _profile_query(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile.execute_wrapper(execute, sql, params, many, context)
+
+
+def _install(connection):
+    if _profile_query not in connection.execute_wrappers:
+        # No início da lista: execute_wrapper() de terceiros faz pop() do fim ao sair
+        connection.execute_wrappers.insert(0, _profile_query)
+
+
+def _track_connection(sender, connection, **kwargs):
+    _install(connection)
+
+
+class ProfileAggregate:
+    """Per-endpoint totals of profiled requests, for the slowest/N+1 report."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+
+    def add(self, record):
+        with self._lock:
+            stats = self.endpoints.setdefault(record['endpoint'], {
+                'requests': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'queries': 0, 'max_queries': 0, 'duplicates': Counter(),
+            })
+            stats['requests'] += 1
+            stats['total_ms'] += record['total_ms']
+            stats['max_ms'] = max(stats['max_ms'], record['total_ms'])
+            stats['queries'] += record['queries']
+            stats['max_queries'] = max(stats['max_queries'], record['queries'])
+            for sql, count in record['duplicates'].items():
+                stats['duplicates'][sql] = max(stats['duplicates'][sql], count)
+
+    def clear(self):
+        with self._lock:
+            self.endpoints.clear()
+
+    def report(self, top=10):
+        with self._lock:
+            endpoints = {name: dict(stats, duplicates=Counter(stats['duplicates'])) for name, stats in self.endpoints.items()}
+        slowest = sorted((
+            {
+                'endpoint': name,
+                'requests': stats['requests'],
+                'mean_ms': round(stats['total_ms'] / stats['requests'], 2),
+                'max_ms': round(stats['max_ms'], 2),
+                'mean_queries': round(stats['queries'] / stats['requests'], 2),
+                'max_queries': stats['max_queries'],
+            }
+            for name, stats in endpoints.items()
+        ), key=lambda row: row['mean_ms'], reverse=True)
+        offenders = sorted((
+            {'endpoint': name, 'repeats': count, 'sql': sql}
+            for name, stats in endpoints.items() for sql, count in stats['duplicates'].items()
+        ), key=lambda row: row['repeats'], reverse=True)
+        return {'slowest': slowest[:top], 'n_plus_one': offenders[:top]}
+
+
+aggregate = ProfileAggregate()
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        install_hooks()
+        connection_created.connect(_track_connection, dispatch_uid='network.profiling.connection_created')
+        for connection in connections.all(initialized_only=True):
+            _install(connection)
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def sampled():
+        return random.random() < getattr(settings, 'PROFILING_SAMPLE_RATE', 1.0)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, profile)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, profile)
+
+    @staticmethod
+    def record(request, response, profile):
+        profile.finish()
+        record = profile.as_record(request, response)
+        response['Server-Timing'] = profile.server_timing()
+        logger.info(json.dumps(record))
+        aggregate.add(record)
+        return response
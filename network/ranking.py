@@ -0,0 +1,94 @@
+"""
+Time-decayed engagement score for the ranked feed (``posts/feed/?mode=top``).
+
+``Post.engagement_score`` is a sum of events that each decay exponentially
+with ``FEED_SCORE_HALF_LIFE_HOURS``: the post itself starts at
+``NEW_POST_SCORE``, and each like/comment adds its weight, applied in the
+same ``UPDATE`` that bumps ``likes_count``/``comments_count``. An unlike
+takes back only the decayed remainder of its like (``Like.created_at``), so
+liking and unliking never sinks a post below its own score. ``decay``
+ages every live score in a single set-based ``UPDATE`` (``manage.py
+decay_engagement_scores``, run every ``FEED_DECAY_INTERVAL_HOURS``).
+Multiplying all scores by the same factor keeps their relative order.
+
+A ranked page ranks a bounded candidate set, never the whole timeline.
+``ranked_feed`` takes the newest ``FEED_RANKING_CANDIDATES`` feed posts of
+the last ``FEED_RANKING_WINDOW_DAYS``, using the same indexed timeline window
+as the chronological feed. The page orders those few rows by
+``(engagement_score, id)``.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import timeline
+from .models import Post
+
+NEW_POST_SCORE = 1.0
+DEFAULT_LIKE_WEIGHT = 1.0
+DEFAULT_COMMENT_WEIGHT = 2.0
+DEFAULT_HALF_LIFE_HOURS = 12
+DEFAULT_DECAY_INTERVAL_HOURS = 1
+DEFAULT_WINDOW_DAYS = 7
+DEFAULT_CANDIDATES = 500
+# Abaixo disso o score vira 0 e o post sai das próximas passadas de decaimento
+SCORE_FLOOR = 1e-3
+
+MODES = ('recent', 'top')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def like_weight():
+    return _setting('FEED_LIKE_WEIGHT', DEFAULT_LIKE_WEIGHT)
+
+
+def comment_weight():
+    return _setting('FEED_COMMENT_WEIGHT', DEFAULT_COMMENT_WEIGHT)
+
+
+def engagement(amount):
+    """``update()`` kwargs adding ``amount`` to the score (never below zero after decay)."""
+    return {'engagement_score': Greatest(F('engagement_score') + amount, Value(0.0))}
+
+
+def decay_factor(hours):
+    return 0.5 ** (hours / _setting('FEED_SCORE_HALF_LIFE_HOURS', DEFAULT_HALF_LIFE_HOURS))
+
+
+def decayed(weight, since):
+    """What is left now of ``weight`` added to a score at ``since``."""
+    hours = max((timezone.now() - since).total_seconds() / 3600, 0)
+    return weight * decay_factor(hours)
+
+
+def decay(hours=None):
+    """Age every non-zero score by ``hours``; returns the number of posts updated."""
+    if hours is None:
+        hours = _setting('FEED_DECAY_INTERVAL_HOURS', DEFAULT_DECAY_INTERVAL_HOURS)
+    factor = decay_factor(hours)
+    decayed = F('engagement_score') * factor
+    return Post.objects.filter(engagement_score__gt=0).update(engagement_score=Case(
+        When(engagement_score__lt=SCORE_FLOOR / factor, then=Value(0.0)),
+        default=decayed,
+        output_field=FloatField(),
+    ))
+
+
+def rescore(queryset):
+    """Set scores from the stored counters, as if every like and comment had just happened."""
+    return queryset.update(engagement_score=(
+        NEW_POST_SCORE + F('likes_count') * like_weight() + F('comments_count') * comment_weight()
+    ))
+
+
+def ranked_feed(user):
+    """Candidates for ``?mode=top``: the newest ``FEED_RANKING_CANDIDATES`` feed posts inside the ranking window."""
+    window = timedelta(days=_setting('FEED_RANKING_WINDOW_DAYS', DEFAULT_WINDOW_DAYS))
+    limit = _setting('FEED_RANKING_CANDIDATES', DEFAULT_CANDIDATES)
+    return timeline.feed_queryset(user, limit, since=timezone.now() - window)
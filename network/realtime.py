@@ -0,0 +1,172 @@
+"""
+In-process pub/sub for pushing events to connected clients (WebSocket).
+
+Write paths call ``publish`` from sync code; subscribers live on the ASGI
+event loop and receive events through bounded ``asyncio.Queue``s. The broker
+is pluggable through ``REALTIME_BROKER``; ``InMemoryBroker`` only reaches
+subscribers in the same process, so multi-worker deployments need a shared
+implementation (e.g. Redis pub/sub) of ``BaseBroker``.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .serializers import MessageSerializer
+
+DEFAULT_BROKER = 'network.realtime.InMemoryBroker'
+# Evento interno: o stream SSE reassina os canais e não repassa ao cliente
+FOLLOW_CHANGED = 'follow.changed'
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def author_channel(author_id):
+    # Posts de autores com fan-out na leitura: quem segue assina o canal do autor
+    return f'author:{author_id}'
+
+
+class BaseBroker:
+    """Interface a pub/sub broker must implement."""
+
+    def subscribe(self, channels):
+        """Return a ``Subscription`` receiving events published to ``channels``. Must be called on the event loop."""
+        raise NotImplementedError
+
+    def publish(self, channel, event):
+        """Deliver ``event`` (a JSON-serializable dict) to ``channel``. Safe to call from any thread."""
+        raise NotImplementedError
+
+
+class Subscription:
+    """Async iterator over the events delivered to a set of channels."""
+
+    def __init__(self, broker, channels, max_pending):
+        self.broker = broker
+        self.channels = tuple(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.closed = False
+
+    def deliver(self, event):
+        # Roda no loop da assinatura; cliente lento perde os eventos mais antigos
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.closed:
+            raise StopAsyncIteration
+        return await self.queue.get()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.broker.unsubscribe(self)
+
+
+class InMemoryBroker(BaseBroker):
+    max_pending = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels, self.max_pending)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscriptions.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[channel]
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscriptions.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:  # Loop já encerrado
+                subscription.close()
+        return len(subscribers)
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._subscriptions.get(channel, ()))
+
+
+_brokers = {}
+
+
+def get_broker():
+    path = getattr(settings, 'REALTIME_BROKER', DEFAULT_BROKER)
+    if path not in _brokers:
+        _brokers[path] = import_string(path)()
+    return _brokers[path]
+
+
+def publish_to_users(user_ids, event):
+    broker = get_broker()
+    for user_id in user_ids:
+        broker.publish(user_channel(user_id), event)
+
+
+def publish_message(message, recipient_ids):
+    """Push a newly sent ``Message`` to the other participants of its conversation."""
+    publish_to_users(recipient_ids, {
+        'type': 'message.created',
+        'conversation': message.conversation_id,
+        'message': MessageSerializer(message).data,
+    })
+
+
+def publish_post_created(post, follower_ids):
+    """
+    Announce a new post to its followers. ``follower_ids`` is the fan-out
+    list from ``timeline.fan_out_post``; high fan-out authors publish once to
+    their author channel instead.
+    """
+    event = {'type': 'post.created', 'post': post.id, 'author': post.author_id}
+    if post.fanout_on_read:
+        get_broker().publish(author_channel(post.author_id), event)
+    else:
+        publish_to_users(follower_ids, event)
+
+
+def publish_follow_changed(user_id, author_id, following):
+    """
+    Tell ``user_id``'s open streams that their follows changed, so they can
+    (un)subscribe the author channels of high fan-out authors.
+    """
+    publish_to_users([user_id], {'type': FOLLOW_CHANGED, 'author': author_id, 'following': following})
+
+
+def publish_post_liked(post, user, likes_count):
+    """Notify the post author that ``user`` liked it."""
+    if post.author_id != user.id:
+        publish_to_users([post.author_id], {
+            'type': 'post.liked', 'post': post.id, 'user': user.id, 'likes_count': likes_count,
+        })
+
+
+def publish_comment_created(comment):
+    """Notify the post author about a new comment on their post."""
+    if comment.post.author_id != comment.author_id:
+        publish_to_users([comment.post.author_id], {
+            'type': 'comment.created', 'post': comment.post_id, 'comment': comment.id, 'author': comment.author_id,
+        })
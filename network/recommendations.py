@@ -0,0 +1,177 @@
+"""
+"Who to follow": friends of friends ranked by mutual follows, with
+popularity (followers) as tiebreaker and as cold-start filler.
+
+Recommendations are served from ``FollowRecommendation`` rows, the top
+``RECOMMENDATION_TOP_K`` per user:
+
+- ``manage.py compute_recommendations`` rebuilds every user's rows from an
+  in-memory CSR graph (``network.followgraph``) across a process pool;
+- ``toggle_follow_user`` updates the follower's stored list from the
+  delta alone (``apply_follow``). A follow adds one mutual to every stored
+  candidate the new followee follows and brings in the best of the others,
+  and an unfollow removes one. Only the affected candidates are queried, so
+  the list is never recomputed from scratch;
+- a list whose marker is older than ``RECOMMENDATION_MAX_AGE`` is
+  recomputed on read, which is how follows made by *other* users (changing
+  someone's mutual counts) reach lists between batch runs.
+
+Every stored list has a marker row (``candidate`` NULL) whose
+``computed_at`` is the time of the last full computation. That's how a user
+with no candidates at all is told apart from one who was never computed.
+"""
+import heapq
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BooleanField, Count, ExpressionWrapper, F, Q, Subquery
+from django.db.models.functions import Coalesce, Ln
+from django.utils import timezone
+
+from . import followgraph
+from .models import FollowRecommendation, User
+
+Follow = User.following.through
+
+DEFAULT_TOP_K = 50
+DEFAULT_POPULARITY_WEIGHT = 0.5
+DEFAULT_MAX_AGE = 24 * 60 * 60
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _followed(user_id):
+    return Follow.objects.filter(from_user_id=user_id).values('to_user_id')
+
+
+def load_graph(batch_size=10000):
+    """CSR snapshot of the whole follow table."""
+    user_ids = User.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=batch_size)
+    edges = Follow.objects.order_by('from_user_id', 'to_user_id').values_list('from_user_id', 'to_user_id')
+    return followgraph.FollowGraph.from_edges(user_ids, edges.iterator(chunk_size=batch_size))
+
+
+def _mutual_rows(user_id, k, among=None):
+    """
+    ``(candidate_id, mutual_count, followers)`` of the ``k`` best friends of
+    friends of ``user_id`` (only those in the ``among`` ids/subquery when given).
+    """
+    weight = _setting('RECOMMENDATION_POPULARITY_WEIGHT', DEFAULT_POPULARITY_WEIGHT)
+    # Quem as pessoas que sigo seguem, agregado e ordenado no banco
+    rows = Follow.objects.filter(from_user_id__in=_followed(user_id))
+    if among is not None:
+        rows = rows.filter(to_user_id__in=among)
+    return list(
+        rows.exclude(to_user_id__in=_followed(user_id)).exclude(to_user_id=user_id)
+        .values('to_user_id', 'to_user__followers_count').annotate(mutual=Count('*'))
+        .order_by((F('mutual') + weight * Ln(F('to_user__followers_count') + 1)).desc(), 'to_user_id')
+        .values_list('to_user_id', 'mutual', 'to_user__followers_count')[:k]
+    )
+
+
+def compute_for_user(user_id, k=None):
+    """``(candidate_id, mutual_count, score)`` for one user, straight from the database."""
+    k = k or _setting('RECOMMENDATION_TOP_K', DEFAULT_TOP_K)
+    weight = _setting('RECOMMENDATION_POPULARITY_WEIGHT', DEFAULT_POPULARITY_WEIGHT)
+    candidates = _mutual_rows(user_id, k)
+    popular = ()
+    if len(candidates) < k:
+        popular = (
+            User.objects.exclude(pk=user_id).exclude(pk__in=_followed(user_id))
+            .exclude(pk__in=[candidate for candidate, _, _ in candidates])
+            .order_by('-followers_count', 'id').values_list('id', 'followers_count')[:k - len(candidates)]
+        )
+    return followgraph.rank(candidates, k, weight, popular)
+
+
+def _rows(user_id, ranked):
+    return [
+        FollowRecommendation(user_id=user_id, candidate_id=candidate, mutual_count=mutual, score=score)
+        for candidate, mutual, score in ranked
+    ]
+
+
+def store(results, batch_size=2000):
+    """Replace the rows (and marker) of every ``(user_id, ranked)`` pair in ``results``."""
+    with transaction.atomic():
+        FollowRecommendation.objects.filter(user_id__in=[user_id for user_id, _ in results]).delete()
+        FollowRecommendation.objects.bulk_create([
+            row for user_id, ranked in results
+            for row in [FollowRecommendation(user_id=user_id, candidate=None, score=0)] + _rows(user_id, ranked)
+        ], batch_size=batch_size)
+
+
+def _cutoff():
+    return timezone.now() - timedelta(seconds=_setting('RECOMMENDATION_MAX_AGE', DEFAULT_MAX_AGE))
+
+
+def apply_follow(user_id, target_id, following):
+    """
+    Update ``user_id``'s stored list after they followed (``following``) or
+    unfollowed ``target_id``, from the toggle delta. The marker keeps its
+    ``computed_at``, so the list still gets a full recomputation once it ages.
+    Without a fresh list there is nothing to update: the next read computes one.
+    """
+    stored = list(
+        FollowRecommendation.objects.filter(user_id=user_id).values_list('candidate_id', 'mutual_count', 'score', 'computed_at')
+    )
+    if not any(candidate is None and computed_at >= _cutoff() for candidate, _, _, computed_at in stored):
+        return
+    k = _setting('RECOMMENDATION_TOP_K', DEFAULT_TOP_K)
+    weight = _setting('RECOMMENDATION_POPULARITY_WEIGHT', DEFAULT_POPULARITY_WEIGHT)
+    # candidato -> (em comum, parte do score que vem da popularidade)
+    candidates = {candidate: (mutual, score - mutual) for candidate, mutual, score, _ in stored if candidate is not None}
+    # Quem o (des)seguido segue ganha/perde um em comum
+    changed = Follow.objects.filter(from_user_id=target_id, to_user_id__in=list(candidates)).values_list('to_user_id', flat=True)
+    for candidate in changed:
+        mutual, popularity = candidates[candidate]
+        candidates[candidate] = (mutual + (1 if following else -1), popularity)
+    if following:
+        candidates.pop(target_id, None)
+        # Os que ainda não estavam na lista: contagem exata dos k melhores
+        followees = Follow.objects.filter(from_user_id=target_id).exclude(to_user_id__in=list(candidates)).values('to_user_id')
+        for candidate, mutual, followers in _mutual_rows(user_id, k, among=followees):
+            candidates[candidate] = (mutual, weight * math.log1p(followers))
+    else:
+        # Quem deixou de ser seguido volta a ser candidato (nem que seja só pela popularidade)
+        mutual = Follow.objects.filter(to_user_id=target_id, from_user_id__in=_followed(user_id)).values('to_user_id')
+        followers, mutual = User.objects.filter(pk=target_id).values_list(
+            'followers_count', Coalesce(Subquery(mutual.annotate(count=Count('*')).values('count')), 0),
+        ).get()
+        candidates[target_id] = (mutual, weight * math.log1p(followers))
+    ranked = heapq.nsmallest(
+        k, ((candidate, mutual, mutual + popularity) for candidate, (mutual, popularity) in candidates.items()),
+        key=lambda row: (-row[2], row[0]),
+    )
+    with transaction.atomic():
+        FollowRecommendation.objects.filter(user_id=user_id, candidate__isnull=False).delete()
+        FollowRecommendation.objects.bulk_create(_rows(user_id, ranked))
+
+
+def _fresh(user_id, limit):
+    """The top ``limit`` rows, or ``None`` when the list is missing or older than ``RECOMMENDATION_MAX_AGE``."""
+    rows = list(
+        FollowRecommendation.objects.filter(user_id=user_id)
+        # Segue alguém por fora do toggle (admin, importação)? Some da lista mesmo assim
+        .exclude(candidate_id__in=_followed(user_id))
+        .select_related('candidate')
+        # O marcador vem primeiro, depois as sugestões por score
+        .order_by(ExpressionWrapper(Q(candidate__isnull=True), output_field=BooleanField()).desc(), '-score', 'candidate_id')
+        [:limit + 1]
+    )
+    if not rows or rows[0].candidate_id is not None or rows[0].computed_at < _cutoff():
+        return None
+    return rows[1:]
+
+
+def top_for(user, limit):
+    """The user's best ``limit`` recommendations, recomputing them when missing or stale."""
+    recommendations = _fresh(user.pk, limit)
+    if recommendations is None:
+        store([(user.pk, compute_for_user(user.pk))])
+        recommendations = _fresh(user.pk, limit)
+    return recommendations
@@ -0,0 +1,122 @@
+"""
+Full-text search over post content and user names/bios.
+
+The index depends on the database vendor:
+
+- Postgres: GIN expression indexes on ``to_tsvector('simple', ...)``. They
+  are maintained by Postgres itself on every insert/update.
+- SQLite: FTS5 external-content tables (``network_post_fts`` and
+  ``network_user_fts``). ``AFTER INSERT/UPDATE/DELETE`` triggers keep them in
+  sync, so they are also updated incrementally on each write.
+- Other backends fall back to ``icontains`` scans.
+
+``install_index`` creates the index and backfills it (migration
+``0012_search_index``); ``rebuild_index`` re-creates it, e.g. after a SQLite
+table remake dropped the triggers (``manage.py rebuild_search_index``).
+Queries match every word, treating the last one as a prefix
+(search-as-you-type).
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+MAX_TERMS = 8
+
+# (tabela, colunas indexadas) por modelo
+INDEXED = {
+    'post': ('network_post', ('content',)),
+    'user': ('network_user', ('username', 'bio')),
+}
+
+POSTGRES_INDEX = "CREATE INDEX IF NOT EXISTS {table}_search_idx ON {table} USING gin ({vector})"
+
+SQLITE_FTS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+    "INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new}); END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old}); END",
+    # Só quando o texto muda: updates de contadores não tocam no índice
+    "CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} ON {table} BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old}); "
+    "INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new}); END",
+    "INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+]
+
+
+def _tsvector(columns):
+    document = " || ' ' || ".join(f"coalesce({column}, '')" for column in columns)
+    return f"to_tsvector('simple', {document})"
+
+
+def _sqlite_params(table, columns):
+    return {
+        'table': table,
+        'fts': f'{table}_fts',
+        'columns': ', '.join(columns),
+        'new': ', '.join(f'new.{column}' for column in columns),
+        'old': ', '.join(f'old.{column}' for column in columns),
+    }
+
+
+def install_index(db=connection):
+    with db.cursor() as cursor:
+        for table, columns in INDEXED.values():
+            if db.vendor == 'postgresql':
+                cursor.execute(POSTGRES_INDEX.format(table=table, vector=_tsvector(columns)))
+            elif db.vendor == 'sqlite':
+                for statement in SQLITE_FTS:
+                    cursor.execute(statement.format(**_sqlite_params(table, columns)))
+
+
+def drop_index(db=connection):
+    with db.cursor() as cursor:
+        for table, _ in INDEXED.values():
+            if db.vendor == 'postgresql':
+                cursor.execute(f'DROP INDEX IF EXISTS {table}_search_idx')
+            elif db.vendor == 'sqlite':
+                for suffix in ('ai', 'ad', 'au'):
+                    cursor.execute(f'DROP TRIGGER IF EXISTS {table}_fts_{suffix}')
+                cursor.execute(f'DROP TABLE IF EXISTS {table}_fts')
+
+
+def rebuild_index(db=connection):
+    drop_index(db)
+    install_index(db)
+
+
+def terms(query):
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def _match_sql(kind, words):
+    """``(sql, params)`` selecting the ids of ``kind`` rows that match ``words``."""
+    table, columns = INDEXED[kind]
+    if connection.vendor == 'postgresql':
+        tsquery = ' & '.join(words[:-1] + [f'{words[-1]}:*'])
+        return f"SELECT id FROM {table} WHERE {_tsvector(columns)} @@ to_tsquery('simple', %s)", [tsquery]
+    # Termos entre aspas: \w+ não tem aspas, então não há como injetar sintaxe FTS5
+    match = ' '.join([f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*'])
+    return f'SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH %s', [match]
+
+
+def filter_matching(queryset, kind, query):
+    """Restrict ``queryset`` to rows of ``kind`` (``'post'``/``'user'``) matching ``query``."""
+    words = terms(query)
+    if not words:
+        return queryset.none()
+    if connection.vendor in ('postgresql', 'sqlite'):
+        sql, params = _match_sql(kind, words)
+        return queryset.filter(pk__in=RawSQL(sql, params))
+    return queryset.filter(scan_filter(kind, words))
+
+
+def scan_filter(kind, words):
+    """``icontains`` equivalent of the index lookup (fallback and benchmark baseline)."""
+    _, columns = INDEXED[kind]
+    condition = Q()
+    for word in words:
+        condition &= Q(*[Q(**{f'{column}__icontains': word}) for column in columns], _connector=Q.OR)
+    return condition
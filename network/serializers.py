@@ -1,21 +1,102 @@
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
+from django.db import models
 from rest_framework import serializers
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema_field
 from django.contrib.auth import get_user_model
 from .models import User, Post, Comment, Conversation, Message
+from .pagination import KeysetPagination
+from . import cache, conditional
 
 User = get_user_model()
 
+def _profile_changed(user_id, fields):
+    """Invalidate cached representations after a profile edit of ``fields``."""
+    cache.invalidate_user(user_id, fields=fields)
+    if cache.AUTHOR_CARD_FIELDS.intersection(fields):
+        # Comentários embutem o cartão do autor: muda o ETag/Last-Modified dos posts comentados
+        conditional.touch_commented_posts(user_id)
+
+def relationship_map(user, user_ids):
+    """
+    ``{id: {'following', 'followed_by', 'mutual'}}`` for ``user_ids`` as seen
+    by ``user``, from a single query over the follow table. Empty for
+    anonymous users; ``user`` itself is left out.
+    """
+    if user is None or not user.is_authenticated:
+        return {}
+    relationships = {
+        user_id: {'following': False, 'followed_by': False, 'mutual': False}
+        for user_id in user_ids if user_id != user.pk
+    }
+    if not relationships:
+        return relationships
+    # Os dois sentidos usam os índices (from_user, to_user) e (to_user) da tabela de follow
+    rows = User.following.through.objects.filter(
+        models.Q(from_user_id=user.pk, to_user_id__in=relationships)
+        | models.Q(to_user_id=user.pk, from_user_id__in=relationships)
+    ).values_list('from_user_id', 'to_user_id')
+    for from_id, to_id in rows:
+        if from_id == user.pk:
+            relationships[to_id]['following'] = True
+        else:
+            relationships[from_id]['followed_by'] = True
+    for flags in relationships.values():
+        flags['mutual'] = flags['following'] and flags['followed_by']
+    return relationships
+
+def overlay_follow_state(users_data, request):
+    """Fill ``is_following`` of (cached) user representations."""
+    relationships = relationship_map(request.user, [user['id'] for user in users_data])
+    for user in users_data:
+        flags = relationships.get(user['id'])
+        user['is_following'] = flags['following'] if flags else None
+    return users_data
+
+@extend_schema_field(OpenApiTypes.BOOL)
+class IsFollowingField(serializers.ReadOnlyField):
+    """
+    Whether the requesting user follows this one; ``None`` for anonymous
+    viewers and on their own profile. Pages resolve it up front through
+    ``UserListSerializer``.
+    """
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        resolved = self.context.get('is_following', {})
+        if instance.pk in resolved:
+            return resolved[instance.pk]
+        user = getattr(self.context.get('request'), 'user', None)
+        if user is None or not user.is_authenticated or user.pk == instance.pk:
+            return None
+        return user.following.filter(pk=instance.pk).exists()
+
+class UserListSerializer(serializers.ListSerializer):
+    """Resolves ``is_following`` for the whole page with a single query."""
+    def to_representation(self, data):
+        users = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        request = self.context.get('request')
+        resolved = self.context.setdefault('is_following', {})
+        relationships = relationship_map(getattr(request, 'user', None), [user.pk for user in users if user.pk not in resolved])
+        resolved.update(
+            {user_id: flags['following'] for user_id, flags in relationships.items()}
+        )
+        return super().to_representation(users)
+
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=6)
-    followers_count = serializers.SerializerMethodField()
-    following_count = serializers.SerializerMethodField()
+    followers_count = serializers.IntegerField(read_only=True)
+    following_count = serializers.IntegerField(read_only=True)
     profile_picture = serializers.ImageField(read_only=True)
+    is_following = IsFollowingField()
 
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'profile_picture', 'password', 'bio', 'followers_count', 'following_count']
+        fields = ['id', 'username', 'email', 'profile_picture', 'password', 'bio', 'followers_count', 'following_count', 'is_following']
+        list_serializer_class = UserListSerializer
 
     def create(self, validated_data):
         password = validated_data.pop('password')
@@ -29,15 +110,47 @@ class UserSerializer(serializers.ModelSerializer):
         
         instance = super().update(instance, validated_data) 
         instance.save()
+        _profile_changed(instance.pk, validated_data)
         return instance
 
-    @extend_schema_field(int)
-    def get_followers_count(self, obj) -> int:
-        return obj.followers.count()
+class AuthorSerializer(serializers.ModelSerializer):
+    """
+    Compact user representation for nested use (post/comment/message authors,
+    conversation participants). Each author is rendered once per request and
+    reused from ``context['author_cache']`` for the rest of the page.
+    """
+    profile_picture = serializers.ImageField(read_only=True)
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'profile_picture']
+        read_only_fields = fields
 
-    @extend_schema_field(int)
-    def get_following_count(self, obj) -> int:
-        return obj.following.count()
+    def to_representation(self, instance):
+        cache = self.context.setdefault('author_cache', {})
+        if instance.pk not in cache:
+            cache[instance.pk] = super().to_representation(instance)
+        return cache[instance.pk]
+
+class UserCardSerializer(serializers.ModelSerializer):
+    """Author fields plus the viewer's follow state, for user listings."""
+    profile_picture = serializers.ImageField(read_only=True)
+    is_following = IsFollowingField()
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'profile_picture', 'is_following']
+        read_only_fields = fields
+        list_serializer_class = UserListSerializer
+
+class TrendingPostSerializer(serializers.ModelSerializer):
+    """Viewer-independent post summary, so the trending list can be cached once for everyone."""
+    author = AuthorSerializer(read_only=True)
+
+    class Meta:
+        model = Post
+        fields = ['id', 'author', 'content', 'created_at', 'likes_count', 'comments_count']
+        read_only_fields = fields
 
 class UserUpdateSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=6, required=False)
@@ -58,13 +171,14 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         try:
             updated_instance = super().update(instance, validated_data)
             updated_instance.save()
+            _profile_changed(updated_instance.pk, validated_data)
             return updated_instance
         except Exception as e:
             print("Erro no update:", str(e))
             raise
 
 class CommentSerializer(serializers.ModelSerializer):
-    author = UserSerializer(read_only=True)
+    author = AuthorSerializer(read_only=True)
     post = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
@@ -77,46 +191,108 @@ class CommentSerializer(serializers.ModelSerializer):
         validated_data['author'] = self.context['request'].user
         return super().create(validated_data)
     
+def liked_post_ids(user, post_ids):
+    """Subset of ``post_ids`` liked by ``user``, in one query."""
+    if user is None or not user.is_authenticated or not post_ids:
+        return set()
+    return set(Post.likes.through.objects.filter(
+        user_id=user.id, post_id__in=post_ids
+    ).values_list('post_id', flat=True))
+
+def overlay_viewer_state(posts_data, request):
+    """Fill the viewer-specific fields of (cached) post representations."""
+    liked = liked_post_ids(request.user, [post['id'] for post in posts_data])
+    for post in posts_data:
+        post['user_has_liked'] = post['id'] in liked
+    return posts_data
+
+class PostListSerializer(serializers.ListSerializer):
+    """
+    Resolves ``user_has_liked`` for the whole page with a single query
+    instead of one ``EXISTS`` per post.
+    """
+    def to_representation(self, data):
+        posts = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        request = self.context.get('request')
+        post_ids = [post.id for post in posts]
+        liked = liked_post_ids(getattr(request, 'user', None), post_ids)
+        self.context.setdefault('user_has_liked', {}).update(
+            {post_id: post_id in liked for post_id in post_ids}
+        )
+        return super().to_representation(posts)
+
 class PostSerializer(serializers.ModelSerializer):
-    author = UserSerializer(read_only=True)
-    likes_count = serializers.SerializerMethodField()
-    comments = CommentSerializer(many=True, read_only=True)
+    author = AuthorSerializer(read_only=True)
+    comments = serializers.SerializerMethodField()
     user_has_liked = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
-        fields = ['id', 'author', 'content', 'created_at', 'likes_count', 'comments', 'user_has_liked']
+        fields = ['id', 'author', 'content', 'created_at', 'likes_count', 'comments_count', 'comments', 'user_has_liked']
+        read_only_fields = ['likes_count', 'comments_count']
+        list_serializer_class = PostListSerializer
 
-    @extend_schema_field(int)
-    def get_likes_count(self, obj) -> int:
-        return obj.likes.count()
+    @extend_schema_field(CommentSerializer(many=True))
+    def get_comments(self, obj):
+        # Nas listas vem só a prévia (últimos N, ver CommentPreviewMixin); o resto via /comments/
+        comments = getattr(obj, 'comment_preview', None)
+        if comments is None:
+            comments = obj.comments.select_related('author')
+        return CommentSerializer(comments, many=True, context=self.context).data
 
-    def get_user_has_liked(self, obj):
+    @extend_schema_field(bool)
+    def get_user_has_liked(self, obj) -> bool:
+        resolved = self.context.get('user_has_liked', {})
+        if obj.id in resolved:
+            return resolved[obj.id]
         user = self.context['request'].user
         if user.is_authenticated:
             return obj.likes.filter(id=user.id).exists()
         return False
 
 class MessageSerializer(serializers.ModelSerializer):
-    author = UserSerializer(read_only=True)
+    author = AuthorSerializer(read_only=True)
 
     class Meta:
         model = Message
         fields = ['id', 'author', 'content', 'created_at', 'is_read']
 
 class ConversationSerializer(serializers.ModelSerializer):
-    participants = UserSerializer(many=True, read_only=True)
-    messages = MessageSerializer(many=True, read_only=True)
+    participants = AuthorSerializer(many=True, read_only=True)
+    messages = serializers.SerializerMethodField()
     last_message = serializers.SerializerMethodField()
 
     class Meta:
         model = Conversation
         fields = ['id', 'participants', 'created_at', 'updated_at', 'messages', 'last_message']
 
-    @extend_schema_field({'type': 'object'})
+    @extend_schema_field(MessageSerializer(many=True))
+    def get_messages(self, obj):
+        # Página já carregada pela view (get_conversation); senão só as mais recentes.
+        # Histórico completo via /conversations/<id>/messages/
+        messages = self.context.get('messages')
+        if messages is None:
+            latest = obj.messages.select_related('author').order_by('-created_at', '-id')[:KeysetPagination.page_size]
+            messages = list(reversed(latest))
+        return MessageSerializer(messages, many=True, context=self.context).data
+
+    @extend_schema_field(MessageSerializer(allow_null=True))
     def get_last_message(self, obj):
-        last_msg = obj.messages.last()
-        return MessageSerializer(last_msg).data if last_msg else None
+        last_msg = obj.last_message
+        return MessageSerializer(last_msg, context=self.context).data if last_msg else None
+
+class InboxConversationSerializer(serializers.ModelSerializer):
+    """
+    Inbox entry: participants, the denormalized last message and the viewer's
+    unread count (annotated by ``list_conversations``), without the thread.
+    """
+    participants = AuthorSerializer(many=True, read_only=True)
+    last_message = MessageSerializer(read_only=True, allow_null=True)
+    unread_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Conversation
+        fields = ['id', 'participants', 'created_at', 'updated_at', 'last_message', 'unread_count']
 
 class CreateMessageSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,80 @@
+"""
+Server-Sent Events stream of feed and notification updates.
+
+``GET /api/stream/`` keeps an ``text/event-stream`` response open and pushes
+lightweight events from the write paths (``post.created``, ``post.liked``,
+``comment.created``). Clients fetch the actual deltas with the regular
+endpoints instead of refreshing full feed pages on a timer. The view is
+async, so idle streams wait on the event loop instead of holding a worker
+thread; serve it through ``social_api.asgi``.
+
+Posts of high fan-out authors are published once on the author's channel.
+A follow or unfollow publishes an internal ``follow.changed`` event on the
+viewer's channel, and the stream then resubscribes to the author channels of
+the viewer's current follows.
+"""
+import asyncio
+import json
+
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from .authentication import atoken_user, request_token
+from .realtime import FOLLOW_CHANGED, author_channel, get_broker, user_channel
+from .timeline import DEFAULT_FANOUT_THRESHOLD
+
+HEARTBEAT_SECONDS = 15
+
+
+def format_event(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+
+async def subscribed_channels(user):
+    threshold = getattr(settings, 'TIMELINE_FANOUT_THRESHOLD', DEFAULT_FANOUT_THRESHOLD)
+    high_fanout = user.following.filter(followers_count__gt=threshold).values_list('id', flat=True)
+    return [user_channel(user.id)] + [author_channel(author_id) async for author_id in high_fanout]
+
+
+async def resubscribe(subscription, user):
+    """``subscription`` itself if ``user``'s channels didn't change, else a new one carrying its pending events."""
+    channels = await subscribed_channels(user)
+    if set(channels) == set(subscription.channels):
+        return subscription
+    replacement = get_broker().subscribe(channels)
+    while not subscription.queue.empty():
+        replacement.deliver(subscription.queue.get_nowait())
+    subscription.close()
+    return replacement
+
+
+async def stream_events(subscription, heartbeat=HEARTBEAT_SECONDS, user=None):
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.__anext__(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'  # Mantém proxies/load balancers com a conexão aberta
+                continue
+            if event['type'] == FOLLOW_CHANGED:
+                if user is not None:
+                    subscription = await resubscribe(subscription, user)
+                continue
+            yield format_event(event)
+    finally:
+        subscription.close()
+
+
+@require_GET
+async def event_stream(request):
+    user = await atoken_user(request_token(request))
+    if user is None:
+        return JsonResponse({'detail': 'Token inválido ou ausente'}, status=401)
+
+    subscription = get_broker().subscribe(await subscribed_channels(user))
+    response = StreamingHttpResponse(stream_events(subscription, user=user), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
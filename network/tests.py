@@ -1,10 +1,35 @@
-from django.test import TestCase
+import asyncio
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
 from django.contrib.auth import get_user_model
-from rest_framework.test import APITestCase
+from django.test import AsyncRequestFactory
+from rest_framework.test import APIRequestFactory, APITestCase
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
-from .models import User, Post
+from .models import User, Post, Comment, TimelineEntry, Conversation, Message, FollowRecommendation, PostHashtag, Like
+from social_api.asgi import application as asgi_application
+from .streaming import event_stream
+from . import cache as representation_cache
+from . import autocomplete, counters, metrics, profiling, ranking, realtime, recommendations, search, timeline, trending
+from .benchmarks.graph import generate_graph
+from .benchmarks.text import measure_search
 from .serializers import UserSerializer, PostSerializer
+from .views import inbox_queryset
 
 User = get_user_model()
 
@@ -35,4 +60,1344 @@ class PostAPITest(APITestCase):
         Post.objects.create(author=self.user, content='Post 1')
         response = self.client.get('/api/posts/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
\ No newline at end of file
+        self.assertEqual(len(response.data['results']), 1)
+
+class FeedTimelineTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='123456')
+        self.author = User.objects.create_user(username='author', password='123456')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def feed_ids(self):
+        response = self.client.get('/api/posts/feed/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [post['id'] for post in response.data['results']]
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        post = Post.objects.create(author=self.author, content='Antes do follow')
+        self.client.post(f'/api/users/{self.author.id}/toggle_follow/')
+        self.assertEqual(self.feed_ids(), [post.id])
+
+        self.client.post(f'/api/users/{self.author.id}/toggle_follow/')
+        self.assertEqual(self.feed_ids(), [])
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        self.user.following.add(self.author)
+        author_client = self.client_class()
+        author_client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.author).access_token}')
+        author_client.post('/api/posts/', {'content': 'Novo post'})
+        own = self.client.post('/api/posts/', {'content': 'Meu post'})
+
+        post = Post.objects.get(author=self.author)
+        self.assertFalse(post.fanout_on_read)
+        self.assertEqual(self.feed_ids(), [own.data['id'], post.id])
+
+    @override_settings(TIMELINE_FANOUT_THRESHOLD=0)
+    def test_high_fanout_author_is_merged_on_read(self):
+        self.client.post(f'/api/users/{self.author.id}/toggle_follow/')
+        author_client = self.client_class()
+        author_client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.author).access_token}')
+        author_client.post('/api/posts/', {'content': 'Post de celebridade'})
+
+        post = Post.objects.get(author=self.author)
+        self.assertTrue(post.fanout_on_read)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user, post=post).exists())
+        self.assertEqual(self.feed_ids(), [post.id])
+
+    @override_settings(TIMELINE_FANOUT_THRESHOLD=0)
+    def test_pages_merge_timeline_and_fanout_on_read_posts(self):
+        celebrity = User.objects.create_user(username='celebrity', password='123456')
+        self.user.following.add(self.author, celebrity)
+        now = timezone.now()
+        posts = []
+        for minutes in range(8):
+            author = celebrity if minutes % 3 == 0 else self.author
+            post = Post.objects.create(author=author, content=f'Post {minutes}', fanout_on_read=author == celebrity)
+            Post.objects.filter(pk=post.pk).update(created_at=now - timedelta(minutes=minutes))
+            post.refresh_from_db()
+            if author == self.author:
+                timeline.get_backend().push(post, [self.user.id])
+            posts.append(post.id)
+
+        seen, url = [], '/api/posts/feed/?limit=3'
+        while url:
+            response = self.client.get(url)
+            seen.append([post['id'] for post in response.data['results']])
+            url = response.data['next']
+        self.assertEqual(sum(seen, []), posts)
+        second = self.client.get('/api/posts/feed/?limit=3').data['next']
+        previous = self.client.get(second).data['previous']
+        self.assertEqual([post['id'] for post in self.client.get(previous).data['results']], seen[0])
+
+    @override_settings(TIMELINE_MAX_LENGTH=2)
+    def test_database_timelines_are_capped(self):
+        posts = [Post.objects.create(author=self.author, content=f'Post {n}') for n in range(4)]
+        self.client.post(f'/api/users/{self.author.id}/toggle_follow/')
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(user=self.user).values_list('post_id', flat=True).order_by('-post_id')),
+            [posts[3].id, posts[2].id],
+        )
+        for post in posts:
+            timeline.fan_out_post(post)
+        out = StringIO()
+        call_command('trim_timelines', stdout=out)
+        self.assertEqual(TimelineEntry.objects.filter(user=self.author).count(), 2)
+        self.assertEqual(TimelineEntry.objects.filter(user=self.user).count(), 2)
+        self.assertIn('4 entrada(s)', out.getvalue())
+
+    @override_settings(TIMELINE_BACKEND='network.timeline.InMemoryTimelineBackend')
+    def test_in_memory_backend(self):
+        timeline.get_backend().clear()
+        self.user.following.add(self.author)
+        old = Post.objects.create(author=self.author, content='Carregado do banco')
+        self.assertEqual(self.feed_ids(), [old.id])
+
+        new = Post.objects.create(author=self.author, content='Fan-out')
+        timeline.fan_out_post(new)
+        self.assertEqual(self.feed_ids(), [new.id, old.id])
+
+
+class KeysetPaginationTest(APITestCase):
+    def setUp(self):
+        representation_cache.get_cache().clear()
+        self.user = User.objects.create_user(username='scroller', password='123456')
+        self.other = User.objects.create_user(username='friend', password='123456')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def test_posts_walk_forward_and_back(self):
+        posts = [Post.objects.create(author=self.user, content=f'Post {i}') for i in range(5)]
+        # Mesmo created_at pra forçar o desempate por id
+        Post.objects.filter(id__in=[p.id for p in posts[:3]]).update(created_at=posts[0].created_at)
+        expected = [p.id for p in Post.objects.order_by('-created_at', '-id')]
+
+        first = self.client.get('/api/posts/', {'limit': 2}).data
+        second = self.client.get(first['next']).data
+        third = self.client.get(second['next']).data
+        self.assertEqual([p['id'] for p in first['results'] + second['results'] + third['results']], expected)
+        self.assertIsNone(first['previous'])
+        self.assertIsNone(third['next'])
+
+        back = self.client.get(third['previous']).data
+        self.assertEqual([p['id'] for p in back['results']], expected[2:4])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/posts/', {'cursor': 'lixo'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_conversation_starts_at_latest_messages(self):
+        conversation = Conversation.objects.create()
+        conversation.participants.add(self.user, self.other)
+        messages = [Message.objects.create(conversation=conversation, author=self.other, content=f'Msg {i}') for i in range(5)]
+
+        page = self.client.get(f'/api/conversations/{conversation.id}/', {'limit': 2}).data
+        self.assertEqual([m['id'] for m in page['messages']], [messages[3].id, messages[4].id])
+        self.assertIsNone(page['next'])
+
+        older = self.client.get(page['previous']).data
+        self.assertEqual([m['id'] for m in older['messages']], [messages[1].id, messages[2].id])
+
+        listing = self.client.get('/api/conversations/').data
+        self.assertEqual([c['id'] for c in listing['results']], [conversation.id])
+
+
+class CounterTest(APITestCase):
+    def setUp(self):
+        representation_cache.get_cache().clear()
+        self.user = User.objects.create_user(username='counter', password='123456')
+        self.other = User.objects.create_user(username='counted', password='123456')
+        self.post = Post.objects.create(author=self.other, content='Conte comigo')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def test_write_paths_keep_counters_exact(self):
+        response = self.client.post(f'/api/users/{self.other.id}/toggle_follow/')
+        self.assertEqual((response.data['followers_count'], response.data['following_count']), (1, 1))
+        response = self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.assertEqual(response.data['likes_count'], 1)
+        self.client.post(f'/api/posts/{self.post.id}/comments/', {'content': 'Oi'})
+
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count), (1, 1))
+        data = self.client.get(f'/api/users/{self.other.id}/').data
+        self.assertEqual(data['followers_count'], 1)
+
+        self.client.post(f'/api/users/{self.other.id}/toggle_follow/')
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.other.refresh_from_db()
+        self.post.refresh_from_db()
+        self.assertEqual((self.other.followers_count, self.post.likes_count), (0, 0))
+
+    def test_lost_toggle_race_leaves_counters_alone(self):
+        # Simula o double-tap: outro request inseriu a curtida entre o DELETE e o INSERT
+        self.post.likes.add(self.user)
+        with patch('django.db.models.query.QuerySet.delete', return_value=(0, {})):
+            has_liked, delta = counters.toggle_like(self.post.id, self.user.id)
+        self.assertEqual((has_liked, delta), (True, 0))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    def test_toggles_do_not_load_relations(self):
+        self.other.following.add(self.user)  # Relação maior não deve ser carregada
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.assertFalse([q for q in queries.captured_queries if 'INNER JOIN' in q['sql']])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'/api/users/{self.other.id}/toggle_follow/')
+        self.assertTrue(response.data['is_following'])
+        self.assertFalse([q for q in queries.captured_queries if 'INNER JOIN' in q['sql']])
+
+    def test_save_does_not_overwrite_counters(self):
+        stale = User.objects.get(pk=self.other.pk)
+        counters.adjust_follow(self.user.id, self.other.id, 1)
+        stale.bio = 'Nova bio'
+        stale.save()
+        self.other.refresh_from_db()
+        self.assertEqual((self.other.bio, self.other.followers_count), ('Nova bio', 1))
+
+    def test_reconcile_counters_command(self):
+        self.user.following.add(self.other)
+        self.post.likes.add(self.user, self.other)
+        Post.objects.filter(pk=self.post.pk).update(comments_count=7)
+
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('4 contador(es) corrigido(s)', out.getvalue())
+        self.post.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count, self.other.followers_count), (2, 0, 1))
+
+
+class UserHasLikedBatchTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='liker', password='123456')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def feed_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/posts/feed/')
+        return response, len(queries)
+
+    def test_feed_resolves_likes_in_one_query(self):
+        first = Post.objects.create(author=self.user, content='Um')
+        first.likes.add(self.user)
+        timeline.backfill(self.user, self.user)
+        _, baseline = self.feed_queries()
+
+        for i in range(5):
+            Post.objects.create(author=self.user, content=f'Mais {i}')
+        timeline.backfill(self.user, self.user)
+        response, queries = self.feed_queries()
+
+        self.assertEqual(queries, baseline)
+        liked = {post['id']: post['user_has_liked'] for post in response.data['results']}
+        self.assertTrue(liked.pop(first.id))
+        self.assertFalse(any(liked.values()))
+
+
+class CommentPreviewTest(APITestCase):
+    def setUp(self):
+        representation_cache.get_cache().clear()
+        self.user = User.objects.create_user(username='previewer', password='123456')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.post = Post.objects.create(author=self.user, content='Muitos comentários')
+        for i in range(5):
+            self.client.post(f'/api/posts/{self.post.id}/comments/', {'content': f'Comentário {i}'})
+
+    def test_list_endpoints_embed_latest_comments_only(self):
+        latest = list(Comment.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        data = self.client.get('/api/posts/').data['results'][0]
+        self.assertEqual(data['comments_count'], 5)
+        self.assertEqual([c['id'] for c in data['comments']], latest[:3])
+
+        data = self.client.get('/api/posts/', {'comments_preview': 1}).data['results'][0]
+        self.assertEqual([c['id'] for c in data['comments']], latest[:1])
+
+    def test_detail_keeps_full_comments(self):
+        data = self.client.get(f'/api/posts/{self.post.id}/').data
+        self.assertEqual(len(data['comments']), 5)
+
+
+class CompactAuthorTest(APITestCase):
+    def setUp(self):
+        representation_cache.get_cache().clear()
+        self.user = User.objects.create_user(username='compact', email='c@example.com', password='123456', bio='Bio')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def test_nested_authors_are_compact_and_cached(self):
+        post = Post.objects.create(author=self.user, content='Post')
+        Comment.objects.create(post=post, author=self.user, content='Comentário')
+        request = APIRequestFactory().get('/')
+        request.user = self.user
+        data = PostSerializer(post, context={'request': request}).data
+
+        self.assertEqual(set(data['author']), {'id', 'username', 'profile_picture'})
+        self.assertIs(data['author'], data['comments'][0]['author'])
+
+    def test_profile_endpoints_keep_full_user(self):
+        data = self.client.get(f'/api/users/{self.user.id}/').data
+        self.assertEqual((data['email'], data['bio'], data['followers_count']), ('c@example.com', 'Bio', 0))
+
+
+class InboxTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='inbox', password='123456')
+        self.friends = [User.objects.create_user(username=f'amigo{i}', password='123456') for i in range(3)]
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.conversations = []
+        for friend in self.friends:
+            conversation = self.client.post(f'/api/conversations/create/{friend.id}/').data
+            self.conversations.append(conversation['id'])
+
+    def send(self, author, conversation_id, content):
+        client = self.client_class()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(author).access_token}')
+        return client.post(f'/api/conversations/{conversation_id}/send/', {'content': content})
+
+    def test_inbox_has_last_message_and_unread_count(self):
+        for friend, conversation_id in zip(self.friends, self.conversations):
+            self.send(friend, conversation_id, 'Oi')
+            self.send(friend, conversation_id, 'Tudo bem?')
+        self.send(self.user, self.conversations[0], 'Tudo!')
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get('/api/conversations/').data
+        self.assertLessEqual(len(queries), 4)
+
+        first = data['results'][0]
+        self.assertEqual(first['id'], self.conversations[0])
+        self.assertEqual(first['last_message']['content'], 'Tudo!')
+        self.assertEqual(first['unread_count'], 2)
+        self.assertNotIn('messages', first)
+
+        self.client.post(f'/api/conversations/{self.conversations[0]}/read/')
+        data = self.client.get('/api/conversations/').data
+        self.assertEqual(data['results'][0]['unread_count'], 0)
+
+    def test_create_conversation_reuses_direct_key(self):
+        friend = self.friends[0]
+        with CaptureQueriesContext(connection) as queries:
+            again = self.client.post(f'/api/conversations/create/{friend.id}/').data
+        self.assertEqual(again['id'], self.conversations[0])
+        lookup = [q['sql'] for q in queries.captured_queries if 'direct_key' in q['sql']]
+        self.assertEqual(len(lookup), 1)
+        self.assertNotIn('JOIN', lookup[0])
+
+        client = self.client_class()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(friend).access_token}')
+        self.assertEqual(client.post(f'/api/conversations/create/{self.user.id}/').data['id'], self.conversations[0])
+        self.assertEqual(Conversation.objects.filter(direct_key=Conversation.direct_key_for(self.user.id, friend.id)).count(), 1)
+
+    def test_create_conversation_race_returns_existing(self):
+        # Simula o request concorrente: a busca não vê a conversa criada pelo outro
+        with patch('django.db.models.query.QuerySet.first', return_value=None):
+            response = self.client.post(f'/api/conversations/create/{self.friends[1].id}/')
+        self.assertEqual(response.data['id'], self.conversations[1])
+        self.assertEqual(Conversation.objects.count(), 3)
+
+    def test_messages_endpoint_is_paginated(self):
+        for i in range(3):
+            self.send(self.friends[0], self.conversations[0], f'Msg {i}')
+        data = self.client.get(f'/api/conversations/{self.conversations[0]}/messages/', {'limit': 2}).data
+        self.assertEqual([m['content'] for m in data['results']], ['Msg 1', 'Msg 2'])
+        older = self.client.get(data['previous']).data
+        self.assertEqual([m['content'] for m in older['results']], ['Msg 0'])
+
+        outsider = User.objects.create_user(username='intruso', password='123456')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(outsider).access_token}')
+        response = self.client.get(f'/api/conversations/{self.conversations[0]}/messages/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class RealtimeTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='online', password='123456')
+        self.sender = User.objects.create_user(username='sender', password='123456')
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.add(self.user, self.sender)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.sender).access_token}')
+
+    async def connect(self, token):
+        inbound, outbound = asyncio.Queue(), asyncio.Queue()
+        scope = {'type': 'websocket', 'path': '/ws/', 'query_string': f'token={token}'.encode()}
+        await inbound.put({'type': 'websocket.connect'})
+        task = asyncio.create_task(asgi_application(scope, inbound.get, outbound.put))
+        return inbound, outbound, task
+
+    async def test_websocket_receives_new_messages(self):
+        inbound, outbound, task = await self.connect(RefreshToken.for_user(self.user).access_token)
+        self.assertEqual((await outbound.get())['type'], 'websocket.accept')
+
+        await sync_to_async(self.client.post)(f'/api/conversations/{self.conversation.id}/send/', {'content': 'Ao vivo'})
+        event = json.loads((await asyncio.wait_for(outbound.get(), 1))['text'])
+        self.assertEqual(event['type'], 'message.created')
+        self.assertEqual((event['conversation'], event['message']['content']), (self.conversation.id, 'Ao vivo'))
+
+        await inbound.put({'type': 'websocket.disconnect'})
+        await task
+        self.assertEqual(realtime.get_broker().subscriber_count(realtime.user_channel(self.user.id)), 0)
+
+    async def test_websocket_rejects_invalid_token(self):
+        _, outbound, task = await self.connect('invalido')
+        await task
+        self.assertEqual(await outbound.get(), {'type': 'websocket.close', 'code': 4401})
+
+
+class EventStreamTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='listener', password='123456')
+        self.author = User.objects.create_user(username='poster', password='123456')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.author).access_token}')
+
+    async def open_stream(self, token):
+        request = AsyncRequestFactory().get('/api/stream/', {'token': token})
+        return await event_stream(request)
+
+    async def test_stream_pushes_feed_and_notification_events(self):
+        await sync_to_async(counters.adjust_follow)(self.user.id, self.author.id, 1)
+        await self.user.following.aadd(self.author)
+        response = await self.open_stream(str(RefreshToken.for_user(self.user).access_token))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b'retry: 5000\n\n')
+
+        post = await sync_to_async(self.client.post)('/api/posts/', {'content': 'Novidade'})
+        chunk = await asyncio.wait_for(anext(chunks), 1)
+        self.assertTrue(chunk.startswith(b'event: post.created\n'))
+        self.assertEqual(json.loads(chunk.split(b'data: ')[1])['post'], post.data['id'])
+
+        own = await Post.objects.acreate(author=self.user, content='Meu')
+        await sync_to_async(self.client.post)(f'/api/posts/{own.id}/like/')
+        chunk = await asyncio.wait_for(anext(chunks), 1)
+        self.assertTrue(chunk.startswith(b'event: post.liked\n'))
+        await chunks.aclose()
+
+    @override_settings(TIMELINE_FANOUT_THRESHOLD=0)
+    async def test_stream_subscribes_high_fanout_authors_followed_later(self):
+        response = await self.open_stream(str(RefreshToken.for_user(self.user).access_token))
+        chunks = aiter(response.streaming_content)
+        await anext(chunks)
+        listener = self.client_class()
+        listener.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        await sync_to_async(listener.post)(f'/api/users/{self.author.id}/toggle_follow/')
+
+        pending = asyncio.ensure_future(anext(chunks))
+        channel = realtime.author_channel(self.author.id)
+        for _ in range(100):  # O stream processa o follow.changed e assina o canal do autor
+            if realtime.get_broker().subscriber_count(channel):
+                break
+            await asyncio.sleep(0.01)
+        post = await sync_to_async(self.client.post)('/api/posts/', {'content': 'Para muitos'})
+        chunk = await asyncio.wait_for(pending, 1)
+        self.assertTrue(chunk.startswith(b'event: post.created\n'))
+        self.assertEqual(json.loads(chunk.split(b'data: ')[1])['post'], post.data['id'])
+        await chunks.aclose()
+
+    async def test_stream_requires_token(self):
+        response = await self.open_stream('invalido')
+        self.assertEqual(response.status_code, 401)
+
+
+class AsyncReadViewsTest(APITestCase):
+    def setUp(self):
+        representation_cache.get_cache().clear()
+        self.user = User.objects.create_user(username='async', password='123456')
+        self.friend = User.objects.create_user(username='async_friend', password='123456')
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.client.post(f'/api/users/{self.friend.id}/toggle_follow/')
+        post = Post.objects.create(author=self.friend, content='Async')
+        timeline.fan_out_post(post)
+        self.client.post(f'/api/posts/{post.id}/comments/', {'content': 'Comentário'})
+        self.conversation_id = self.client.post(f'/api/conversations/create/{self.friend.id}/').data['id']
+        self.client.post(f'/api/conversations/{self.conversation_id}/send/', {'content': 'Oi'})
+
+    async def test_async_endpoints_match_sync_payloads(self):
+        headers = {'Authorization': f'Bearer {self.token}'}
+        for path in [
+            '/posts/feed/', '/posts/feed/?mode=top', f'/posts/?author={self.friend.id}', f'/users/{self.friend.id}/',
+            '/conversations/', f'/conversations/{self.conversation_id}/',
+        ]:
+            sync = await sync_to_async(self.client.get)(f'/api{path}')
+            response = await self.async_client.get(f'/api/async{path}', headers=headers)
+            self.assertEqual(response.status_code, 200, path)
+            self.assertEqual(response.json(), json.loads(sync.content), path)
+
+    async def test_async_feed_validates_mode(self):
+        response = await self.async_client.get('/api/async/posts/feed/?mode=hot', headers={'Authorization': f'Bearer {self.token}'})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_async_endpoints_require_token(self):
+        response = await self.async_client.get('/api/async/posts/feed/')
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(f'/api/async/users/{self.friend.id}/')
+        self.assertEqual(response.status_code, 200)
+
+
+class RepresentationCacheTest(APITestCase):
+    def setUp(self):
+        representation_cache.get_cache().clear()
+        self.user = User.objects.create_user(username='cached', password='123456')
+        self.viewer = User.objects.create_user(username='viewer', password='123456')
+        self.post = Post.objects.create(author=self.user, content='Cacheado')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.viewer).access_token}')
+
+    def get(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        return response.data, len(queries)
+
+    def test_post_detail_is_served_from_cache_and_invalidated_by_writes(self):
+        _, cold = self.get(f'/api/posts/{self.post.id}/')
+        data, warm = self.get(f'/api/posts/{self.post.id}/')
+        self.assertLess(warm, cold)
+        self.assertFalse(data['user_has_liked'])
+
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+        data, _ = self.get(f'/api/posts/{self.post.id}/')
+        self.assertEqual((data['likes_count'], data['user_has_liked']), (1, True))
+
+        self.client.post(f'/api/posts/{self.post.id}/comments/', {'content': 'Novo'})
+        data, _ = self.get(f'/api/posts/{self.post.id}/')
+        self.assertEqual(len(data['comments']), 1)
+
+    def test_viewer_fields_are_not_shared(self):
+        self.post.likes.add(self.viewer)
+        self.assertTrue(self.get(f'/api/posts/?author={self.user.id}')[0]['results'][0]['user_has_liked'])
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.assertFalse(self.get(f'/api/posts/?author={self.user.id}')[0]['results'][0]['user_has_liked'])
+
+    def test_profile_update_invalidates_profile_and_authored_posts(self):
+        self.get(f'/api/users/{self.user.id}/')
+        self.get(f'/api/posts/?author={self.user.id}')
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.client.patch('/api/users/me/', {'username': 'renomeado'}, format='multipart')
+
+        self.assertEqual(self.get(f'/api/users/{self.user.id}/')[0]['username'], 'renomeado')
+        post = self.get(f'/api/posts/?author={self.user.id}')[0]['results'][0]
+        self.assertEqual(post['author']['username'], 'renomeado')
+
+    def test_commenter_rename_refreshes_comments_in_cached_posts(self):
+        commenter = self.client_class()
+        commenter.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.viewer).access_token}')
+        commenter.post(f'/api/posts/{self.post.id}/comments/', {'content': 'Oi'})
+        self.get(f'/api/posts/{self.post.id}/')
+        self.get(f'/api/posts/?author={self.user.id}')
+
+        commenter.patch('/api/users/me/', {'username': 'comentarista'}, format='multipart')
+        detail = self.get(f'/api/posts/{self.post.id}/')[0]
+        self.assertEqual(detail['comments'][0]['author']['username'], 'comentarista')
+        preview = self.get(f'/api/posts/?author={self.user.id}')[0]['results'][0]
+        self.assertEqual(preview['comments'][0]['author']['username'], 'comentarista')
+
+    def test_follow_refreshes_profile_but_keeps_authored_posts_cached(self):
+        self.get(f'/api/users/{self.user.id}/')
+        _, cold = self.get(f'/api/posts/?author={self.user.id}')
+        _, warm = self.get(f'/api/posts/?author={self.user.id}')
+        self.client.post(f'/api/users/{self.user.id}/toggle_follow/')
+
+        self.assertEqual(self.get(f'/api/users/{self.user.id}/')[0]['followers_count'], 1)
+        _, after_follow = self.get(f'/api/posts/?author={self.user.id}')
+        self.assertEqual(after_follow, warm)
+        self.assertLess(after_follow, cold)
+
+class ConditionalGetTest(APITestCase):
+    def setUp(self):
+        representation_cache.get_cache().clear()
+        self.user = User.objects.create_user(username='etag', password='123456')
+        self.friend = User.objects.create_user(username='amigo', password='123456')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.post = self.client.post('/api/posts/', {'content': 'Com ETag'}).data
+
+    def revalidate(self, path, response):
+        with CaptureQueriesContext(connection) as queries:
+            again = self.client.get(path, HTTP_IF_NONE_MATCH=response['ETag'])
+        return again, len(queries)
+
+    def test_feed_returns_304_until_a_post_changes(self):
+        response = self.client.get('/api/posts/feed/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Last-Modified', response)
+
+        again, queries = self.revalidate('/api/posts/feed/', response)
+        self.assertEqual(again.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(again.content, b'')
+        self.assertLessEqual(queries, 4)  # Usuário do token + ids da timeline e do fan-out na leitura + validador
+
+        self.client.post(f"/api/posts/{self.post['id']}/like/")
+        again, _ = self.revalidate('/api/posts/feed/', response)
+        self.assertEqual(again.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(again['ETag'], response['ETag'])
+
+    def test_feed_changes_when_its_posts_change(self):
+        older = Post.objects.create(author=self.friend, content='Antigo')
+        Post.objects.filter(pk=older.pk).update(created_at=timezone.now() - timedelta(days=1))
+        response = self.client.get('/api/posts/feed/')
+        self.client.post(f'/api/users/{self.friend.id}/toggle_follow/')
+        self.assertEqual(self.revalidate('/api/posts/feed/', response)[0].status_code, status.HTTP_200_OK)
+        # Só data não basta: o post que entrou é mais antigo que a cópia do cliente
+        since = self.client.get('/api/posts/feed/', HTTP_IF_MODIFIED_SINCE=http_date(time.time()))
+        self.assertEqual(len(since.data['results']), 2)
+
+        followed = self.client.get('/api/posts/feed/')
+        self.client.post(f'/api/users/{self.friend.id}/toggle_follow/')
+        self.assertEqual(self.revalidate('/api/posts/feed/', followed)[0].status_code, status.HTTP_200_OK)
+
+    def test_feed_etag_depends_on_payload_shape_and_comment_authors(self):
+        friend_client = self.client_class()
+        friend_client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.friend).access_token}')
+        friend_client.post(f"/api/posts/{self.post['id']}/comments/", {'content': 'Oi'})
+        response = self.client.get('/api/posts/feed/')
+        self.assertEqual(self.revalidate('/api/posts/feed/?comments_preview=0', response)[0].status_code, status.HTTP_200_OK)
+        self.assertEqual(self.revalidate('/api/posts/feed/?mode=top', response)[0].status_code, status.HTTP_200_OK)
+
+        friend_client.patch('/api/users/me/', {'username': 'renomeada'}, format='multipart')
+        again = self.revalidate('/api/posts/feed/', response)[0]
+        self.assertEqual(again.status_code, status.HTTP_200_OK)
+        self.assertEqual(again.data['results'][0]['comments'][0]['author']['username'], 'renomeada')
+
+    def test_post_detail_validators(self):
+        path = f"/api/posts/{self.post['id']}/"
+        response = self.client.get(path)
+        self.assertEqual(self.revalidate(path, response)[0].status_code, status.HTTP_304_NOT_MODIFIED)
+        since = self.client.get(path, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(since.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.post(f'{path}comments/', {'content': 'Mudou'})
+        self.assertEqual(self.revalidate(path, response)[0].status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get('/api/posts/999999/', HTTP_IF_NONE_MATCH='*').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_conversation_changes_with_new_messages_and_reads(self):
+        conversation_id = self.client.post(f'/api/conversations/create/{self.friend.id}/').data['id']
+        path = f'/api/conversations/{conversation_id}/'
+        friend_client = self.client_class()
+        friend_client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.friend).access_token}')
+        friend_client.post(f'{path}send/', {'content': 'Oi'})
+
+        response = self.client.get(path)
+        self.assertEqual(self.revalidate(path, response)[0].status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.post(f'{path}read/')
+        read, _ = self.revalidate(path, response)
+        self.assertEqual(read.status_code, status.HTTP_200_OK)
+
+        friend_client.post(f'{path}send/', {'content': 'Tudo bem?'})
+        self.assertEqual(self.revalidate(path, read)[0].status_code, status.HTTP_200_OK)
+
+class RelationshipTest(APITestCase):
+    def setUp(self):
+        representation_cache.get_cache().clear()
+        self.user = User.objects.create_user(username='viewer', password='123456')
+        self.others = [User.objects.create_user(username=f'user{i}', password='123456') for i in range(4)]
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        followed, mutual, follower, _ = self.others
+        self.user.following.add(followed, mutual)
+        mutual.following.add(self.user)
+        follower.following.add(self.user)
+
+    def test_bulk_relationships_in_one_query(self):
+        ids = ','.join(str(user.id) for user in self.others + [self.user])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/users/relationships/', {'ids': ids})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(len(queries), 2)  # Usuário do token + follow table
+
+        flags = [(r['following'], r['followed_by'], r['mutual']) for r in response.data['results']]
+        self.assertEqual(flags, [
+            (True, False, False), (True, True, True), (False, True, False), (False, False, False), (False, False, False),
+        ])
+        self.assertEqual(self.client.get('/api/users/relationships/', {'ids': 'a,b'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_is_following_on_user_list_and_detail(self):
+        with CaptureQueriesContext(connection) as queries:
+            results = self.client.get('/api/users/').data
+        self.assertLessEqual(len(queries), 3)
+        by_id = {user['id']: user['is_following'] for user in results}
+        self.assertEqual([by_id[user.id] for user in self.others], [True, True, False, False])
+        self.assertIsNone(by_id[self.user.id])
+
+        followed = self.others[0]
+        self.assertTrue(self.client.get(f'/api/users/{followed.id}/').data['is_following'])
+        # O perfil cacheado não carrega o estado de outro viewer
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.others[3]).access_token}')
+        self.assertFalse(self.client.get(f'/api/users/{followed.id}/').data['is_following'])
+
+class QueryPlanTest(TestCase):
+    """Hot read paths must hit the indexes from 0011_hot_query_indexes (SQLite and Postgres)."""
+    def setUp(self):
+        self.user = User.objects.create_user(username='plan', password='123456')
+        if connection.vendor == 'postgresql':
+            # Tabelas de teste são minúsculas: sem isso o planner sempre prefere seq scan
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, plan)
+
+    def test_hot_queries_use_indexes(self):
+        page = slice(0, 21)
+        self.assertUsesIndex(Post.objects.filter(author=self.user).order_by('-created_at', '-id')[page], 'post_author_recent_idx')
+        self.assertUsesIndex(Comment.objects.filter(post_id=1).order_by('-created_at', '-id')[page], 'comment_post_recent_idx')
+        self.assertUsesIndex(Message.objects.filter(conversation_id=1).order_by('-created_at', '-id')[page], 'message_conversation_idx')
+        entries = TimelineEntry.objects.filter(user=self.user).order_by('-created_at', '-post_id')[page]
+        self.assertUsesIndex(entries, 'timeline_user_recent_idx')
+        fanout = Post.objects.filter(fanout_on_read=True, author_id__in=self.user.following.values('id'))
+        self.assertUsesIndex(fanout.order_by('-created_at', '-id')[page], 'post_fanout_read_idx')
+        self.assertUsesIndex(inbox_queryset(self.user)[page], 'message_unread_idx')
+        # Inbox: o join com participants filtra pelo usuário e só ordena as conversas dele
+        inbox = inbox_queryset(self.user).order_by('-updated_at', '-id')[page]
+        self.assertUsesIndex(inbox, 'network_conversation_participants_user_id')
+
+        direct = Conversation.objects.filter(direct_key=Conversation.direct_key_for(2, 1))
+        self.assertUsesIndex(direct, 'unique_direct_conversation' if connection.vendor == 'postgresql' else 'direct_key=?')
+
+    def test_direct_key_is_unique_and_canonical(self):
+        self.assertEqual(Conversation.direct_key_for(7, 3), Conversation.direct_key_for('3', 7))
+        Conversation.objects.create(direct_key='3:7')
+        with self.assertRaises(IntegrityError):
+            Conversation.objects.create(direct_key='3:7')
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class QueryBudgetTest(APITestCase):
+    """
+    Query-count and latency budget for every route in ``network/urls.py``.
+
+    Fixtures are large enough (popular author, busy posts, long chat) that an
+    N+1 in a view or serializer blows the budget instead of hiding in a
+    one-row test. A new route fails ``test_every_route_has_a_budget`` until it
+    gets an entry in ``budgets()``.
+    """
+    FOLLOWERS = 30
+    POSTS = 25
+    LIKES = 8
+    COMMENTS = 6
+    MESSAGES = 60
+    LATENCY_BUDGET_MS = 1000  # Folgado: pega regressões grosseiras, não ruído de CI
+    EXEMPT = {
+        'event_stream',  # Stream infinito; coberto por EventStreamTest
+        'metrics',  # Autentica por METRICS_TOKEN, não JWT; coberto por MetricsTest
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = User.objects.create_user(username='budget', password='123456', is_staff=True)
+        cls.author = User.objects.create_user(username='popular', password='123456')
+        cls.fans = User.objects.bulk_create([User(username=f'fan{i}') for i in range(cls.FOLLOWERS)])
+        Follow = User.following.through
+        Follow.objects.bulk_create(
+            [Follow(from_user=fan, to_user=cls.author) for fan in cls.fans + [cls.viewer]]
+            + [Follow(from_user=cls.author, to_user=fan) for fan in cls.fans[:5]]
+        )
+        posts = Post.objects.bulk_create([Post(author=cls.author, content=f'Post {i}') for i in range(cls.POSTS)])
+        Post.likes.through.objects.bulk_create([
+            Post.likes.through(post=post, user=fan) for post in posts for fan in cls.fans[:cls.LIKES]
+        ])
+        Comment.objects.bulk_create([
+            Comment(post=post, author=fan, content='Comentário') for post in posts for fan in cls.fans[:cls.COMMENTS]
+        ])
+        cls.post = posts[0]
+        for model, fields in counters.COUNTERS.items():
+            for field in fields:
+                counters.reconcile(model, field)
+        timeline.backfill(cls.viewer, cls.author)
+
+        cls.conversation = Conversation.objects.create(direct_key=Conversation.direct_key_for(cls.viewer.id, cls.author.id))
+        cls.conversation.participants.add(cls.viewer, cls.author)
+        Message.objects.bulk_create([
+            Message(conversation=cls.conversation, author=cls.author if i % 2 else cls.viewer, content=f'Msg {i}')
+            for i in range(cls.MESSAGES)
+        ])
+        for fan in cls.fans[:10]:
+            other = Conversation.objects.create(direct_key=Conversation.direct_key_for(cls.viewer.id, fan.id))
+            other.participants.add(cls.viewer, fan)
+            other.last_message = Message.objects.create(conversation=other, author=fan, content='Oi')
+            other.save()
+        autocomplete.index.load()  # Worker já aquecido
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.viewer).access_token}')
+
+    def budgets(self):
+        """``url name -> (method, path, data, max queries)``; cold cache, authenticated as ``viewer``."""
+        post, conversation = self.post.id, self.conversation.id
+        return {
+            'token_obtain_pair': ('post', '/api/token/', {'username': 'budget', 'password': '123456'}, 2),
+            'current_user': ('get', '/api/users/me/', None, 1),
+            'user_list': ('get', '/api/users/', None, 3),
+            'user_detail': ('get', f'/api/users/{self.author.id}/', None, 4),
+            'toggle_follow_user': ('post', f'/api/users/{self.fans[0].id}/toggle_follow/', None, 13),
+            'get_follow_status': ('get', f'/api/users/{self.author.id}/is_following/', None, 3),
+            'get_relationships': ('get', '/api/users/relationships/', {'ids': ','.join(str(fan.id) for fan in self.fans)}, 2),
+            'user_search': ('get', '/api/users/search/', {'q': 'fan'}, 3),
+            'autocomplete_users': ('get', '/api/users/autocomplete/', {'q': 'fan'}, 3),
+            'get_recommendations': ('get', '/api/users/recommendations/', None, 9),
+            'post_list': ('get', '/api/posts/', {'author': self.author.id}, 6),
+            'post_detail': ('get', f'/api/posts/{post}/', None, 7),
+            'post_feed': ('get', '/api/posts/feed/', None, 7),
+            'post_search': ('get', '/api/posts/search/', {'q': 'post'}, 5),
+            'like_post': ('post', f'/api/posts/{post}/like/', None, 10),
+            'get_trending': ('get', '/api/trending/', None, 3),
+            'comment_list_create': ('get', f'/api/posts/{post}/comments/', None, 2),
+            'create_conversation': ('post', f'/api/conversations/create/{self.author.id}/', None, 5),
+            'send_message': ('post', f'/api/conversations/{conversation}/send/', {'content': 'Nova'}, 10),
+            'list_conversations': ('get', '/api/conversations/', None, 3),
+            'get_conversation': ('get', f'/api/conversations/{conversation}/', None, 6),
+            'list_messages': ('get', f'/api/conversations/{conversation}/messages/', None, 4),
+            'mark_conversation_read': ('post', f'/api/conversations/{conversation}/read/', None, 4),
+            'profiling_report': ('get', '/api/debug/profile/', None, 1),
+            'async_user_detail': ('get', f'/api/async/users/{self.author.id}/', None, 3),
+            'async_post_list': ('get', '/api/async/posts/', {'author': self.author.id}, 4),
+            'async_post_feed': ('get', '/api/async/posts/feed/', None, 6),
+            'async_list_conversations': ('get', '/api/async/conversations/', None, 3),
+            'async_get_conversation': ('get', f'/api/async/conversations/{conversation}/', None, 4),
+        }
+
+    def test_every_route_has_a_budget(self):
+        from .urls import urlpatterns
+        names = {pattern.name for pattern in urlpatterns} - self.EXEMPT
+        self.assertEqual(names - set(self.budgets()), set())
+
+    def test_query_and_latency_budgets(self):
+        for name, (method, path, data, max_queries) in self.budgets().items():
+            with self.subTest(name):
+                representation_cache.get_cache().clear()
+                start = time.perf_counter()
+                with CaptureQueriesContext(connection) as queries:
+                    response = getattr(self.client, method)(path, data)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                self.assertLess(response.status_code, 400, response.content[:200])
+                self.assertLessEqual(
+                    len(queries), max_queries,
+                    '\n'.join(query['sql'] for query in queries.captured_queries),
+                )
+                self.assertLess(elapsed_ms, self.LATENCY_BUDGET_MS)
+
+    def test_comment_creation_budget(self):
+        # Escrita separada: não interfere nos contadores das leituras acima
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'/api/posts/{self.post.id}/comments/', {'content': 'Mais um'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertLessEqual(len(queries), 6)
+
+    def test_post_creation_budget_does_not_grow_with_followers(self):
+        author_client = self.client_class()
+        author_client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.author).access_token}')
+        with CaptureQueriesContext(connection) as queries:
+            response = author_client.post('/api/posts/', {'content': 'Fan-out'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertLessEqual(len(queries), 8)
+
+class SyntheticGraphTest(TestCase):
+    def test_generated_graph_is_skewed_and_consistent(self):
+        summary = generate_graph(users=60, avg_follows=6, posts_per_user=2, conversations=10, messages_per_conversation=3)
+        self.assertEqual(User.objects.count(), 60)
+        self.assertEqual(Post.objects.count(), summary['posts'])
+        # Lei de potência: o usuário mais seguido fica bem acima da média
+        self.assertGreater(summary['max_followers'], 3 * summary['follows'] / 60)
+
+        out = StringIO()
+        call_command('reconcile_counters', '--dry-run', stdout=out)
+        self.assertIn('0 contador(es) encontrado(s)', out.getvalue())
+        viewer = User.objects.get(pk=summary['viewer_id'])
+        self.assertTrue(timeline.feed_queryset(viewer, 20).exists())
+        # Scores semeados das curtidas/comentários gerados, não todos iguais
+        self.assertGreater(Post.objects.values('engagement_score').distinct().count(), 1)
+        self.assertEqual(Conversation.objects.filter(last_message__isnull=True).count(), 0)
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=1.0)
+class ProfilingTest(APITestCase):
+    def setUp(self):
+        representation_cache.get_cache().clear()
+        profiling.aggregate.clear()
+        # Sem o log JSON de cada requisição na saída dos testes (assertLogs captura quando preciso)
+        silence = patch.object(profiling.logger, 'handlers', [logging.NullHandler()])
+        silence.start()
+        self.addCleanup(silence.stop)
+        self.user = User.objects.create_user(username='profiled', password='123456', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        for index in range(3):
+            self.client.post('/api/posts/', {'content': f'Post {index}'})
+
+    def test_server_timing_log_line_and_report(self):
+        with self.assertLogs('network.profiling', level='INFO') as logs:
+            response = self.client.get('/api/posts/feed/')
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('serializer;dur=', timing)
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((record['endpoint'], record['status']), ('post_feed', 200))
+        self.assertGreater(record['queries'], 0)
+
+        report = self.client.get('/api/debug/profile/').data
+        self.assertIn('post_feed', [row['endpoint'] for row in report['slowest']])
+
+    async def test_async_views_are_profiled_without_adapting_the_chain(self):
+        token = str(RefreshToken.for_user(self.user).access_token)
+        with self.assertNoLogs('django.request', 'DEBUG'), self.assertLogs('network.profiling', level='INFO') as logs:
+            response = await self.async_client.get('/api/async/posts/feed/', headers={'Authorization': f'Bearer {token}'})
+        self.assertIn('db;dur=', response['Server-Timing'])
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['endpoint'], 'async_post_feed')
+        # Queries do ORM assíncrono rodam em outras threads e contam assim mesmo
+        self.assertGreater(record['queries'], 0)
+
+    def test_duplicate_fingerprints_and_log_report(self):
+        self.assertEqual(
+            profiling.fingerprint('SELECT * FROM t WHERE id = 7 AND name = \'a\' AND x IN (%s, %s)'),
+            profiling.fingerprint('SELECT * FROM t WHERE id = 9 AND name = \'b\' AND x IN (%s, %s, %s)'),
+        )
+        lines = [
+            json.dumps({'endpoint': 'post_feed', 'total_ms': 40, 'queries': 30, 'duplicates': {'SELECT comments': 25}}),
+            json.dumps({'endpoint': 'user_list', 'total_ms': 5, 'queries': 3, 'duplicates': {}}),
+        ]
+        with tempfile.NamedTemporaryFile('w', suffix='.log', delete=False) as log:
+            log.write('INFO network.profiling ' + '\nlixo\n'.join(lines) + '\n')
+        out = StringIO()
+        call_command('profile_report', log.name, stdout=out)
+        os.unlink(log.name)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['requests'], 2)
+        self.assertEqual(report['slowest'][0]['endpoint'], 'post_feed')
+        self.assertEqual(report['n_plus_one'], [{'endpoint': 'post_feed', 'repeats': 25, 'sql': 'SELECT comments'}])
+
+    def test_report_requires_staff(self):
+        User.objects.filter(pk=self.user.pk).update(is_staff=False)
+        self.assertEqual(self.client.get('/api/debug/profile/').status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(METRICS_TOKEN='segredo')
+class MetricsTest(APITestCase):
+    def setUp(self):
+        representation_cache.get_cache().clear()
+        self.user = User.objects.create_user(username='metered', password='123456')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def scrape(self):
+        # Cliente separado: credentials() do self.client sobrescreveria o header
+        response = self.client_class().get('/api/internal/metrics/', HTTP_AUTHORIZATION='Bearer segredo')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_request_cache_and_fanout_metrics(self):
+        fanned_out = metrics.fanout_posts.value(('write',))
+        feed_requests = metrics.requests_total.value(('post_feed', 'GET', '200'))
+        post = self.client.post('/api/posts/', {'content': 'Medido'}).data
+        self.client.get('/api/posts/feed/')
+        self.client.get(f"/api/posts/{post['id']}/")
+        self.client.get(f"/api/posts/{post['id']}/")
+
+        self.assertEqual(metrics.fanout_posts.value(('write',)), fanned_out + 1)
+        self.assertEqual(metrics.requests_total.value(('post_feed', 'GET', '200')), feed_requests + 1)
+        text = self.scrape()
+        self.assertIn('# TYPE social_http_request_duration_seconds histogram', text)
+        self.assertIn('social_http_request_duration_seconds_bucket{view="post_feed",method="GET",le="+Inf"}', text)
+        self.assertIn('social_http_request_db_queries_count{view="post_detail"}', text)
+        self.assertIn('social_representation_cache_requests_total{kind="post",result="hit"}', text)
+        self.assertIn('social_db_conn_max_age_seconds', text)
+
+    def test_endpoint_needs_token(self):
+        self.assertEqual(self.client.get('/api/internal/metrics/').status_code, 401)
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(self.client_class().get('/api/internal/metrics/', HTTP_AUTHORIZATION='Bearer ').status_code, 404)
+
+    def test_shards_from_other_threads_are_summed(self):
+        counter = metrics.Counter('test_threads_total', 'Teste')
+        gauge = metrics.Gauge('test_threads_value', 'Teste')
+        metrics.REGISTRY.remove(counter)
+        metrics.REGISTRY.remove(gauge)
+
+        def work():
+            for _ in range(100):
+                counter.inc()
+            gauge.set(7)
+
+        # Uma thread por requisição (ASGI): o número de shards não cresce com elas
+        threads = [threading.Thread(target=work) for _ in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counter.value(), 5000)
+        self.assertEqual(len(counter._shards), metrics.SHARDS)
+        self.assertEqual(gauge.value(), 7)
+
+    async def test_async_views_keep_an_async_middleware_chain(self):
+        token = str(RefreshToken.for_user(self.user).access_token)
+        feed_requests = await sync_to_async(metrics.requests_total.value)(('async_post_feed', 'GET', '200'))
+        with self.assertNoLogs('django.request', 'DEBUG'):
+            response = await self.async_client.get('/api/async/posts/feed/', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(metrics.requests_total.value(('async_post_feed', 'GET', '200')), feed_requests + 1)
+        self.assertIn('social_http_request_db_queries_count{view="async_post_feed"}', await sync_to_async(self.scrape)())
+
+class SearchTest(APITestCase):
+    def setUp(self):
+        representation_cache.get_cache().clear()
+        self.user = User.objects.create_user(username='leitora', password='123456', bio='Fotografia e café')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def search_posts(self, query, **params):
+        response = self.client.get('/api/posts/search/', {'q': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_posts_match_every_term_with_prefix_on_the_last(self):
+        match = Post.objects.create(author=self.user, content='Receita de pão de fermentação natural')
+        Post.objects.create(author=self.user, content='Receita de bolo')
+        self.assertEqual([post['id'] for post in self.search_posts('receita ferment').data['results']], [match.id])
+        self.assertEqual(len(self.search_posts('RECEITA').data['results']), 2)
+        self.assertEqual(self.search_posts('"ferment*" OR -x').data['results'], [])  # Sintaxe FTS não vaza
+        self.assertEqual(self.client.get('/api/posts/search/', {'q': ' !? '}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_index_follows_post_and_user_writes(self):
+        post = Post.objects.create(author=self.user, content='Primeira versão')
+        post.content = 'Texto revisado'
+        post.save()
+        self.assertEqual(self.search_posts('primeira').data['results'], [])
+        self.assertEqual(len(self.search_posts('revisado').data['results']), 1)
+        counters.adjust_likes(post.id, 1)  # Update só de contador não mexe no índice
+        self.assertEqual(len(self.search_posts('revisado').data['results']), 1)
+        post.delete()
+        self.assertEqual(self.search_posts('revisado').data['results'], [])
+
+        other = User.objects.create_user(username='marina', password='123456', bio='Ciclismo')
+        users = lambda query: [user['username'] for user in self.client.get('/api/users/search/', {'q': query}).data['results']]
+        self.assertEqual(users('cafe'), ['leitora'])  # Acentos ignorados
+        self.assertEqual(users('cicl'), ['marina'])
+        other.bio = 'Corrida'
+        other.save()
+        self.assertEqual(users('ciclismo'), [])
+        self.assertEqual(users('mar'), ['marina'])
+
+    def test_results_use_cursor_pagination(self):
+        posts = Post.objects.bulk_create([Post(author=self.user, content=f'Tópico comum {i}') for i in range(5)])
+        first = self.search_posts('comum', limit=3).data
+        second = self.client.get(first['next']).data
+        ids = [post['id'] for post in first['results'] + second['results']]
+        self.assertEqual(ids, [post.id for post in reversed(posts)])
+        self.assertIsNone(second['next'])
+
+    def test_index_lookup_does_not_scan(self):
+        Post.objects.create(author=self.user, content='Plano de consulta')
+        sql = str(search.filter_matching(Post.objects.all(), 'post', 'plano').query)
+        self.assertNotIn(' LIKE ', sql.upper())
+        self.assertEqual(Post.objects.filter(search.scan_filter('post', ['plano'])).count(), 1)
+
+    def test_benchmark_reports_both_strategies(self):
+        report = measure_search(sizes=(50, 200), queries=3, vocabulary_size=200)
+        self.assertEqual([row['posts'] for row in report['results']], [50, 200])
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(report['growth']['rows'], 4)
+
+class AutocompleteTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='viewer', password='123456')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        names = ['mara', 'Marcos', 'mariana', 'mario', 'matheus', 'bruno']
+        self.users = {name: User.objects.create_user(username=name, password='123456') for name in names}
+        self.user.following.add(self.users['mario'], self.users['matheus'])
+        self.users['matheus'].following.add(self.user)
+        self.users['mariana'].following.add(self.user)
+        autocomplete.index.load()
+
+    def tearDown(self):
+        autocomplete.index.clear()
+
+    def complete(self, query, **params):
+        response = self.client.get('/api/users/autocomplete/', {'q': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [user['username'] for user in response.data['results']]
+
+    def test_prefix_ranked_by_relationship(self):
+        # Mútuo, seguindo, seguidor, depois alfabético (sem diferenciar caixa)
+        self.assertEqual(self.complete('@ma'), ['matheus', 'mario', 'mariana', 'mara', 'Marcos'])
+        self.assertEqual(self.complete('MAR', limit=2), ['mario', 'mariana'])
+        self.assertEqual(self.complete('vie'), [])  # O próprio usuário fica de fora
+        self.assertEqual(self.complete(''), [])
+        following = self.client.get('/api/users/autocomplete/', {'q': 'mario'}).data['results'][0]['is_following']
+        self.assertTrue(following)
+
+    def test_signals_keep_index_fresh(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            created = User.objects.create_user(username='marta', password='123456')
+        self.assertIn('marta', self.complete('mart'))
+        with self.captureOnCommitCallbacks(execute=True):
+            created.username = 'beatriz'
+            created.save()
+        self.assertEqual(self.complete('mart'), [])
+        self.assertEqual(self.complete('bea'), ['beatriz'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.users['bruno'].delete()
+        self.assertEqual(self.complete('bru'), [])
+
+    def test_cold_worker_falls_back_to_database(self):
+        autocomplete.index.clear()
+        with patch.object(autocomplete.index, 'warm_up'):
+            self.assertEqual(self.complete('ma'), ['matheus', 'mario', 'mariana', 'mara', 'Marcos'])
+        self.assertFalse(autocomplete.index.ready)
+
+    def test_lookup_is_microseconds_at_scale(self):
+        index = autocomplete.UsernameIndex()
+        index.replace((user_id, f'user{user_id * 7919 % 1000003}') for user_id in range(1, 300001))
+        started = time.perf_counter()
+        for prefix in range(1000):
+            index.prefix(f'user{prefix}', 10)
+        mean_us = (time.perf_counter() - started) * 1e6 / 1000
+        self.assertLess(mean_us, 100)
+        self.assertEqual(len(index.prefix('user1000', 500)), len([1 for key in index._keys if key.startswith('user1000')][:500]))
+
+class RecommendationTest(APITestCase):
+    def setUp(self):
+        representation_cache.get_cache().clear()
+        names = ['viewer', 'ana', 'bia', 'caio', 'davi', 'popular', 'solo']
+        self.u = {name: User.objects.create_user(username=name, password='123456') for name in names}
+        edges = [
+            ('viewer', 'ana'), ('viewer', 'bia'), ('ana', 'caio'), ('ana', 'davi'), ('bia', 'caio'),
+            ('ana', 'popular'), ('bia', 'popular'), ('caio', 'popular'), ('davi', 'popular'), ('solo', 'popular'),
+        ]
+        Follow = User.following.through
+        Follow.objects.bulk_create([Follow(from_user=self.u[a], to_user=self.u[b]) for a, b in edges])
+        counters.reconcile(User, 'followers_count')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.u["viewer"]).access_token}')
+
+    def names(self, ranked):
+        by_id = {user.id: name for name, user in self.u.items()}
+        return [(by_id[candidate], mutual) for candidate, mutual, _ in ranked]
+
+    def test_friends_of_friends_ranked_by_mutuals_then_popularity(self):
+        ranked = recommendations.compute_for_user(self.u['viewer'].id, k=4)
+        self.assertEqual(self.names(ranked), [('popular', 2), ('caio', 2), ('davi', 1), ('solo', 0)])
+        # Quem segue só um perfil sem follows não tem amigos de amigos: completa com os mais seguidos
+        self.assertEqual(self.names(recommendations.compute_for_user(self.u['solo'].id, k=2)), [('caio', 0), ('ana', 0)])
+
+    def test_csr_graph_matches_database_path(self):
+        graph = recommendations.load_graph()
+        self.assertEqual((len(graph), graph.edge_count), (7, 10))
+        self.assertEqual(graph.in_degree[graph.position[self.u['popular'].id]], 5)
+        graph = pickle.loads(pickle.dumps(graph))  # Como chega nos processos do pool
+        for name in ('viewer', 'ana', 'solo'):
+            user_id = self.u[name].id
+            db_ranked = recommendations.compute_for_user(user_id, k=5)
+            csr_ranked = graph.recommend(user_id, 5, recommendations.DEFAULT_POPULARITY_WEIGHT)
+            self.assertEqual(self.names(csr_ranked), self.names(db_ranked))
+            for (_, _, a), (_, _, b) in zip(csr_ranked, db_ranked):
+                self.assertAlmostEqual(a, b)
+
+    def test_endpoint_serves_cache_and_toggle_refreshes_it(self):
+        response = self.client.get('/api/users/recommendations/', {'limit': 2})
+        self.assertEqual([(user['username'], user['mutual_count']) for user in response.data['results']], [('popular', 2), ('caio', 2)])
+        self.assertFalse(response.data['results'][0]['is_following'])
+        viewer = self.u['viewer']
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/users/recommendations/')
+        self.assertEqual(len(queries), 2)  # Usuário do token + linhas pré-calculadas
+
+        self.client.post(f"/api/users/{self.u['caio'].id}/toggle_follow/")
+        # Atualizada pelo delta do toggle: caio sai, popular ganha +1 (caio segue popular)
+        with CaptureQueriesContext(connection) as queries:
+            results = self.client.get('/api/users/recommendations/').data['results']
+        self.assertEqual(len(queries), 2)
+        self.assertEqual([(user['username'], user['mutual_count']) for user in results][:2], [('popular', 3), ('davi', 1)])
+
+        FollowRecommendation.objects.filter(user=viewer).update(computed_at=timezone.now() - timedelta(days=2))
+        self.client.get('/api/users/recommendations/')
+        self.assertTrue(FollowRecommendation.objects.filter(user=viewer, computed_at__gte=timezone.now() - timedelta(hours=1)).exists())
+
+    def test_toggle_deltas_match_full_recomputation(self):
+        viewer = self.u['viewer']
+        self.client.get('/api/users/recommendations/')
+        for name in ('caio', 'ana', 'davi', 'caio'):
+            self.client.post(f"/api/users/{self.u[name].id}/toggle_follow/")
+            stored = FollowRecommendation.objects.filter(user=viewer, candidate__isnull=False).order_by('-score', 'candidate_id')
+            expected = recommendations.compute_for_user(viewer.id)
+            # Com poucos usuários a lista guardada não perde ninguém: tem que bater com o cálculo do zero
+            self.assertEqual(
+                [(row.candidate_id, row.mutual_count) for row in stored], [(c, m) for c, m, _ in expected], name,
+            )
+            for row, (_, _, score) in zip(stored, expected):
+                self.assertAlmostEqual(row.score, score)
+
+    @override_settings(RECOMMENDATION_TOP_K=3)
+    def test_follow_updates_every_stored_candidate_the_followee_follows(self):
+        viewer = self.u['viewer']
+        Follow = User.following.through
+        nova, extra = (User.objects.create_user(username=name, password='123456') for name in ('nova', 'extra'))
+        # nova segue mais candidatos do que cabem na lista
+        Follow.objects.bulk_create([Follow(from_user=nova, to_user=self.u[name]) for name in ('popular', 'caio', 'davi')] + [
+            Follow(from_user=nova, to_user=extra), Follow(from_user=self.u['ana'], to_user=extra),
+            Follow(from_user=self.u['solo'], to_user=extra),
+        ])
+        counters.reconcile(User, 'followers_count')
+        self.client.get('/api/users/recommendations/')
+        self.client.post(f'/api/users/{nova.id}/toggle_follow/')
+        stored = FollowRecommendation.objects.filter(user=viewer, candidate__isnull=False).order_by('-score', 'candidate_id')
+        self.assertEqual(
+            [(row.candidate_id, row.mutual_count) for row in stored],
+            [(c, m) for c, m, _ in recommendations.compute_for_user(viewer.id)],
+        )
+
+    def test_user_without_candidates_is_not_recomputed_on_every_read(self):
+        loner = User.objects.create_user(username='loner', password='123456')
+        User.objects.exclude(pk=loner.pk).delete()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(loner).access_token}')
+        self.assertEqual(self.client.get('/api/users/recommendations/').data['results'], [])
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get('/api/users/recommendations/').data['results'], [])
+            self.assertEqual(len(queries), 2)  # Usuário do token + marcador, sem recalcular nem escrever
+
+    def test_batch_command_uses_process_pool(self):
+        out = StringIO()
+        call_command('compute_recommendations', workers=2, chunk_size=2, top=3, stdout=out)
+        summary = json.loads(out.getvalue())
+        self.assertEqual((summary['users'], summary['edges']), (7, 10))
+        stored = FollowRecommendation.objects.filter(user=self.u['viewer'], candidate__isnull=False).order_by('-score', 'candidate_id')
+        self.assertEqual([(row.candidate.username, row.mutual_count) for row in stored], [('popular', 2), ('caio', 2), ('davi', 1)])
+        self.assertEqual(FollowRecommendation.objects.values('user').distinct().count(), 7)
+
+class RankedFeedTest(APITestCase):
+    def setUp(self):
+        representation_cache.get_cache().clear()
+        self.user = User.objects.create_user(username='reader', password='123456')
+        self.fans = [User.objects.create_user(username=f'fan{i}', password='123456') for i in range(3)]
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.posts = [self.client.post('/api/posts/', {'content': f'Post {i}'}).data['id'] for i in range(4)]
+
+    def top_ids(self, **params):
+        response = self.client.get('/api/posts/feed/', {'mode': 'top', **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def engage(self, post_id, likes=0, comments=0):
+        for fan in self.fans[:likes]:
+            counters.toggle_like(post_id, fan.id)
+        for _ in range(comments):
+            self.client.post(f'/api/posts/{post_id}/comments/', {'content': 'Boa'})
+
+    def test_likes_and_comments_update_score_incrementally(self):
+        first, second, third, fourth = self.posts
+        self.engage(second, likes=3)
+        self.engage(third, comments=1)
+        self.engage(fourth, likes=1)
+        counters.toggle_like(fourth, self.fans[0].id)  # Descurtir devolve o peso
+        scores = dict(Post.objects.values_list('id', 'engagement_score'))
+        # O unlike devolve o peso decaído pelos milissegundos desde a curtida
+        self.assertEqual([round(scores[post], 6) for post in self.posts], [1.0, 4.0, 3.0, 1.0])
+        self.assertEqual([post['id'] for post in self.top_ids()['results']], [second, third, fourth, first])
+        self.assertEqual(self.client.get('/api/posts/feed/', {'mode': 'hot'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ranked_pages_cost_the_same_as_chronological(self):
+        self.engage(self.posts[0], likes=2)
+        with CaptureQueriesContext(connection) as queries:
+            page = self.top_ids(limit=2)
+        self.assertLessEqual(len(queries), 7)  # Mesmo orçamento do feed cronológico
+        rest = self.client.get(page['next']).data
+        ids = [post['id'] for post in page['results'] + rest['results']]
+        self.assertEqual(ids, [self.posts[0]] + self.posts[:0:-1])
+
+    def test_decay_preserves_order_and_drops_dead_scores(self):
+        first, second, *_ = self.posts
+        self.engage(second, likes=3)
+        Post.objects.filter(pk=first).update(engagement_score=0.0015)
+        with override_settings(FEED_SCORE_HALF_LIFE_HOURS=12):
+            updated = ranking.decay(hours=12)
+        self.assertEqual(updated, 4)
+        scores = dict(Post.objects.values_list('id', 'engagement_score'))
+        self.assertEqual(scores[second], 2.0)
+        self.assertEqual(scores[first], 0.0)  # Abaixo do piso: sai das próximas passadas
+        self.assertEqual(ranking.decay(hours=12), 3)
+
+        call_command('decay_engagement_scores', hours=24, stdout=StringIO())
+        self.assertEqual(Post.objects.get(pk=second).engagement_score, 0.25)  # 4 -> 2 -> 1 -> 0.25
+
+    @override_settings(FEED_SCORE_HALF_LIFE_HOURS=12)
+    def test_unlike_after_decay_only_takes_back_the_decayed_like(self):
+        post = self.posts[0]
+        self.engage(post, likes=1)
+        Like.objects.filter(post_id=post).update(created_at=timezone.now() - timedelta(hours=12))
+        ranking.decay(hours=12)  # 1 + 1 -> 1
+        counters.toggle_like(post, self.fans[0].id)
+        # Volta ao score base decaído, não a 0
+        self.assertAlmostEqual(Post.objects.get(pk=post).engagement_score, 0.5, places=6)
+
+    def test_posts_outside_window_are_not_ranked(self):
+        month_ago = timezone.now() - timedelta(days=30)
+        Post.objects.filter(pk=self.posts[0]).update(created_at=month_ago, engagement_score=100)
+        TimelineEntry.objects.filter(post_id=self.posts[0]).update(created_at=month_ago)
+        self.assertNotIn(self.posts[0], [post['id'] for post in self.top_ids()['results']])
+        self.assertIn(self.posts[0], [post['id'] for post in self.client.get('/api/posts/feed/').data['results']])
+
+    @override_settings(FEED_RANKING_CANDIDATES=2)
+    def test_only_the_newest_candidates_are_ranked(self):
+        self.engage(self.posts[0], likes=3)
+        self.assertEqual([post['id'] for post in self.top_ids()['results']], self.posts[:1:-1])
+
+class TrendingTest(APITestCase):
+    def setUp(self):
+        representation_cache.get_cache().clear()
+        trending.reset()
+        self.user = User.objects.create_user(username='autora', password='123456')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def test_extracts_hashtags_into_table(self):
+        self.assertEqual(trending.extract_hashtags('#Django e #django, email@a#b, ##x #café'), ['django', 'café'])
+        # Conta depois do lower(): 64 'İ' viram 128 caracteres e não cabem em Hashtag.name
+        self.assertEqual(trending.extract_hashtags(f"#{'İ' * 64} #{'a' * 64} #{'b' * 65}"), ['a' * 64])
+        post_id = self.client.post('/api/posts/', {'content': 'Lançamento #Python #api'}).data['id']
+        tags = lambda: sorted(PostHashtag.objects.filter(post_id=post_id).values_list('hashtag__name', flat=True))
+        self.assertEqual(tags(), ['api', 'python'])
+        self.client.patch(f'/api/posts/{post_id}/', {'content': 'Editado #python #rest'})
+        self.assertEqual(tags(), ['python', 'rest'])
+
+    def test_endpoint_ranks_tags_and_posts_and_is_cached(self):
+        hot = self.client.post('/api/posts/', {'content': 'Final hoje #futebol'}).data['id']
+        self.client.post('/api/posts/', {'content': 'Treino #futebol #corrida'})
+        self.client.post('/api/posts/', {'content': 'Sem tag'})
+        fan = User.objects.create_user(username='fa', password='123456')
+        fan_client = self.client_class()
+        fan_client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(fan).access_token}')
+        fan_client.post(f'/api/posts/{hot}/like/')
+        fan_client.post(f'/api/posts/{hot}/comments/', {'content': 'Vai!'})
+
+        data = self.client.get('/api/trending/', {'limit': 2}).data
+        self.assertEqual(data['hashtags'], [{'tag': 'futebol', 'count': 4}, {'tag': 'corrida', 'count': 1}])
+        self.assertEqual((data['posts'][0]['id'], data['posts'][0]['count']), (hot, 3))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/api/trending/', {'limit': 2}).data, data)
+        self.assertEqual(len(queries), 1)  # Só o usuário do token
+        self.assertEqual(self.client.get('/api/trending/', {'window': 'week'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_minute_buckets_roll_into_hours_and_expire(self):
+        now = [1_000_000 * 60]
+        counter = trending.SlidingWindowCounter(clock=lambda: now[0])
+        counter.add('a', 3)
+        now[0] += 30 * 60
+        counter.add('b')
+        self.assertEqual(counter.top(5), [('a', 3), ('b', 1)])
+        now[0] += 45 * 60  # 'a' saiu da última hora, continua no dia
+        self.assertEqual(counter.top(5), [('b', 1)])
+        self.assertEqual(counter.top(5, 'day'), [('a', 3), ('b', 1)])
+        self.assertEqual(len(counter._minutes), 1)
+        now[0] += 25 * 3600
+        self.assertEqual(counter.top(5, 'day'), [])
+        self.assertEqual((len(counter._minutes), len(counter._hours), len(counter)), (0, 0, 0))
+
+    def test_cold_keys_are_evicted(self):
+        now = [0]
+        counter = trending.SlidingWindowCounter(max_keys=3, clock=lambda: now[0])
+        for key in ['a', 'b', 'c', 'a', 'd']:
+            counter.add(key)
+        self.assertEqual(sorted(counter._total), ['a', 'c', 'd'])  # 'b' era o menos recente
+        self.assertNotIn('b', counter._minutes[-1][1])
+        counter.add('b')
+        now[0] += 2 * 86400
+        counter.top(1)
+        self.assertEqual(len(counter), 0)
+
+    def test_warm_up_replays_table_without_double_counting(self):
+        self.client.post('/api/posts/', {'content': 'Antes #deploy'})
+        trending.reset()  # Worker reiniciado
+        self.client.post('/api/posts/', {'content': 'Depois #deploy'})
+        self.assertEqual(trending.top('day', 1)[0], [('deploy', 2)])
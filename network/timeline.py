@@ -0,0 +1,269 @@
+"""
+Materialized home timelines (fan-out on write) with a fan-out-on-read path
+for authors with very large follower counts.
+
+Each post is pushed into the timeline of its author and followers when it is
+created, so reading a feed is a single indexed lookup instead of an IN-list
+over everyone the user follows. Authors above ``TIMELINE_FANOUT_THRESHOLD``
+followers are not fanned out: their posts are flagged ``fanout_on_read`` and
+merged into followers' feeds at read time.
+
+A feed page never reads the whole timeline. ``feed_queryset`` takes the page
+window (cursor position and size) and fetches the ``limit`` timeline rows
+past the cursor, using ``(user, created_at)``. It then fetches the same
+number of fan-out-on-read posts with a second bounded query, and returns the
+posts matching those ids. Timelines are capped at ``TIMELINE_MAX_LENGTH``
+entries: the in-memory backend trims itself, and database timelines are
+trimmed by ``manage.py trim_timelines`` and after each follow backfill.
+
+The storage is pluggable through ``TIMELINE_BACKEND``:
+
+- ``DatabaseTimelineBackend`` (default) stores rows in ``TimelineEntry``.
+- ``InMemoryTimelineBackend`` is a per-process stand-in for a Redis-style
+  sorted set, useful for local runs and tests.
+"""
+import heapq
+import threading
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils.module_loading import import_string
+
+from . import metrics
+from .models import Post, TimelineEntry, User
+from .pagination import KeysetPagination
+
+DEFAULT_BACKEND = 'network.timeline.DatabaseTimelineBackend'
+DEFAULT_FANOUT_THRESHOLD = 5000
+DEFAULT_BACKFILL_LIMIT = 200
+DEFAULT_MAX_LENGTH = 800
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _window(queryset, id_field, limit, position=None, reverse=False, since=None):
+    """
+    ``queryset`` ordered newest first on ``(created_at, id_field)``, past the
+    ``(created_at, id)`` ``position`` and sliced to ``limit`` rows (oldest first
+    when ``reverse``).
+    """
+    ordering = ['-created_at', f'-{id_field}']
+    if reverse:
+        ordering = ['created_at', id_field]
+    if since is not None:
+        queryset = queryset.filter(created_at__gte=since)
+    if position is not None:
+        queryset = queryset.filter(KeysetPagination().keyset_filter(ordering, position))
+    return queryset.order_by(*ordering).values_list(id_field, flat=True)[:limit]
+
+
+class BaseTimelineBackend:
+    """Interface a timeline store must implement."""
+
+    def push(self, post, user_ids):
+        """Deliver ``post`` to the timelines of ``user_ids``."""
+        raise NotImplementedError
+
+    def backfill(self, user_id, posts):
+        """Deliver already existing ``posts`` to a single timeline."""
+        raise NotImplementedError
+
+    def prune(self, user_id, author_id):
+        """Remove every post by ``author_id`` from ``user_id``'s timeline."""
+        raise NotImplementedError
+
+    def recent(self, user_id, limit, position=None, reverse=False, since=None):
+        """
+        Ids of the ``limit`` newest posts in ``user_id``'s timeline older than
+        the ``(created_at, id)`` ``position`` (the oldest newer ones when
+        ``reverse``), optionally only those created since ``since``.
+        """
+        raise NotImplementedError
+
+    def trim(self, user_ids=None):
+        """Drop entries past ``TIMELINE_MAX_LENGTH``; returns how many were removed."""
+        return 0
+
+    @property
+    def max_length(self):
+        return _setting('TIMELINE_MAX_LENGTH', DEFAULT_MAX_LENGTH)
+
+
+class DatabaseTimelineBackend(BaseTimelineBackend):
+    batch_size = 1000
+
+    def push(self, post, user_ids):
+        entries = (
+            TimelineEntry(user_id=user_id, post_id=post.id, author_id=post.author_id, created_at=post.created_at)
+            for user_id in user_ids
+        )
+        for chunk in _chunks(entries, self.batch_size):
+            TimelineEntry.objects.bulk_create(chunk, ignore_conflicts=True)
+
+    def backfill(self, user_id, posts):
+        TimelineEntry.objects.bulk_create([
+            TimelineEntry(user_id=user_id, post_id=post.id, author_id=post.author_id, created_at=post.created_at)
+            for post in posts
+        ], batch_size=self.batch_size, ignore_conflicts=True)
+        if posts:
+            self.trim([user_id])
+
+    def prune(self, user_id, author_id):
+        TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+    def recent(self, user_id, limit, position=None, reverse=False, since=None):
+        entries = TimelineEntry.objects.filter(user_id=user_id)
+        return list(_window(entries, 'post_id', limit, position, reverse, since))
+
+    def trim(self, user_ids=None):
+        entries = TimelineEntry.objects.all()
+        if user_ids is not None:
+            entries = entries.filter(user_id__in=user_ids)
+        ranked = entries.annotate(rank=Window(
+            RowNumber(), partition_by=[F('user_id')], order_by=[F('created_at').desc(), F('post_id').desc()],
+        ))
+        stale = ranked.filter(rank__gt=self.max_length).values('pk')
+        return TimelineEntry.objects.filter(pk__in=stale).delete()[0]
+
+
+class InMemoryTimelineBackend(BaseTimelineBackend):
+    """
+    Process-local sorted set per user (ZADD / ZREM / ZREVRANGE semantics),
+    trimmed to ``TIMELINE_MAX_LENGTH`` entries. Timelines are rebuilt from the
+    database the first time a user is read in this process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timelines = defaultdict(dict)  # user_id -> {post_id: (timestamp, author_id)}
+        self._loaded = set()
+
+    def _add(self, user_id, post):
+        timeline = self._timelines[user_id]
+        timeline[post.id] = (post.created_at.timestamp(), post.author_id)
+        # Poda amortizada: só reordena quando passa 25% do limite
+        if len(timeline) > self.max_length * 1.25:
+            newest = sorted(timeline.items(), key=lambda item: (item[1][0], item[0]), reverse=True)
+            self._timelines[user_id] = dict(newest[:self.max_length])
+
+    def push(self, post, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                if user_id in self._loaded:
+                    self._add(user_id, post)
+
+    def backfill(self, user_id, posts):
+        with self._lock:
+            if user_id in self._loaded:
+                for post in posts:
+                    self._add(user_id, post)
+
+    def prune(self, user_id, author_id):
+        with self._lock:
+            timeline = self._timelines.get(user_id, {})
+            for post_id in [pid for pid, (_, aid) in timeline.items() if aid == author_id]:
+                del timeline[post_id]
+
+    def _load(self, user_id):
+        authors = User.following.through.objects.filter(from_user_id=user_id).values('to_user_id')
+        posts = Post.objects.filter(
+            Q(author_id=user_id) | Q(author_id__in=authors, fanout_on_read=False)
+        ).only('id', 'author_id', 'created_at').order_by('-created_at')[:self.max_length]
+        timeline = self._timelines[user_id]
+        for post in posts:
+            timeline[post.id] = (post.created_at.timestamp(), post.author_id)
+        self._loaded.add(user_id)
+
+    def recent(self, user_id, limit, position=None, reverse=False, since=None):
+        with self._lock:
+            if user_id not in self._loaded:
+                self._load(user_id)
+            entries = [(timestamp, post_id) for post_id, (timestamp, _) in self._timelines[user_id].items()]
+        if since is not None:
+            entries = [entry for entry in entries if entry[0] >= since.timestamp()]
+        if position is not None:
+            bound = (position[0].timestamp(), position[1])
+            entries = [entry for entry in entries if (entry > bound if reverse else entry < bound)]
+        pick = heapq.nsmallest if reverse else heapq.nlargest
+        return [post_id for _, post_id in pick(limit, entries)]
+
+    def clear(self):
+        with self._lock:
+            self._timelines.clear()
+            self._loaded.clear()
+
+
+_backends = {}
+
+
+def get_backend():
+    path = _setting('TIMELINE_BACKEND', DEFAULT_BACKEND)
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
+
+
+def fan_out_post(post):
+    """
+    Push a freshly created post to its author's and followers' timelines.
+    Authors over the threshold only get their own entry; their post is marked
+    ``fanout_on_read`` so followers pick it up when reading the feed.
+    """
+    threshold = _setting('TIMELINE_FANOUT_THRESHOLD', DEFAULT_FANOUT_THRESHOLD)
+    if post.author.followers_count > threshold:
+        Post.objects.filter(pk=post.pk).update(fanout_on_read=True)
+        post.fanout_on_read = True
+        follower_ids = []
+    else:
+        follower_ids = list(
+            User.following.through.objects.filter(to_user_id=post.author_id).values_list('from_user_id', flat=True)
+        )
+    get_backend().push(post, [post.author_id] + follower_ids)
+    metrics.fanout_posts.inc(('read' if post.fanout_on_read else 'write',))
+    metrics.fanout_entries.inc(('fanout',), 1 + len(follower_ids))
+    return follower_ids
+
+
+def backfill(user, author):
+    """Add ``author``'s recent fanned-out posts to ``user``'s timeline after a follow (then re-cap it)."""
+    limit = _setting('TIMELINE_BACKFILL_LIMIT', DEFAULT_BACKFILL_LIMIT)
+    posts = Post.objects.filter(author=author, fanout_on_read=False).only(
+        'id', 'author_id', 'created_at'
+    ).order_by('-created_at')[:limit]
+    posts = list(posts)
+    get_backend().backfill(user.id, posts)
+    metrics.fanout_entries.inc(('backfill',), len(posts))
+
+
+def prune(user, author):
+    """Drop ``author``'s posts from ``user``'s timeline after an unfollow."""
+    get_backend().prune(user.id, author.id)
+
+
+def feed_ids(user, limit, position=None, reverse=False, since=None):
+    """
+    Ids of the ``limit`` feed posts past ``position``: that many from the
+    materialized timeline plus that many from followed fan-out-on-read authors.
+    The page itself is among them, and the caller orders and slices it.
+    """
+    followed = User.following.through.objects.filter(from_user_id=user.id).values('to_user_id')
+    fanout = Post.objects.filter(fanout_on_read=True, author_id__in=followed)
+    return get_backend().recent(user.id, limit, position, reverse, since) + list(
+        _window(fanout, 'id', limit, position, reverse, since)
+    )
+
+
+def feed_queryset(user, limit, position=None, reverse=False, since=None):
+    """Posts in ``user``'s home feed page window; see ``feed_ids``."""
+    return Post.objects.filter(pk__in=feed_ids(user, limit, position, reverse, since))
@@ -0,0 +1,205 @@
+"""
+Trending hashtags and posts from sliding-window counters.
+
+Events (a post using a hashtag, likes and comments on it) go into
+``SlidingWindowCounter``s kept in each worker's memory: one bucket per minute
+for the last hour, rolled into one bucket per hour for the last day. Each key's
+running totals for both windows are updated as events arrive and as
+buckets expire, so a roll only touches the expired buckets. ``Post`` and the
+like table are never rescanned. Memory is bounded by ``TRENDING_MAX_KEYS``:
+past it, the least recently incremented key is evicted from the totals and
+every bucket.
+
+Counters are per worker process. The first trending read warms the hashtag
+counter from the last day of ``PostHashtag`` rows written before the worker
+started counting live, so a restarted worker doesn't start from zero. ``/api/trending/`` caches its top-N for
+``TRENDING_CACHE_SECONDS``.
+"""
+import heapq
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from datetime import timedelta
+from operator import itemgetter
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Hashtag, PostHashtag
+
+HASHTAG_RE = re.compile(r'(?<![\w#])#(\w+)')
+MAX_HASHTAG_LENGTH = Hashtag._meta.get_field('name').max_length
+MAX_HASHTAGS_PER_POST = 10
+DEFAULT_MAX_KEYS = 10000
+WINDOWS = ('hour', 'day')
+
+
+def extract_hashtags(content):
+    """Distinct lowercased hashtags of ``content``, in order of appearance; tags too long to store are skipped."""
+    # O limite vale depois do lower(): 'İ' vira dois caracteres
+    tags = (match.lower() for match in HASHTAG_RE.findall(content or ''))
+    tags = dict.fromkeys(tag for tag in tags if len(tag) <= MAX_HASHTAG_LENGTH)
+    return list(tags)[:MAX_HASHTAGS_PER_POST]
+
+
+class SlidingWindowCounter:
+    def __init__(self, minutes=60, hours=24, max_keys=DEFAULT_MAX_KEYS, clock=time.time):
+        self.minute_span = minutes
+        self.hour_span = hours
+        self.max_keys = max_keys
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._minutes = deque()  # (minuto, Counter), mais antigo à esquerda
+        self._hours = deque()  # (hora, Counter)
+        self._recent = {}  # Total da última hora (buckets de minuto)
+        self._total = OrderedDict()  # Total do dia; a ordem é a de uso (LRU)
+
+    def __len__(self):
+        return len(self._total)
+
+    @staticmethod
+    def _subtract(totals, counts):
+        for key, count in counts.items():
+            remaining = totals.get(key, 0) - count
+            if remaining > 0:
+                totals[key] = remaining
+            else:
+                totals.pop(key, None)
+
+    def _roll(self, minute):
+        # Minutos que saíram da janela curta viram parte do bucket da sua hora
+        while self._minutes and self._minutes[0][0] <= minute - self.minute_span:
+            expired, counts = self._minutes.popleft()
+            self._subtract(self._recent, counts)
+            hour = expired // 60
+            if self._hours and self._hours[-1][0] == hour:
+                self._hours[-1][1].update(counts)
+            else:
+                self._hours.append((hour, counts))
+        while self._hours and self._hours[0][0] <= minute // 60 - self.hour_span:
+            self._subtract(self._total, self._hours.popleft()[1])
+
+    def _evict(self):
+        key, _ = self._total.popitem(last=False)
+        self._recent.pop(key, None)
+        for _, counts in self._minutes:
+            counts.pop(key, None)
+        for _, counts in self._hours:
+            counts.pop(key, None)
+
+    @staticmethod
+    def _bucket(buckets, index):
+        """The ``Counter`` for ``index`` in a time-ordered deque, created in place if missing."""
+        if not buckets or buckets[-1][0] < index:
+            buckets.append((index, Counter()))
+            return buckets[-1][1]
+        for position, (existing, counts) in enumerate(buckets):
+            if existing == index:
+                return counts
+            if existing > index:
+                buckets.insert(position, (index, Counter()))
+                return buckets[position][1]
+
+    def add(self, key, amount=1, at=None):
+        now = int(self.clock() // 60)
+        minute = now if at is None else min(int(at // 60), now)
+        with self._lock:
+            self._roll(now)
+            if minute > now - self.minute_span:
+                self._bucket(self._minutes, minute)[key] += amount
+                self._recent[key] = self._recent.get(key, 0) + amount
+            elif minute // 60 > now // 60 - self.hour_span:
+                # Evento antigo (aquecimento): direto no bucket da hora
+                self._bucket(self._hours, minute // 60)[key] += amount
+            else:
+                return
+            self._total[key] = self._total.get(key, 0) + amount
+            self._total.move_to_end(key)
+            while len(self._total) > self.max_keys:
+                self._evict()
+
+    def top(self, n, window='hour'):
+        """``[(key, count)]`` of the ``n`` highest counts over the last hour or day."""
+        with self._lock:
+            self._roll(int(self.clock() // 60))
+            totals = self._recent if window == 'hour' else self._total
+            return heapq.nlargest(n, totals.items(), key=itemgetter(1))
+
+    def clear(self):
+        with self._lock:
+            self._minutes.clear()
+            self._hours.clear()
+            self._recent.clear()
+            self._total.clear()
+
+
+_max_keys = getattr(settings, 'TRENDING_MAX_KEYS', DEFAULT_MAX_KEYS)
+hashtags = SlidingWindowCounter(max_keys=_max_keys)
+posts = SlidingWindowCounter(max_keys=_max_keys)
+
+_warm = threading.Event()
+_live_since = None
+
+
+def warm_up():
+    """Replay the last day of hashtag uses into the counter, once per process."""
+    if _warm.is_set():
+        return
+    _warm.set()
+    rows = PostHashtag.objects.filter(created_at__gte=timezone.now() - timedelta(hours=hashtags.hour_span))
+    if _live_since is not None:
+        rows = rows.filter(created_at__lt=_live_since)  # O que veio depois já foi contado ao vivo
+    for name, created_at in rows.values_list('hashtag__name', 'created_at').iterator(chunk_size=2000):
+        hashtags.add(name, at=created_at.timestamp())
+
+
+def _live(since=None):
+    global _live_since
+    if _live_since is None:
+        _live_since = since or timezone.now()
+
+
+def reset():
+    global _live_since
+    hashtags.clear()
+    posts.clear()
+    _warm.clear()
+    _live_since = None
+
+
+def save_hashtags(post, created=False):
+    """Sync ``post``'s ``PostHashtag`` rows with its content; returns the tags it didn't have."""
+    tags = extract_hashtags(post.content)
+    existing = set() if created else set(PostHashtag.objects.filter(post=post).values_list('hashtag__name', flat=True))
+    if existing:
+        PostHashtag.objects.filter(post=post).exclude(hashtag__name__in=tags).delete()
+    new = [tag for tag in tags if tag not in existing]
+    if new:
+        Hashtag.objects.bulk_create([Hashtag(name=tag) for tag in new], ignore_conflicts=True)
+        PostHashtag.objects.bulk_create([
+            PostHashtag(post=post, hashtag_id=hashtag_id, created_at=post.created_at)
+            for hashtag_id in Hashtag.objects.filter(name__in=new).values_list('id', flat=True)
+        ], ignore_conflicts=True)
+    return new
+
+
+def record_post(post):
+    """New post: index its hashtags and count one use of each."""
+    _live(post.created_at)
+    for tag in save_hashtags(post, created=True):
+        hashtags.add(tag)
+    posts.add(post.pk)
+
+
+def record_engagement(post, amount=1):
+    """Like or comment on ``post``; tags come from the content already in memory (no query)."""
+    _live()
+    posts.add(post.pk, amount)
+    for tag in extract_hashtags(post.content):
+        hashtags.add(tag, amount)
+
+
+def top(window='hour', limit=10):
+    warm_up()
+    return hashtags.top(limit, window), posts.top(limit, window)
@@ -1,8 +1,14 @@
 from django.urls import path
 from .views import (
     CustomTokenObtainPairView, CurrentUserView, UserList, UserDetail,
-    PostList, PostDetail, FeedList, CommentListCreateAPIView, 
-    toggle_follow_user, get_follow_status, like_post, create_conversation, send_message, list_conversations, get_conversation
+    PostList, PostDetail, FeedList, PostSearch, UserSearch, CommentListCreateAPIView, 
+    toggle_follow_user, get_follow_status, get_relationships, autocomplete_users, get_recommendations, like_post, create_conversation, send_message, list_conversations, get_conversation,
+    list_messages, mark_conversation_read, profiling_report, get_trending
+)
+from .streaming import event_stream
+from .metrics import metrics_view
+from .async_views import (
+    AsyncFeedView, AsyncPostListView, AsyncUserDetailView, AsyncConversationListView, AsyncConversationDetailView
 )
 
 urlpatterns = [
@@ -17,12 +23,18 @@ urlpatterns = [
     # path('users/<int:user_id>/unfollow/', unfollow_user, name='unfollow_user'),  # Comentado
     path('users/<int:user_id>/toggle_follow/', toggle_follow_user, name='toggle_follow_user'),
     path('users/<int:user_id>/is_following/', get_follow_status, name='get_follow_status'),
+    path('users/relationships/', get_relationships, name='get_relationships'),
+    path('users/search/', UserSearch.as_view(), name='user_search'),
+    path('users/autocomplete/', autocomplete_users, name='autocomplete_users'),
+    path('users/recommendations/', get_recommendations, name='get_recommendations'),
     
     # Posts
     path('posts/', PostList.as_view(), name='post_list'),
     path('posts/<int:pk>/', PostDetail.as_view(), name='post_detail'),
     path('posts/feed/', FeedList.as_view(), name='post_feed'),
+    path('posts/search/', PostSearch.as_view(), name='post_search'),
     path('posts/<int:post_id>/like/', like_post, name='like_post'),
+    path('trending/', get_trending, name='get_trending'),
     
     # Comments
     path('posts/<int:post_id>/comments/', CommentListCreateAPIView.as_view(), name='comment_list_create'),
@@ -32,4 +44,20 @@ urlpatterns = [
     path('conversations/<int:conversation_id>/send/', send_message, name='send_message'),
     path('conversations/', list_conversations, name='list_conversations'),
     path('conversations/<int:conversation_id>/', get_conversation, name='get_conversation'),
+    path('conversations/<int:conversation_id>/messages/', list_messages, name='list_messages'),
+    path('conversations/<int:conversation_id>/read/', mark_conversation_read, name='mark_conversation_read'),
+
+    # Diagnóstico (staff)
+    path('debug/profile/', profiling_report, name='profiling_report'),
+    path('internal/metrics/', metrics_view, name='metrics'),
+
+    # Tempo real (SSE)
+    path('stream/', event_stream, name='event_stream'),
+
+    # Leituras assíncronas (servidas via ASGI)
+    path('async/users/<int:pk>/', AsyncUserDetailView.as_view(), name='async_user_detail'),
+    path('async/posts/', AsyncPostListView.as_view(), name='async_post_list'),
+    path('async/posts/feed/', AsyncFeedView.as_view(), name='async_post_feed'),
+    path('async/conversations/', AsyncConversationListView.as_view(), name='async_list_conversations'),
+    path('async/conversations/<int:conversation_id>/', AsyncConversationDetailView.as_view(), name='async_get_conversation'),
 ]
\ No newline at end of file
@@ -1,17 +1,23 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, AllowAny, BasePermission
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny, BasePermission
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework.generics import GenericAPIView
 from rest_framework.parsers import MultiPartParser, FormParser
-from drf_spectacular.utils import extend_schema, OpenApiResponse
-from django.db.models import Prefetch
+from rest_framework.exceptions import NotFound, ValidationError
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
 from .models import User, Post, Comment, Message, Conversation
-from .serializers import UserSerializer, PostSerializer, CommentSerializer, UserUpdateSerializer, ConversationSerializer, CreateMessageSerializer 
+from .serializers import overlay_follow_state, overlay_viewer_state, relationship_map, TrendingPostSerializer, UserCardSerializer, UserSerializer, PostSerializer, CommentSerializer, UserUpdateSerializer, ConversationSerializer, CreateMessageSerializer, InboxConversationSerializer, MessageSerializer
+from .pagination import KeysetPagination
+from . import autocomplete, cache, conditional, counters, profiling, ranking, realtime, recommendations, search, timeline, trending
 
 User = get_user_model()
 
@@ -107,6 +113,12 @@ class UserList(generics.ListCreateAPIView):
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
 
+    def get_serializer_class(self):
+        # Perfil completo só em UserDetail/CurrentUserView
+        if self.request.method == 'GET':
+            return UserCardSerializer
+        return self.serializer_class
+
 class UserDetail(generics.RetrieveUpdateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -119,10 +131,34 @@ class UserDetail(generics.RetrieveUpdateAPIView):
 
     def patch(self, request, *args, **kwargs):
         return self.update(request, partial=True)
+
+    def retrieve(self, request, *args, **kwargs):
+        user = self.get_object()
+        data = cache.user_representation(user, lambda missing: [self.get_serializer(missing[0]).data])
+        return Response(overlay_follow_state([data], request)[0])
         
     def put(self, request, *args, **kwargs):
         return Response({'error': 'PUT não suportado. Use PATCH para atualizações parciais.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
+def search_query(request):
+    query = request.query_params.get('q', '')
+    if not search.terms(query):
+        raise ValidationError({'q': 'Informe um termo de busca.'})
+    return query
+
+SEARCH_PARAMETERS = [OpenApiParameter('q', str, required=True, description='Termos da busca; o último vale como prefixo')]
+
+@extend_schema(parameters=SEARCH_PARAMETERS)
+class UserSearch(generics.ListAPIView):
+    """Users whose username or bio contain every term, in username order."""
+    serializer_class = UserCardSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ['username']
+
+    def get_queryset(self):
+        return search.filter_matching(User.objects.all(), 'user', search_query(self.request))
+
 @extend_schema(
     methods=['get'],
     responses={
@@ -140,12 +176,129 @@ def get_follow_status(request, user_id):
         if request.user.id == user_to_check.id:
             return Response({'error': 'Não aplica pra si mesmo'}, status=status.HTTP_400_BAD_REQUEST)
             
-        is_following = user_to_check in request.user.following.all()
+        is_following = request.user.following.filter(pk=user_to_check.pk).exists()
         
         return Response({'is_following': is_following}, status=status.HTTP_200_OK)
     except User.DoesNotExist:
         return Response({'error': 'Usuário não encontrado'}, status=status.HTTP_404_NOT_FOUND)
+
+MAX_RELATIONSHIP_IDS = 100
+
+@extend_schema(
+    methods=['get'],
+    parameters=[
+        OpenApiParameter('ids', str, description=f'IDs separados por vírgula (máx. {MAX_RELATIONSHIP_IDS})', required=True),
+    ],
+    responses={
+        200: OpenApiResponse(
+            description='Relação do usuário logado com cada ID',
+            response={
+                'type': 'object',
+                'properties': {
+                    'results': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'id': {'type': 'integer'},
+                                'following': {'type': 'boolean'},
+                                'followed_by': {'type': 'boolean'},
+                                'mutual': {'type': 'boolean'},
+                            }
+                        }
+                    }
+                }
+            }
+        ),
+        400: OpenApiResponse(description='IDs inválidos', response={'type': 'object', 'properties': {'error': {'type': 'string'}}}),
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_relationships(request):
+    """
+    Versão em lote de `is_following`: `?ids=2,3,5` devolve following/followed_by/mutual
+    de cada usuário numa única query. O próprio usuário e IDs inexistentes vêm com tudo false.
+    """
+    try:
+        user_ids = list(dict.fromkeys(int(user_id) for user_id in request.query_params.get('ids', '').split(',') if user_id.strip()))
+    except ValueError:
+        return Response({'error': 'IDs inválidos'}, status=status.HTTP_400_BAD_REQUEST)
+    if not user_ids or len(user_ids) > MAX_RELATIONSHIP_IDS:
+        return Response({'error': f'Informe de 1 a {MAX_RELATIONSHIP_IDS} IDs'}, status=status.HTTP_400_BAD_REQUEST)
+
+    relationships = relationship_map(request.user, user_ids)
+    empty = {'following': False, 'followed_by': False, 'mutual': False}
+    return Response({
+        'results': [{'id': user_id, **relationships.get(user_id, empty)} for user_id in user_ids],
+    }, status=status.HTTP_200_OK)
     
+MAX_AUTOCOMPLETE_RESULTS = 25
+
+@extend_schema(
+    methods=['get'],
+    parameters=[
+        OpenApiParameter('q', str, description='Início do username (sem @)', required=True),
+        OpenApiParameter('limit', int, description=f'Sugestões (padrão 10, máx. {MAX_AUTOCOMPLETE_RESULTS})'),
+    ],
+    responses={200: UserCardSerializer(many=True)},
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def autocomplete_users(request):
+    """
+    Sugestões de username para menções e DMs: quem começa com `q`, priorizando
+    amizades mútuas, depois quem você segue e quem te segue.
+    """
+    prefix = request.query_params.get('q', '').strip().lstrip('@')
+    if not prefix:
+        return Response({'results': []}, status=status.HTTP_200_OK)
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 10)), MAX_AUTOCOMPLETE_RESULTS))
+    except ValueError:
+        limit = 10
+
+    user_ids, relationships = autocomplete.suggest(prefix, request.user, limit)
+    users = User.objects.in_bulk(user_ids)
+    # O índice de outro worker pode citar um usuário já removido
+    page = [users[user_id] for user_id in user_ids if user_id in users]
+    context = {
+        'request': request,
+        'is_following': {user_id: flags['following'] for user_id, flags in relationships.items()},
+    }
+    return Response({'results': UserCardSerializer(page, many=True, context=context).data}, status=status.HTTP_200_OK)
+
+MAX_RECOMMENDATIONS = 50
+
+@extend_schema(
+    methods=['get'],
+    parameters=[
+        OpenApiParameter('limit', int, description=f'Quantidade (padrão 10, máx. {MAX_RECOMMENDATIONS})'),
+    ],
+    responses={
+        200: OpenApiResponse(
+            description='Sugestões de quem seguir: UserCard + mutual_count (quantos que você segue já seguem a pessoa)',
+            response={'type': 'object', 'properties': {'results': {'type': 'array', 'items': {'type': 'object'}}}},
+        ),
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_recommendations(request):
+    """Quem seguir: amigos de amigos por número de conexões em comum, depois popularidade."""
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 10)), MAX_RECOMMENDATIONS))
+    except ValueError:
+        limit = 10
+
+    rows = recommendations.top_for(request.user, limit)
+    # Recomendações nunca incluem quem o usuário já segue
+    context = {'request': request, 'is_following': {row.candidate_id: False for row in rows}}
+    users = UserCardSerializer([row.candidate for row in rows], many=True, context=context).data
+    return Response({
+        'results': [{**user, 'mutual_count': row.mutual_count} for user, row in zip(users, rows)],
+    }, status=status.HTTP_200_OK)
+
 @extend_schema(
     methods=['post'],
     request=None,
@@ -173,48 +326,120 @@ def toggle_follow_user(request, user_id):
         if request.user.id == user_to_toggle.id:
             return Response({'error': 'Não pode seguir a si mesmo'}, status=status.HTTP_400_BAD_REQUEST)
 
-        is_following = user_to_toggle in request.user.following.all()
-        
-        if is_following:
-            request.user.following.remove(user_to_toggle)
-            request.user.save()
-            message = 'Deixou de seguir!'
-        else:
-            request.user.following.add(user_to_toggle)
-            request.user.save()
-            message = 'Seguindo!'
-
-        new_followers_count = user_to_toggle.followers.count()
-        current_user_following_count = request.user.following.count()
+        is_following, delta = counters.toggle_follow(request.user.id, user_to_toggle.id)
+        if delta < 0:
+            timeline.prune(request.user, user_to_toggle)
+        elif delta > 0:
+            timeline.backfill(request.user, user_to_toggle)
+        message = 'Seguindo!' if is_following else 'Deixou de seguir!'
+
+        if delta:
+            # Só os contadores mudam: o cartão de autor (e os posts em cache) continua válido
+            cache.invalidate_user(request.user.id, fields=['following_count'])
+            cache.invalidate_user(user_to_toggle.id, fields=['followers_count'])
+            recommendations.apply_follow(request.user.id, user_to_toggle.id, is_following)
+            realtime.publish_follow_changed(request.user.id, user_to_toggle.id, is_following)
+        counts = {
+            pk: (followers, following) for pk, followers, following in
+            User.objects.filter(pk__in=[request.user.pk, user_to_toggle.pk]).values_list('pk', 'followers_count', 'following_count')
+        }
 
         return Response({
             'message': message,
-            'is_following': not is_following,
-            'followers_count': new_followers_count, 
-            'following_count': current_user_following_count,
+            'is_following': is_following,
+            'followers_count': counts[user_to_toggle.pk][0],
+            'following_count': counts[request.user.pk][1],
         }, status=status.HTTP_200_OK)
     except User.DoesNotExist:
         return Response({'error': 'Usuário não encontrado'}, status=status.HTTP_404_NOT_FOUND)
 
 
-class PostList(generics.ListCreateAPIView):
+class CommentPreviewMixin:
+    """
+    List endpoints embed only the latest N comments of each post (plus
+    ``comments_count``), fetched for the whole page with one windowed
+    prefetch. N defaults to ``POST_COMMENT_PREVIEW_SIZE`` and can be set per
+    request with ``?comments_preview=`` (0 a ``max_comment_preview``).
+    """
+    max_comment_preview = 20
+
+    def get_comment_preview_size(self):
+        default = getattr(settings, 'POST_COMMENT_PREVIEW_SIZE', 3)
+        try:
+            size = int(self.request.query_params.get('comments_preview', default))
+        except ValueError:
+            size = default
+        return max(0, min(size, self.max_comment_preview))
+
+    def with_comment_preview(self, queryset):
+        size = self.get_comment_preview_size()
+        latest = Comment.objects.select_related('author').order_by('-created_at', '-id')[:size]
+        return queryset.select_related('author').prefetch_related(
+            Prefetch('comments', queryset=latest, to_attr='comment_preview')
+        )
+
+class PostList(CommentPreviewMixin, generics.ListCreateAPIView):
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         author_id = self.request.query_params.get('author')
         if author_id:
-            return Post.objects.filter(author_id=author_id).order_by('-created_at')
-        return Post.objects.filter(author=self.request.user).order_by('-created_at')
+            queryset = Post.objects.filter(author_id=author_id)
+        else:
+            queryset = Post.objects.filter(author=self.request.user)
+        return self.with_comment_preview(queryset).order_by('-created_at')
+
+    def list(self, request, *args, **kwargs):
+        # Perfil de outro usuário (?author=): páginas montadas do cache de representações
+        if 'author' not in request.query_params:
+            return super().list(request, *args, **kwargs)
+        page = self.paginate_queryset(
+            Post.objects.filter(author_id=request.query_params['author']).only('id', 'author_id', 'created_at')
+        )
+        preview_size = self.get_comment_preview_size()
+
+        def build(missing):
+            posts = self.with_comment_preview(Post.objects.filter(pk__in=[post.id for post in missing])).in_bulk()
+            return self.get_serializer([posts[post.id] for post in missing], many=True).data
+
+        data = cache.post_representations(page, build, variant=f'preview{preview_size}')
+        return self.get_paginated_response(overlay_viewer_state(data, request))
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        post = serializer.save(author=self.request.user)
+        trending.record_post(post)
+        follower_ids = timeline.fan_out_post(post)
+        realtime.publish_post_created(post, follower_ids)
 
 class PostDetail(generics.RetrieveUpdateDestroyAPIView):
     queryset = Post.objects.all()
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticated]
 
+    def retrieve(self, request, *args, **kwargs):
+        validators = conditional.post_validators(kwargs['pk'], request.user)
+        if validators is None:
+            raise NotFound()
+        return conditional.conditional_response(request, *validators, lambda: self._retrieve(request))
+
+    def _retrieve(self, request):
+        post = self.get_object()
+        data = cache.post_representations([post], lambda missing: [self.get_serializer(missing[0]).data])[0]
+        return Response(overlay_viewer_state([data], request)[0])
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        if 'content' in serializer.validated_data:
+            trending.save_hashtags(serializer.instance)
+        cache.invalidate_post(serializer.instance.pk)
+
+    def perform_destroy(self, instance):
+        post_id = instance.pk
+        super().perform_destroy(instance)
+        cache.invalidate_post(post_id)
+
 @extend_schema(
     methods=['post'],
     request=None,
@@ -241,18 +466,15 @@ def like_post(request, post_id):
         post = get_object_or_404(Post, id=post_id)
         user = request.user
         
-        if user in post.likes.all():
-            post.likes.remove(user)
-            has_liked = False
-            message = 'Curtiu cancelada!'
-        else:
-            post.likes.add(user)
-            has_liked = True
-            message = 'Curtiu!'
-        
-        likes_count = post.likes.count()
+        has_liked, delta = counters.toggle_like(post.id, user.id)
+        message = 'Curtiu!' if has_liked else 'Curtiu cancelada!'
         
-        serializer_context = {'request': request}
+        likes_count = Post.objects.values_list('likes_count', flat=True).get(pk=post.pk)
+        if delta:
+            cache.invalidate_post(post.id)
+        if delta > 0:
+            realtime.publish_post_liked(post, user, likes_count)
+            trending.record_engagement(post)
         
         return Response({
             'message': message,
@@ -266,31 +488,80 @@ def like_post(request, post_id):
 class CommentListCreateAPIView(generics.ListCreateAPIView):
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         post_id = self.kwargs['post_id']
-        return Comment.objects.filter(post_id=post_id)
+        return Comment.objects.filter(post_id=post_id).select_related('author')
 
     def perform_create(self, serializer):
         post_id = self.kwargs['post_id']
         post = Post.objects.get(id=post_id)
         serializer.context['post'] = post
-        serializer.save(author=self.request.user)
+        comment = serializer.save(author=self.request.user)
+        counters.adjust_comments(post.id, 1)
+        cache.invalidate_post(post.id)
+        trending.record_engagement(post)
+        realtime.publish_comment_created(comment)
 
-class FeedList(generics.ListAPIView):
+class FeedMixin:
+    """
+    Feed candidates for the requested page only: the cursor window is read
+    before any query, so the timeline lookup is bounded by the page size
+    instead of the length of the user's timeline.
+    """
+
+    def get_feed_mode(self):
+        mode = self.request.query_params.get('mode', 'recent')
+        if mode not in ranking.MODES:
+            raise ValidationError({'mode': f"Use {' ou '.join(ranking.MODES)}."})
+        return mode
+
+    @property
+    def keyset_ordering(self):
+        # None: ordem do modelo (-created_at)
+        return ['-engagement_score'] if self.get_feed_mode() == 'top' else None
+
+    def feed_candidates(self):
+        # Validadores e página usam o mesmo conjunto: as queries de ids rodam uma vez
+        if not hasattr(self, '_feed_candidates'):
+            user = self.request.user
+            if self.get_feed_mode() == 'top':
+                queryset = ranking.ranked_feed(user)
+            else:
+                position, reverse, page_size = KeysetPagination().window(Post.objects.all(), self.request, self)
+                queryset = timeline.feed_queryset(user, page_size + 1, position, reverse)
+            self._feed_candidates = queryset
+        return self._feed_candidates
+
+
+@extend_schema(parameters=[
+    OpenApiParameter('mode', str, enum=list(ranking.MODES), description='recent (cronológico, padrão) ou top (engajamento recente)'),
+])
+class FeedList(FeedMixin, CommentPreviewMixin, generics.ListAPIView):
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        following_users = list(self.request.user.following.all())
-        authors = [self.request.user] + following_users 
-        
-        return Post.objects.filter(
-            author__in=authors
-        ).select_related('author').prefetch_related(
-            Prefetch('likes'),  # Likes do post
-            Prefetch('comments', queryset=Comment.objects.select_related('author'))
-        ).order_by('-created_at')
+        return self.with_comment_preview(self.feed_candidates())
+
+    def list(self, request, *args, **kwargs):
+        # Validador barato (só ids/contadores da página) antes da query completa
+        variant = f'{self.get_feed_mode()}:preview{self.get_comment_preview_size()}'
+        validators = conditional.post_page_validators(self.feed_candidates(), request, self, variant)
+        return conditional.conditional_response(request, *validators, lambda: super(FeedList, self).list(request, *args, **kwargs))
+
+@extend_schema(parameters=SEARCH_PARAMETERS)
+class PostSearch(CommentPreviewMixin, generics.ListAPIView):
+    """Posts containing every term, newest first."""
+    serializer_class = PostSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        queryset = search.filter_matching(Post.objects.all(), 'post', search_query(self.request))
+        return self.with_comment_preview(queryset).order_by('-created_at')
     
 @extend_schema(
     methods=['post'],
@@ -318,16 +589,18 @@ def create_conversation(request, target_user_id):
         if request.user.id == target_user.id:
             return Response({'error': 'Não pode iniciar conversa consigo mesmo'}, status=status.HTTP_400_BAD_REQUEST)
 
-        conversation = Conversation.objects.filter(
-            participants=request.user
-        ).filter(
-            participants=target_user
-        ).first()
+        # Busca pela chave única do par em vez de juntar participants duas vezes
+        direct_key = Conversation.direct_key_for(request.user.id, target_user.id)
+        conversation = Conversation.objects.filter(direct_key=direct_key).first()
 
         if not conversation:
-            conversation = Conversation.objects.create()
-            conversation.participants.add(request.user, target_user)
-            conversation.save()
+            try:
+                with transaction.atomic():
+                    conversation = Conversation.objects.create(direct_key=direct_key)
+                    conversation.participants.add(request.user, target_user)
+            except IntegrityError:
+                # Request concorrente criou a mesma conversa primeiro
+                conversation = Conversation.objects.get(direct_key=direct_key)
 
         serializer = ConversationSerializer(conversation, context={'request': request})
 
@@ -336,6 +609,10 @@ def create_conversation(request, target_user_id):
     except Exception as e:
         return Response({'error': f'Erro interno: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+def is_participant(conversation, user):
+    # EXISTS no índice único (conversation, user) em vez de carregar todos os participantes
+    return Conversation.participants.through.objects.filter(conversation_id=conversation.pk, user_id=user.pk).exists()
+
 @extend_schema(
     methods=['post'],
     request={'type': 'object', 'properties': {'content': {'type': 'string'}}},
@@ -351,7 +628,7 @@ def send_message(request, conversation_id):
     try:
         conversation = get_object_or_404(Conversation, id=conversation_id)
 
-        if request.user not in conversation.participants.all():
+        if not is_participant(conversation, request.user):
             return Response({'error': 'Você não faz parte dessa conversa'}, status=status.HTTP_403_FORBIDDEN)
 
         serializer = CreateMessageSerializer(data=request.data, context={
@@ -359,23 +636,95 @@ def send_message(request, conversation_id):
             'conversation': conversation
         })
         if serializer.is_valid():
-            message = serializer.save()
+            with transaction.atomic():
+                message = serializer.save()
+                Conversation.objects.filter(pk=conversation.pk).update(updated_at=message.created_at, last_message=message)
             conversation.updated_at = message.created_at
-            conversation.save()
+            conversation.last_message = message
+            recipients = conversation.participants.exclude(id=request.user.id).values_list('id', flat=True)
+            realtime.publish_message(message, list(recipients))
             return Response(ConversationSerializer(conversation).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({'error': 'Erro interno ao enviar mensagem'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
-@extend_schema(responses={200: ConversationSerializer(many=True)})
+def inbox_queryset(user):
+    unread = Message.objects.filter(
+        conversation=OuterRef('pk'), is_read=False
+    ).exclude(author=user).order_by().values('conversation').annotate(n=Count('*')).values('n')
+    return user.conversations.select_related(
+        'last_message__author'
+    ).prefetch_related('participants').annotate(unread_count=Coalesce(Subquery(unread), 0))
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter('cursor', str, description='Cursor opaco retornado em next/previous'),
+        OpenApiParameter('limit', int, description='Conversas por página'),
+    ],
+    responses={200: InboxConversationSerializer(many=True)},
+)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_conversations(request):
-    conversations = request.user.conversations.all().order_by('-updated_at')
-    serializer = ConversationSerializer(conversations, many=True, context={'request': request})
-    return Response(serializer.data)
+    """
+    Inbox: cada conversa com participantes, última mensagem e não lidas,
+    em número constante de queries (sem carregar o histórico).
+    """
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(inbox_queryset(request.user), request)
+    serializer = InboxConversationSerializer(page, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data)
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter('cursor', str, description='Cursor opaco retornado em next/previous'),
+        OpenApiParameter('limit', int, description='Mensagens por página'),
+    ],
+    responses={200: MessageSerializer(many=True)},
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def list_messages(request, conversation_id):
+    """
+    Histórico paginado de uma conversa. A primeira página traz as mensagens
+    mais recentes; `previous` carrega as anteriores.
+    """
+    conversation = get_object_or_404(Conversation, id=conversation_id)
+    if not is_participant(conversation, request.user):
+        return Response({'error': 'Você não faz parte dessa conversa'}, status=status.HTTP_403_FORBIDDEN)
+
+    paginator = KeysetPagination(start_from_end=True)
+    page = paginator.paginate_queryset(conversation.messages.select_related('author'), request)
+    serializer = MessageSerializer(page, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data)
+
+@extend_schema(
+    methods=['post'],
+    request=None,
+    responses={
+        200: OpenApiResponse(
+            description='Mensagens marcadas como lidas',
+            response={'type': 'object', 'properties': {'marked_read': {'type': 'integer'}}}
+        ),
+        403: OpenApiResponse(description='Não autorizado na conversa'),
+        404: OpenApiResponse(description='Conversa não encontrada'),
+    }
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def mark_conversation_read(request, conversation_id):
+    conversation = get_object_or_404(Conversation, id=conversation_id)
+    if not is_participant(conversation, request.user):
+        return Response({'error': 'Você não faz parte dessa conversa'}, status=status.HTTP_403_FORBIDDEN)
+
+    marked = conversation.messages.filter(is_read=False).exclude(author=request.user).update(is_read=True)
+    return Response({'marked_read': marked}, status=status.HTTP_200_OK)
 
 @extend_schema(
+    parameters=[
+        OpenApiParameter('cursor', str, description='Cursor opaco retornado em next/previous'),
+        OpenApiParameter('limit', int, description='Mensagens por página'),
+    ],
     responses={200: ConversationSerializer()}
 )
 @api_view(['GET'])
@@ -383,18 +732,100 @@ def list_conversations(request):
 def get_conversation(request, conversation_id):
     """
     Retorna detalhes de uma conversa específica (msgs, participants).
-    Suporta paginação: ?page=1&limit=20 pra mensagens.
+    Mensagens paginadas por cursor: a primeira página traz as mais recentes,
+    `previous` carrega as anteriores. Use ?limit=20 pro tamanho da página.
     """
     try:
-        conversation = get_object_or_404(Conversation, id=conversation_id)
-        if request.user not in conversation.participants.all():
+        conversation = get_object_or_404(Conversation.objects.select_related('last_message__author'), id=conversation_id)
+        if not is_participant(conversation, request.user):
             return Response({'error': 'Você não faz parte dessa conversa'}, status=status.HTTP_403_FORBIDDEN)
-        
-        serializer = ConversationSerializer(conversation, context={
-            'request': request,
-            'page': request.query_params.get('page', 1),
-            'limit': request.query_params.get('limit', 20)
-        })
-        return Response(serializer.data, status=status.HTTP_200_OK)
+
+        def build():
+            paginator = KeysetPagination(start_from_end=True)
+            messages = paginator.paginate_queryset(conversation.messages.select_related('author'), request)
+            serializer = ConversationSerializer(conversation, context={
+                'request': request,
+                'messages': messages,
+            })
+            return Response({
+                **serializer.data,
+                'next': paginator.get_next_link(),
+                'previous': paginator.get_previous_link(),
+            }, status=status.HTTP_200_OK)
+
+        etag, last_modified = conditional.conversation_validators(conversation, request)
+        return conditional.conditional_response(request, etag, last_modified, build)
+    except NotFound:
+        raise
     except Exception as e:
-        return Response({'error': 'Erro ao carregar conversa'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        return Response({'error': 'Erro ao carregar conversa'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+MAX_TRENDING = 50
+
+@extend_schema(
+    methods=['get'],
+    parameters=[
+        OpenApiParameter('window', str, enum=list(trending.WINDOWS), description='hour (padrão) ou day'),
+        OpenApiParameter('limit', int, description=f'Itens por lista (padrão 10, máx. {MAX_TRENDING})'),
+    ],
+    responses={
+        200: OpenApiResponse(
+            description='Hashtags e posts com mais atividade na janela (usos, curtidas e comentários)',
+            response={
+                'type': 'object',
+                'properties': {
+                    'window': {'type': 'string'},
+                    'hashtags': {'type': 'array', 'items': {'type': 'object', 'properties': {'tag': {'type': 'string'}, 'count': {'type': 'integer'}}}},
+                    'posts': {'type': 'array', 'items': {'type': 'object'}},
+                }
+            }
+        ),
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_trending(request):
+    window = request.query_params.get('window', 'hour')
+    if window not in trending.WINDOWS:
+        return Response({'error': f"Janela inválida: use {' ou '.join(trending.WINDOWS)}"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 10)), MAX_TRENDING))
+    except ValueError:
+        limit = 10
+
+    # Igual pra todo mundo: um top-N por janela/limite, recalculado a cada TRENDING_CACHE_SECONDS
+    key = f'trending:{window}:{limit}'
+    data = cache.get_cache().get(key)
+    if data is None:
+        tags, hot_posts = trending.top(window, limit)
+        posts = Post.objects.select_related('author').in_bulk([post_id for post_id, _ in hot_posts])
+        data = {
+            'window': window,
+            'hashtags': [{'tag': tag, 'count': count} for tag, count in tags],
+            'posts': [
+                {**TrendingPostSerializer(posts[post_id]).data, 'count': count}
+                for post_id, count in hot_posts if post_id in posts
+            ],
+        }
+        cache.get_cache().set(key, data, getattr(settings, 'TRENDING_CACHE_SECONDS', 30))
+    return Response(data, status=status.HTTP_200_OK)
+
+@extend_schema(
+    parameters=[OpenApiParameter('top', int, description='Linhas por ranking (padrão 10)')],
+    responses={200: OpenApiResponse(description='Endpoints mais lentos e piores N+1 deste processo')},
+)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profiling_report(request):
+    """
+    Agregado das requisições perfiladas por este worker (PROFILING_ENABLED).
+    Pra todos os workers, use `manage.py profile_report` sobre os logs.
+    """
+    try:
+        top = max(1, int(request.query_params.get('top', 10)))
+    except ValueError:
+        return Response({'error': 'top inválido'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        'enabled': settings.PROFILING_ENABLED,
+        **profiling.aggregate.report(top),
+    }, status=status.HTTP_200_OK)
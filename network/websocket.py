@@ -0,0 +1,47 @@
+"""
+Per-user WebSocket channel served directly by ``social_api.asgi``.
+
+Clients connect to ``REALTIME_WEBSOCKET_PATH`` (``/ws/``) with
+``?token=<access JWT>`` and receive every event published to their user
+channel as a JSON text frame, e.g. new messages from ``send_message``.
+Sending ``ping`` gets a ``pong`` back; anything else is ignored.
+"""
+import asyncio
+import json
+
+from .authentication import atoken_user, scope_token
+from .realtime import FOLLOW_CHANGED, get_broker, user_channel
+
+CLOSE_UNAUTHORIZED = 4401
+
+
+async def websocket_application(scope, receive, send):
+    connect = await receive()
+    if connect['type'] != 'websocket.connect':
+        return
+
+    user = await atoken_user(scope_token(scope))
+    if user is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+        return
+
+    await send({'type': 'websocket.accept'})
+    subscription = get_broker().subscribe([user_channel(user.id)])
+
+    async def forward_events():
+        async for event in subscription:
+            if event['type'] == FOLLOW_CHANGED:  # Só pro stream SSE
+                continue
+            await send({'type': 'websocket.send', 'text': json.dumps(event)})
+
+    forwarder = asyncio.create_task(forward_events())
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+            if message.get('text') == 'ping':
+                await send({'type': 'websocket.send', 'text': 'pong'})
+    finally:
+        subscription.close()
+        forwarder.cancel()
@@ -36,6 +36,8 @@ INSTALLED_APPS = [
 CLOUDINARY_URL = os.environ.get('CLOUDINARY_URL')
 
 MIDDLEWARE = [
+    'network.metrics.MetricsMiddleware',
+    'network.profiling.ProfilingMiddleware',  # Só ativo com PROFILING_ENABLED
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -64,6 +66,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'social_api.wsgi.application'
+ASGI_APPLICATION = 'social_api.asgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -146,6 +149,75 @@ SPECTACULAR_SETTINGS = {
 
 AUTH_USER_MODEL = 'network.User'
 
+# Home timeline materializada (fan-out na escrita)
+TIMELINE_BACKEND = os.environ.get('TIMELINE_BACKEND', 'network.timeline.DatabaseTimelineBackend')
+TIMELINE_FANOUT_THRESHOLD = int(os.environ.get('TIMELINE_FANOUT_THRESHOLD', 5000))  # Acima disso, entrega na leitura
+TIMELINE_BACKFILL_LIMIT = 200  # Posts copiados pro feed ao seguir alguém
+TIMELINE_MAX_LENGTH = 800  # Entradas mantidas por timeline (no banco, via trim_timelines)
+
+# Tempo real (WebSocket via social_api.asgi). O broker em memória só entrega
+# dentro do mesmo processo: com vários workers, use um broker compartilhado.
+REALTIME_BROKER = os.environ.get('REALTIME_BROKER', 'network.realtime.InMemoryBroker')
+REALTIME_WEBSOCKET_PATH = '/ws/'
+
+# Cache de representações serializadas (posts e perfis), invalidado nas escritas.
+# LocMemCache descarta as entradas menos usadas (LRU); com REDIS_URL vira compartilhado.
+REDIS_URL = os.environ.get('REDIS_URL')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'representations': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache' if REDIS_URL else 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': REDIS_URL or 'representations',
+        'OPTIONS': {} if REDIS_URL else {'MAX_ENTRIES': 10000},
+    },
+}
+REPRESENTATION_CACHE_ALIAS = 'representations'
+REPRESENTATION_CACHE_TIMEOUT = 300
+
+# Autocomplete de usernames: índice em memória por worker, recarregado do banco a cada N segundos
+AUTOCOMPLETE_REFRESH_SECONDS = 300
+
+# Quem seguir: top-K pré-calculado por usuário (manage.py compute_recommendations)
+RECOMMENDATION_TOP_K = 50
+RECOMMENDATION_POPULARITY_WEIGHT = 0.5  # Peso de log(1 + seguidores) no score; cada seguidor em comum vale 1
+RECOMMENDATION_MAX_AGE = 24 * 60 * 60  # Segundos até a lista ser recalculada na leitura
+
+# Feed ranqueado (?mode=top): score de engajamento com meia-vida, envelhecido por manage.py decay_engagement_scores
+FEED_LIKE_WEIGHT = 1.0
+FEED_COMMENT_WEIGHT = 2.0
+FEED_SCORE_HALF_LIFE_HOURS = 12
+FEED_DECAY_INTERVAL_HOURS = 1  # Intervalo do cron que roda o decaimento
+FEED_RANKING_WINDOW_DAYS = 7  # Só posts desta janela entram no modo top
+FEED_RANKING_CANDIDATES = 500  # Posts mais recentes da janela que o modo top ranqueia
+
+# Trending (/api/trending/): contadores em janela deslizante por worker
+TRENDING_MAX_KEYS = 10000  # Hashtags/posts acompanhados; acima disso sai o menos usado recentemente
+TRENDING_CACHE_SECONDS = 30
+
+# Comentários embutidos em cada post nas listas (feed, posts); o resto via /comments/
+POST_COMMENT_PREVIEW_SIZE = 3
+
+# Profiling por requisição (Server-Timing + log JSON em network.profiling); desligado por padrão
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False').lower() == 'true'
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 1.0))  # Fração das requisições perfiladas
+
+# Métricas Prometheus em /api/internal/metrics/ (Authorization: Bearer METRICS_TOKEN; sem token o endpoint fica desligado)
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'network.profiling': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 ALLOWED_HOSTS = ['*']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 